@@ -31,132 +31,2574 @@ bl_info = {
 }
 
 import bpy
-import bmesh
-import random
+import os
+import json
+import time
+import hashlib
+import tempfile
+import cProfile
+import contextlib
 import mathutils
-from bpy.props import FloatProperty, EnumProperty
+import numpy as np
+from bpy.props import FloatProperty, IntProperty, BoolProperty, EnumProperty, PointerProperty, StringProperty, CollectionProperty
 from bpy.types import Panel, Operator
+from bpy_extras.io_utils import ExportHelper, ImportHelper
 
+from . import core
 
-class NLA_OT_apply_offset_and_random_scale(Operator):
+
+# Custom properties caching the last computed result on each object
+CACHE_SIGNATURE = "aot_strip_signature"
+CACHE_OFFSET = "aot_strip_offset"
+CACHE_SCALES = "aot_strip_scales"
+
+
+def _gather_locations(objects):
+    """Read the location of every object into an (N, 3) array"""
+    return np.fromiter(
+        (co for obj in objects for co in obj.location),
+        dtype=np.float64,
+        count=len(objects) * 3,
+    ).reshape(-1, 3)
+
+
+class _StripBatch:
+    """Flat NumPy view of every NLA strip owned by a list of objects
+
+    Strip data is read and written one track at a time with
+    ``foreach_get``/``foreach_set``, so the cost of a batch is a handful of
+    RNA calls per track instead of several property writes per strip.
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.tracks = []
+        # Position of every track in its object's NLA stack
+        self.track_indices = []
+        track_objects = []
+        counts = []
+
+        for index, obj in enumerate(objects):
+            anim_data = obj.animation_data
+            if not anim_data or not anim_data.nla_tracks:
+                continue
+            for track_index, track in enumerate(anim_data.nla_tracks):
+                count = len(track.strips)
+                if count:
+                    self.tracks.append(track)
+                    self.track_indices.append(track_index)
+                    track_objects.append(index)
+                    counts.append(count)
+
+        self.counts = np.array(counts, dtype=np.int64)
+        self.track_objects = np.array(track_objects, dtype=np.int64)
+        # Index of the owning object for every strip
+        self.strip_objects = np.repeat(self.track_objects, self.counts)
+
+        total = int(self.counts.sum())
+        # Position of every strip among all strips of its object
+        self.strip_ordinals = np.arange(total) - np.searchsorted(self.strip_objects, self.strip_objects)
+
+        self.starts, self.ends, self.scales = self.read()
+
+    def __len__(self):
+        return len(self.starts)
+
+    def read(self):
+        """Read the current start, end and scale of every strip"""
+        total = int(self.counts.sum())
+        starts = np.empty(total, dtype=np.float32)
+        ends = np.empty(total, dtype=np.float32)
+        scales = np.empty(total, dtype=np.float32)
+
+        for track, strip_slice in self._track_slices():
+            track.strips.foreach_get("frame_start_ui", starts[strip_slice])
+            track.strips.foreach_get("frame_end_ui", ends[strip_slice])
+            track.strips.foreach_get("scale", scales[strip_slice])
+
+        return starts, ends, scales
+
+    def _track_slices(self):
+        offset = 0
+        for track, count in zip(self.tracks, self.counts.tolist()):
+            yield track, slice(offset, offset + count)
+            offset += count
+
+    def write(self, starts, scales, sequential=False):
+        """Write new start and scale values back to the strips"""
+        _write_track_strips(self.tracks, self.counts, starts, scales, sequential)
+
+
+def _write_track_strips(tracks, counts, starts, scales, sequential=False):
+    """Write flat start and scale arrays back to the strips of each track
+
+    Setting ``frame_start_ui`` moves a strip and keeps its length, and
+    setting ``scale`` then moves its end, so the end frame never has to be
+    written. Tracks given as ``None`` are skipped.
+
+    With ``sequential`` the target layout must be free of overlaps, and
+    tracks holding several strips are written through a staging area so
+    Blender never clamps a strip against a neighbour that has not moved yet.
+    """
+    starts = np.ascontiguousarray(starts, dtype=np.float32)
+    scales = np.ascontiguousarray(scales, dtype=np.float32)
+
+    owners = {}
+    offset = 0
+    for track, count in zip(tracks, np.asarray(counts).tolist()):
+        strip_slice = slice(offset, offset + count)
+        offset += count
+        if track is None:
+            continue
+
+        if sequential and count > 1:
+            _write_strips_staged(track, starts[strip_slice], scales[strip_slice])
+        else:
+            track.strips.foreach_set("frame_start_ui", starts[strip_slice])
+            track.strips.foreach_set("scale", scales[strip_slice])
+        owners[track.id_data.as_pointer()] = track.id_data
+
+    # foreach_set skips RNA update callbacks, so tag the animation ourselves
+    for owner in owners.values():
+        owner.update_tag(refresh={'TIME'})
+
+
+def _write_strips_staged(track, starts, scales):
+    """Move the strips of one track to a new non-overlapping layout
+
+    Blender clamps a moved strip against its current neighbours. The strips
+    are therefore first parked, last to first, in a staging area past every
+    current and final frame, and then moved to their final place first to
+    last, so each strip only ever meets neighbours that are already final
+    (before it) or parked (after it).
+    """
+    strips = list(track.strips)
+    lengths = np.array([strip.frame_end_ui - strip.frame_start_ui for strip in strips])
+    current_scales = np.array([strip.scale for strip in strips])
+    final_ends = starts + lengths * scales / current_scales
+
+    staging = max(max(strip.frame_end_ui for strip in strips), float(final_ends.max())) + lengths.max() + 1.0
+    staging_starts = staging + np.concatenate([[0.0], np.cumsum(lengths + 1.0)[:-1]])
+
+    for strip, staging_start in zip(reversed(strips), reversed(staging_starts.tolist())):
+        strip.frame_start_ui = staging_start
+
+    for strip, start, scale in zip(strips, starts.tolist(), scales.tolist()):
+        strip.frame_start_ui = start
+        strip.scale = scale
+
+
+class _JournalEntry:
+    """Before and after strip values of one operator run
+
+    Strips are stored per track as (object name, track index, strip count)
+    plus flat start/end/scale arrays, so an entry costs memory in proportion
+    to the strips touched instead of a full undo snapshot.
+    """
+
+    def __init__(self, label, parts):
+        names = []
+        track_indices = []
+        counts = []
+        before = []
+        after = []
+
+        # Each part is a strip batch and the values written over it
+        for batch, starts, ends, scales in parts:
+            names.extend(batch.objects[index].name for index in batch.track_objects.tolist())
+            track_indices.extend(batch.track_indices)
+            counts.append(batch.counts)
+            before.append(np.stack([batch.starts, batch.ends, batch.scales]))
+            after.append(np.stack([starts, ends, scales]).astype(np.float32))
+
+        self.label = label
+        self.object_names = np.array(names, dtype=str)
+        self.track_indices = np.array(track_indices, dtype=np.int32)
+        self.counts = np.concatenate(counts) if counts else np.empty(0, dtype=np.int64)
+        self.before = np.concatenate(before, axis=1) if before else np.empty((3, 0), dtype=np.float32)
+        self.after = np.concatenate(after, axis=1) if after else np.empty((3, 0), dtype=np.float32)
+
+    @property
+    def nbytes(self):
+        arrays = (self.object_names, self.track_indices, self.counts, self.before, self.after)
+        return sum(array.nbytes for array in arrays)
+
+    def restore(self, values):
+        """Write one side of the entry back; returns the number of tracks restored
+
+        Tracks that were removed or whose strip count changed are skipped.
+        """
+        tracks = []
+        for name, track_index, count in zip(
+            self.object_names.tolist(), self.track_indices.tolist(), self.counts.tolist()
+        ):
+            track = None
+            obj = bpy.data.objects.get(name)
+            anim_data = obj.animation_data if obj else None
+            if anim_data and track_index < len(anim_data.nla_tracks):
+                candidate = anim_data.nla_tracks[track_index]
+                if len(candidate.strips) == count:
+                    track = candidate
+            tracks.append(track)
+
+        starts, _, scales = values
+        _write_track_strips(tracks, self.counts, starts, scales, sequential=True)
+
+        # Cached results no longer match the strips, so incremental runs recompute them
+        for track in tracks:
+            if track is not None:
+                track.id_data.pop(CACHE_SIGNATURE, None)
+
+        return sum(track is not None for track in tracks)
+
+
+class _StripJournal:
+    """Undo/redo stack of the strip layouts written by the addon"""
+
+    def __init__(self):
+        self.entries = []
+        self.position = 0
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.entries)
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self.entries)
+
+    def push(self, entry, limit):
+        # A new entry discards everything that could have been redone
+        del self.entries[self.position:]
+        self.entries.append(entry)
+        del self.entries[:max(0, len(self.entries) - limit)]
+        self.position = len(self.entries)
+
+    def undo(self):
+        self.position -= 1
+        entry = self.entries[self.position]
+        return entry, entry.restore(entry.before)
+
+    def redo(self):
+        entry = self.entries[self.position]
+        self.position += 1
+        return entry, entry.restore(entry.after)
+
+    def clear(self):
+        self.entries.clear()
+        self.position = 0
+
+
+_strip_journal = _StripJournal()
+
+
+@bpy.app.handlers.persistent
+def _clear_strip_journal(*args):
+    """Drop the journal when a file is loaded
+
+    Global undo and redo keep it: journal steps are not on the global undo
+    stack, so a Ctrl+Z right after an apply would otherwise lose the only
+    record of that layout. Entries find their tracks again by object name
+    and strip count, and skip tracks that no longer match.
+    """
+    _strip_journal.clear()
+
+
+def _commit_strip_undo(nla_tool, label, parts):
+    """Record a strip layout change in the journal, or push a global undo step"""
+    if nla_tool.use_undo_journal:
+        _strip_journal.push(_JournalEntry(label, parts), nla_tool.undo_journal_steps)
+    elif not bpy.app.background:
+        # Without a window there is no undo stack, and the push would fail after the strips were written
+        try:
+            bpy.ops.ed.undo_push(message=label)
+        except RuntimeError:
+            # The push polls for a window context, which timers and handlers may not have
+            pass
+
+
+def _undo_hint(nla_tool):
+    """Suffix for operator reports, as journal steps are not on the global undo stack"""
+    return " (Undo Layout reverts it, Ctrl+Z does not)" if nla_tool.use_undo_journal else ""
+
+
+# Version of the strip layout files written by the export operator
+LAYOUT_FORMAT_VERSION = 1
+
+
+def _save_strip_layout(filepath, batch):
+    """Write the strips of a batch to an uncompressed .npz file
+
+    Tracks are stored as (object name, track index, strip count) and strips
+    as flat start/end/scale arrays, the same layout the journal uses.
+    """
+    names = [batch.objects[index].name for index in batch.track_objects.tolist()]
+    np.savez(
+        filepath,
+        version=np.int32(LAYOUT_FORMAT_VERSION),
+        object_names=np.array(names, dtype=str),
+        track_indices=np.array(batch.track_indices, dtype=np.int32),
+        counts=batch.counts.astype(np.int32),
+        starts=batch.starts,
+        ends=batch.ends,
+        scales=batch.scales,
+    )
+
+
+def _load_strip_layout(filepath):
+    """Read a strip layout file into a dict of arrays"""
+    with np.load(filepath, allow_pickle=False) as data:
+        layout = {name: data[name] for name in data.files}
+
+    if int(layout.get("version", -1)) != LAYOUT_FORMAT_VERSION:
+        raise ValueError("not a strip layout file, or written by an unsupported version")
+    return layout
+
+
+def _layout_objects(layout):
+    """Objects named in a layout, found through one name index of the file"""
+    index = {obj.name: obj for obj in bpy.data.objects}
+    found = {}
+    for name in np.unique(layout["object_names"]).tolist():
+        obj = index.get(name)
+        if obj is not None and obj.animation_data is not None:
+            found[name] = obj
+    return found
+
+
+class _AnimatedObjectIndex:
+    """Index of the objects that have NLA tracks, with their track and strip counts
+
+    The index is built with one scan of ``bpy.data.objects`` after a file is
+    loaded and then kept up to date from ``depsgraph_update_post``, which only
+    reports the objects and collections that actually changed. Entries are
+    keyed by object pointer, so renaming an object or reusing its name does
+    not confuse them; removed objects and stale collection membership are
+    dropped lazily when the index is queried. The totals shown in the panel
+    are kept as running counts.
+    """
+
+    def __init__(self):
+        # Object pointer -> (object, track count, strip count, pointers of its collections)
+        self.entries = {}
+        self.strip_count = 0
+        self.valid = False
+
+    @staticmethod
+    def _entry(obj):
+        anim_data = obj.animation_data
+        if not anim_data or not anim_data.nla_tracks:
+            return None
+        tracks = anim_data.nla_tracks
+        return (
+            obj,
+            len(tracks),
+            sum(len(track.strips) for track in tracks),
+            frozenset(collection.as_pointer() for collection in obj.users_collection),
+        )
+
+    def _set(self, pointer, entry):
+        """Replace or drop the entry of one object, keeping the strip total in step"""
+        previous = self.entries.pop(pointer, None)
+        if previous is not None:
+            self.strip_count -= previous[2]
+        if entry is not None:
+            self.entries[pointer] = entry
+            self.strip_count += entry[2]
+
+    def rebuild(self):
+        self.entries = {}
+        self.strip_count = 0
+        for obj in bpy.data.objects:
+            self.update_object(obj)
+        self.valid = True
+
+    def invalidate(self):
+        self.entries = {}
+        self.strip_count = 0
+        self.valid = False
+
+    def update_object(self, obj):
+        self._set(obj.as_pointer(), self._entry(obj))
+
+    def update(self, depsgraph):
+        """Apply the changes reported by a depsgraph update"""
+        if not self.valid:
+            self.rebuild()
+            return
+
+        for update in depsgraph.updates:
+            id_data = update.id.original
+            if isinstance(id_data, bpy.types.Object):
+                self.update_object(id_data)
+            elif isinstance(id_data, bpy.types.Collection):
+                # Objects may have been linked to or unlinked from the collection
+                for obj in id_data.objects:
+                    self.update_object(obj)
+
+    def totals(self):
+        """Number of indexed objects and strips"""
+        return len(self.entries), self.strip_count
+
+    def objects(self, collection):
+        """Animated objects inside a collection or any of its child collections"""
+        if not self.valid:
+            self.rebuild()
+
+        pointers = {collection.as_pointer()}
+        pointers.update(child.as_pointer() for child in collection.children_recursive)
+
+        result = []
+        for pointer, entry in list(self.entries.items()):
+            if pointers.isdisjoint(entry[3]):
+                continue
+            # Refresh the entry from the live object, which may have been removed
+            # or moved out of the collection since the last update
+            try:
+                current = self._entry(entry[0])
+            except ReferenceError:
+                current = None
+            self._set(pointer, current)
+            if current is not None and not pointers.isdisjoint(current[3]):
+                result.append(current[0])
+        return result
+
+
+_animated_index = _AnimatedObjectIndex()
+
+
+@bpy.app.handlers.persistent
+def _update_animated_index(scene, depsgraph):
+    _animated_index.update(depsgraph)
+
+
+@bpy.app.handlers.persistent
+def _invalidate_animated_index(*args):
+    """Rebuild the index lazily after a file load or undo replaced all data"""
+    _animated_index.invalidate()
+
+
+def _resolve_animated_targets(context, nla_tool):
+    """Animated objects the strip operators work on, according to the target scope"""
+    if nla_tool.target_scope == 'SCENE':
+        return _animated_index.objects(context.scene.collection)
+    if nla_tool.target_scope == 'COLLECTION':
+        collection = nla_tool.target_collection
+        return _animated_index.objects(collection) if collection else []
+    return [obj for obj in context.selected_objects if obj.animation_data]
+
+
+def _gather_world_matrices(objects):
+    """Read the world matrix of every object into an (N, 4, 4) array
+
+    All world matrices in the file are fetched with a single ``foreach_get``
+    call and the requested objects are picked out of that buffer.
+    """
+    all_objects = bpy.data.objects
+    buffer = np.empty(len(all_objects) * 16, dtype=np.float32)
+    all_objects.foreach_get("matrix_world", buffer)
+
+    lookup = {obj.as_pointer(): index for index, obj in enumerate(all_objects)}
+    indices = [lookup[obj.as_pointer()] for obj in objects]
+
+    # foreach_get returns column-major matrices, transpose them to row-major
+    matrices = buffer.reshape(-1, 4, 4).transpose(0, 2, 1)
+    return matrices[indices].astype(np.float64)
+
+
+def _sample_world_matrices(scene, objects, frames):
+    """Read the world matrices of objects on every frame into an (F, N, 4, 4) array
+
+    The scene is evaluated once per frame and all matrices of that frame are
+    fetched with a single ``foreach_get`` call. The current frame is restored
+    afterwards.
+    """
+    all_objects = bpy.data.objects
+    lookup = {obj.as_pointer(): index for index, obj in enumerate(all_objects)}
+    indices = [lookup[obj.as_pointer()] for obj in objects]
+    buffer = np.empty(len(all_objects) * 16, dtype=np.float32)
+
+    current_frame = scene.frame_current
+    samples = np.empty((len(frames), len(objects), 4, 4))
+    try:
+        for frame_index, frame in enumerate(frames):
+            scene.frame_set(int(frame))
+            all_objects.foreach_get("matrix_world", buffer)
+            samples[frame_index] = buffer.reshape(-1, 4, 4)[indices].transpose(0, 2, 1)
+    finally:
+        scene.frame_set(current_frame)
+
+    return samples
+
+
+def _rotation_channels(rotations, rotation_mode):
+    """Convert (N, F, 3, 3) rotation matrix sequences to continuous values for ``rotation_mode``
+
+    Returns the data path and an (N, F, C) array of channel values.
+    """
+    if rotation_mode in {'QUATERNION', 'AXIS_ANGLE'}:
+        quaternions = core.make_quaternions_continuous(core.matrices_to_quaternions(rotations))
+        if rotation_mode == 'QUATERNION':
+            return "rotation_quaternion", quaternions
+        return "rotation_axis_angle", core.quaternions_to_axis_angles(quaternions)
+
+    # Each Euler stays close to the previous frame's, avoiding 360 degree flips
+    return "rotation_euler", core.matrices_to_eulers(rotations, rotation_mode)
+
+
+def _delta_transforms(objects):
+    """Read the delta transforms of objects into (N, 3) locations, (N, 3, 3) rotation matrices and (N, 3) scales
+
+    Delta rotations follow each object's rotation mode like Blender does;
+    axis angle objects have no delta rotation in the API and get none.
+    """
+    locations = np.array([tuple(obj.delta_location) for obj in objects], dtype=np.float64).reshape(-1, 3)
+    scales = np.array([tuple(obj.delta_scale) for obj in objects], dtype=np.float64).reshape(-1, 3)
+    rotations = np.tile(np.eye(3), (len(objects), 1, 1))
+
+    modes = {}
+    for index, obj in enumerate(objects):
+        modes.setdefault(obj.rotation_mode, []).append(index)
+    for rotation_mode, indices in modes.items():
+        if rotation_mode == 'QUATERNION':
+            values = [tuple(objects[index].delta_rotation_quaternion) for index in indices]
+            rotations[indices] = core.quaternions_to_matrices(np.array(values))
+        elif rotation_mode != 'AXIS_ANGLE':
+            values = [tuple(objects[index].delta_rotation_euler) for index in indices]
+            rotations[indices] = core.eulers_to_matrices(np.array(values), rotation_mode)
+    return locations, rotations, scales
+
+
+def _write_transform_keys(obj, frames, channels):
+    """Replace the transform F-Curves of an object with keys written in bulk
+
+    ``channels`` is a list of (data path, (F, C) values). A shared action is
+    copied first so other users keep their animation.
+    """
+    anim_data = obj.animation_data or obj.animation_data_create()
+    action = anim_data.action
+    if action is None:
+        action = bpy.data.actions.new(f"{obj.name}_parent_fix")
+    elif action.users > 1:
+        action = action.copy()
+    anim_data.action = action
+
+    paths = {"location", "rotation_euler", "rotation_quaternion", "rotation_axis_angle", "scale"}
+    for fcurve in [fcurve for fcurve in action.fcurves if fcurve.data_path in paths]:
+        action.fcurves.remove(fcurve)
+
+    frames = np.asarray(frames, dtype=np.float32)
+    for data_path, values in channels:
+        for index in range(values.shape[1]):
+            fcurve = action.fcurves.new(data_path=data_path, index=index, action_group="Object Transforms")
+            fcurve.keyframe_points.add(len(frames))
+            points = np.column_stack([frames, values[:, index]]).astype(np.float32)
+            fcurve.keyframe_points.foreach_set("co", points.ravel())
+            fcurve.update()
+
+
+def _hierarchy_order(objects):
+    """Sort objects so that nested parents always come before their children"""
+    depths = {}
+
+    def depth(obj):
+        chain = []
+        while obj is not None and obj.as_pointer() not in depths:
+            chain.append(obj)
+            obj = obj.parent
+        base = -1 if obj is None else depths[obj.as_pointer()]
+        for offset, item in enumerate(reversed(chain), start=1):
+            depths[item.as_pointer()] = base + offset
+        return depths[chain[0].as_pointer()] if chain else base
+
+    return sorted(objects, key=depth)
+
+
+def _remove_objects_with_orphaned_data(objects, keep=()):
+    """Remove objects, and any data only they were using, in a single batch"""
+    keep = {item.as_pointer() for item in keep}
+    data_blocks = {obj.data.as_pointer(): obj.data for obj in objects if obj.data is not None}
+    data_keys = [
+        obj.data.as_pointer() if obj.data is not None and obj.data.as_pointer() not in keep else None
+        for obj in objects
+    ]
+    users = {key: data.users - int(data.use_fake_user) for key, data in data_blocks.items()}
+
+    # Data is orphaned once every object using it has been removed
+    orphaned = [data_blocks[key] for key in core.orphaned_data(data_keys, users)]
+
+    bpy.data.batch_remove(list(objects) + orphaned)
+    return len(orphaned)
+
+
+# NLA strip settings copied as-is when animation moves to a replacement object
+_STRIP_SETTINGS = (
+    "name", "blend_type", "extrapolation", "use_auto_blend", "blend_in", "blend_out", "use_reverse",
+    "use_sync_length", "use_animated_influence", "influence", "use_animated_time", "use_animated_time_cyclic",
+    "strip_time", "mute",
+)
+
+
+def _transfer_animation(source, target):
+    """Recreate the animation data of ``source`` on ``target``, sharing every action by reference"""
+    source_anim = source.animation_data
+    if source_anim is None:
+        return
+
+    anim_data = target.animation_data or target.animation_data_create()
+    anim_data.action = source_anim.action
+    anim_data.action_blend_type = source_anim.action_blend_type
+    anim_data.action_extrapolation = source_anim.action_extrapolation
+    anim_data.action_influence = source_anim.action_influence
+
+    for source_track in source_anim.nla_tracks:
+        track = anim_data.nla_tracks.new()
+        track.name = source_track.name
+        track.mute = source_track.mute
+        track.lock = source_track.lock
+
+        source_strips = list(source_track.strips)
+        if not source_strips:
+            continue
+
+        # New strips go to free whole frames past the source layout, then move into place together
+        staging = int(np.ceil(max(strip.frame_end for strip in source_strips))) + 1
+        for source_strip in source_strips:
+            strip = track.strips.new(source_strip.name, staging, source_strip.action)
+            strip.action_frame_start = source_strip.action_frame_start
+            strip.action_frame_end = source_strip.action_frame_end
+            strip.repeat = source_strip.repeat
+            staging = int(np.ceil(strip.frame_end)) + 1
+
+        starts = np.array([strip.frame_start_ui for strip in source_strips])
+        scales = np.array([strip.scale for strip in source_strips])
+        _write_strips_staged(track, starts, scales)
+
+        for strip, source_strip in zip(track.strips, source_strips):
+            for setting in _STRIP_SETTINGS:
+                setattr(strip, setting, getattr(source_strip, setting))
+
+
+def _transfer_object_data(source, target):
+    """Move the parent, children, animation and custom properties of ``source`` onto ``target``
+
+    The target takes the source's place in the hierarchy with the same
+    parent inverse and local transform, so its world transform and that of
+    every child stay unchanged.
+    """
+    if source.parent is not None:
+        target.parent = source.parent
+        target.parent_type = source.parent_type
+        if source.parent_type == 'BONE':
+            target.parent_bone = source.parent_bone
+        elif source.parent_type in {'VERTEX', 'VERTEX_3'}:
+            target.parent_vertices = source.parent_vertices
+        target.matrix_parent_inverse = source.matrix_parent_inverse.copy()
+        target.matrix_basis = source.matrix_basis.copy()
+    else:
+        target.matrix_world = source.matrix_world
+
+    # Reparenting keeps each child's parent inverse, and the new parent sits where the old one did
+    for child in source.children:
+        child.parent = target
+
+    _transfer_animation(source, target)
+
+    for key, value in source.items():
+        # Groups and arrays come back as ID property views, store plain copies
+        if hasattr(value, "to_dict"):
+            value = value.to_dict()
+        elif hasattr(value, "to_list"):
+            value = value.to_list()
+        target[key] = value
+
+
+def _instance_on_points_node_group(instance_obj):
+    """Create a Geometry Nodes group instancing an object on every point
+
+    Rotation and scale are read from the ``instance_rotation`` and
+    ``instance_scale`` point attributes.
+    """
+    group = bpy.data.node_groups.new(f"{instance_obj.name}_instance_on_points", 'GeometryNodeTree')
+    group.interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    group.interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes = group.nodes
+    links = group.links
+
+    group_input = nodes.new('NodeGroupInput')
+    group_input.location = (-600, 0)
+    group_output = nodes.new('NodeGroupOutput')
+    group_output.location = (300, 0)
+
+    object_info = nodes.new('GeometryNodeObjectInfo')
+    object_info.location = (-400, -150)
+    object_info.inputs["Object"].default_value = instance_obj
+    object_info.inputs["As Instance"].default_value = True
+
+    rotation = nodes.new('GeometryNodeInputNamedAttribute')
+    rotation.location = (-400, -350)
+    rotation.data_type = 'QUATERNION'
+    rotation.inputs["Name"].default_value = "instance_rotation"
+
+    scale = nodes.new('GeometryNodeInputNamedAttribute')
+    scale.location = (-400, -500)
+    scale.data_type = 'FLOAT_VECTOR'
+    scale.inputs["Name"].default_value = "instance_scale"
+
+    instance = nodes.new('GeometryNodeInstanceOnPoints')
+    instance.location = (0, 0)
+
+    links.new(group_input.outputs["Geometry"], instance.inputs["Points"])
+    links.new(object_info.outputs["Geometry"], instance.inputs["Instance"])
+    links.new(rotation.outputs["Attribute"], instance.inputs["Rotation"])
+    links.new(scale.outputs["Attribute"], instance.inputs["Scale"])
+    links.new(instance.outputs["Instances"], group_output.inputs["Geometry"])
+
+    return group
+
+
+# Scene custom property holding the LOD levels baked over the frame range
+LOD_BAKE = "aot_lod_bake"
+
+
+class _LODInstances:
+    """Instances of an LOD template in a scene and the level each one shows
+
+    Instances are the scene objects using the template mesh or one of its
+    proxy meshes, the template object itself excluded. Their positions are
+    read once and bucketed into a grid, so an update measures camera
+    distances per cell, and only objects whose level changed are relinked.
+    Instances are assumed not to move; Update LODs picks up moved ones.
+    """
+
+    def __init__(self, scene, key):
+        nla_tool = scene.nla_strip_randomizer
+        template = nla_tool.lod_template
+        levels = sorted((level for level in nla_tool.lod_levels if level.mesh), key=lambda level: level.distance)
+
+        self.key = key
+        self.meshes = [template.data] + [level.mesh for level in levels]
+        self.thresholds = np.array([level.distance for level in levels], dtype=np.float64)
+
+        level_of = {}
+        for index, mesh in enumerate(self.meshes):
+            level_of.setdefault(mesh.as_pointer(), index)
+        self.objects = [
+            obj for obj in scene.objects
+            if obj is not template and obj.data is not None and obj.data.as_pointer() in level_of
+        ]
+        self.levels = np.array([level_of[obj.data.as_pointer()] for obj in self.objects], dtype=np.int8)
+
+        self.positions = _gather_world_matrices(self.objects)[:, :3, 3] if self.objects else np.empty((0, 3))
+        self.cells = core.lod_cells(self.positions, nla_tool.lod_cell_size)
+        self._baked = None
+
+    def levels_for_camera(self, camera_location):
+        return core.lod_levels(self.positions, camera_location, self.thresholds, self.cells)
+
+    def apply(self, levels):
+        """Relink the objects whose level changed; returns how many were relinked"""
+        changed = np.flatnonzero(levels != self.levels)
+        for index in changed.tolist():
+            self.objects[index].data = self.meshes[levels[index]]
+        self.levels[changed] = levels[changed]
+        return len(changed)
+
+    def baked_levels(self, bake, frame):
+        """Levels of every instance at a frame of a bake; unknown instances keep their level"""
+        if self._baked is None or self._baked[0] != bake["token"]:
+            lookup = {obj.name: index for index, obj in enumerate(self.objects)}
+            indices = np.array([lookup.get(name, -1) for name in bake["names"]], dtype=np.int64)
+            table = tuple(np.array(bake[name]) for name in ("initial", "offsets", "objects", "values"))
+            self._baked = (bake["token"], indices, table)
+
+        _, indices, table = self._baked
+        baked = core.lod_levels_at(*table, frame - bake["frame_start"])
+        levels = self.levels.copy()
+        found = indices >= 0
+        levels[indices[found]] = baked[found]
+        return levels
+
+
+class _LODSwitcher:
+    """Keeps the LOD instances of the current settings and relinks them on request"""
+
+    def __init__(self):
+        self.instances = None
+
+    def invalidate(self):
+        self.instances = None
+
+    @staticmethod
+    def ready(scene):
+        nla_tool = scene.nla_strip_randomizer
+        template = nla_tool.lod_template
+        return template is not None and template.type == 'MESH' and any(level.mesh for level in nla_tool.lod_levels)
+
+    @staticmethod
+    def _key(scene):
+        nla_tool = scene.nla_strip_randomizer
+        return (
+            scene.as_pointer(),
+            nla_tool.lod_template.as_pointer(),
+            nla_tool.lod_template.data.as_pointer(),
+            tuple((level.mesh.as_pointer() if level.mesh else 0, level.distance) for level in nla_tool.lod_levels),
+            nla_tool.lod_cell_size,
+        )
+
+    def instances_for(self, scene):
+        key = self._key(scene)
+        if self.instances is None or self.instances.key != key:
+            self.instances = _LODInstances(scene, key)
+        return self.instances
+
+    def update(self, scene, levels_for):
+        """Relink the instances to ``levels_for(instances)``; rebuilds once if objects were removed"""
+        try:
+            instances = self.instances_for(scene)
+            return instances.apply(levels_for(instances))
+        except ReferenceError:
+            self.invalidate()
+            instances = self.instances_for(scene)
+            return instances.apply(levels_for(instances))
+
+
+_lod_switcher = _LODSwitcher()
+
+
+@bpy.app.handlers.persistent
+def _update_live_lods(scene, depsgraph=None):
+    """Follow the camera after every frame change in Live mode"""
+    if scene.nla_strip_randomizer.lod_update_mode != 'LIVE' or scene.camera is None:
+        return
+    if _LODSwitcher.ready(scene):
+        camera_location = np.array(scene.camera.matrix_world.translation)
+        _lod_switcher.update(scene, lambda instances: instances.levels_for_camera(camera_location))
+
+
+@bpy.app.handlers.persistent
+def _apply_baked_lods(scene, depsgraph=None):
+    """Relink the baked levels of the new frame before it is evaluated, for playback and render"""
+    bake = scene.get(LOD_BAKE)
+    if scene.nla_strip_randomizer.lod_update_mode != 'BAKED' or not bake:
+        return
+    if _LODSwitcher.ready(scene):
+        frame = scene.frame_current
+        _lod_switcher.update(scene, lambda instances: instances.baked_levels(bake, frame))
+
+
+@bpy.app.handlers.persistent
+def _invalidate_lod_instances(*args):
+    """Find the instances again after a file load or undo replaced all data"""
+    _lod_switcher.invalidate()
+
+
+def _gather_emitters(context, nla_tool):
+    """Collect emitter positions in world space and their optional delays in frames"""
+    delay_name = nla_tool.emitter_delay_property
+
+    if nla_tool.emitter_source == 'COLLECTION':
+        collection = nla_tool.emitter_collection
+        emitters = list(collection.all_objects) if collection else []
+        points = _gather_world_matrices(emitters)[:, :3, 3]
+        delays = np.array(
+            [float(obj.get(delay_name, 0.0)) if delay_name else 0.0 for obj in emitters],
+            dtype=np.float64,
+        )
+        return _EmitterField(points, delays)
+
+    emitter_obj = nla_tool.emitter_object
+    if emitter_obj is None:
+        return _EmitterField(np.empty((0, 3)), np.empty(0))
+
+    # Evaluate the emitter so curves and modified meshes yield their vertices
+    evaluated = emitter_obj.evaluated_get(context.evaluated_depsgraph_get())
+    mesh = evaluated.to_mesh()
+    try:
+        count = len(mesh.vertices)
+        co = np.empty(count * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+
+        delays = np.zeros(count, dtype=np.float32)
+        attribute = mesh.attributes.get(delay_name) if delay_name else None
+        if attribute is not None and attribute.domain == 'POINT' and attribute.data_type == 'FLOAT':
+            attribute.data.foreach_get("value", delays)
+    finally:
+        evaluated.to_mesh_clear()
+
+    matrix = np.array(emitter_obj.matrix_world, dtype=np.float64)
+    points = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return _EmitterField(points, delays.astype(np.float64))
+
+
+class _EmitterField:
+    """Emitter points indexed once in a KD-tree for nearest-emitter lookups
+
+    Each lookup costs O(log M) instead of a scan over all M emitters, and the
+    tree is reused for every chunk of objects queried against it.
+    """
+
+    def __init__(self, points, delays):
+        self.points = points
+        self.delays = delays
+        self.tree = None
+        if len(points):
+            self.tree = mathutils.kdtree.KDTree(len(points))
+            for index, co in enumerate(points.tolist()):
+                self.tree.insert(co, index)
+            self.tree.balance()
+
+    def __len__(self):
+        return len(self.points)
+
+    def offsets(self, locations, multiplier):
+        """Offset every location by its distance to the nearest emitter plus that emitter's delay"""
+        nearest = np.empty(len(locations), dtype=np.int64)
+        distances = np.empty(len(locations), dtype=np.float64)
+        for index, co in enumerate(locations.tolist()):
+            _, nearest[index], distances[index] = self.tree.find(co)
+
+        return distances * multiplier + self.delays[nearest]
+
+
+def _settings_digest(nla_tool, cursor_location, emitters):
+    """Hash every setting that influences the computed offsets and scales"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((
+        nla_tool.offset_method,
+        nla_tool.base_start_frame,
+        nla_tool.strip_layout,
+        nla_tool.scale_min,
+        nla_tool.scale_max,
+        nla_tool.random_seed,
+    )).encode())
+
+    if nla_tool.offset_method == 'RANDOM':
+        digest.update(repr(nla_tool.max_random_offset).encode())
+    elif nla_tool.offset_method == 'EXPRESSION':
+        digest.update(nla_tool.offset_expression.encode())
+    else:
+        digest.update(repr(nla_tool.offset_multiplier).encode())
+    digest.update(nla_tool.scale_expression.encode())
+    if nla_tool.offset_method in {'CURSOR', 'EXPRESSION'} or nla_tool.scale_expression.strip():
+        digest.update(repr(tuple(cursor_location)).encode())
+    if nla_tool.offset_method == 'EMITTERS':
+        digest.update(np.ascontiguousarray(emitters.points).tobytes())
+        digest.update(np.ascontiguousarray(emitters.delays).tobytes())
+
+    return digest.digest()
+
+
+def _strip_signatures(objects, locations, settings_digest, batch, values=None):
+    """Hash the inputs of every object: name, location, settings and strip layout
+
+    The strip layout covers the start, end and scale of every strip, so
+    strips moved or retimed since the last run are recomputed. ``batch``
+    holds the strips of ``objects``; ``values`` are (starts, ends, scales)
+    arrays to hash instead of the ones it read, such as the values read back
+    after a write.
+    """
+    starts, ends, scales = (batch.starts, batch.ends, batch.scales) if values is None else values
+    strip_counts = np.bincount(batch.strip_objects, minlength=len(objects))
+    bounds = np.concatenate([[0], np.cumsum(strip_counts)]).tolist()
+
+    signatures = []
+    for index, (obj, location) in enumerate(zip(objects, locations)):
+        digest = hashlib.blake2b(settings_digest, digest_size=16)
+        digest.update(obj.name.encode())
+        digest.update(location.tobytes())
+        for track in obj.animation_data.nla_tracks:
+            digest.update(track.name.encode())
+            digest.update(len(track.strips).to_bytes(4, "little"))
+        strip_slice = slice(bounds[index], bounds[index + 1])
+        for array in (starts, ends, scales):
+            digest.update(np.ascontiguousarray(array[strip_slice], dtype=np.float32).tobytes())
+        signatures.append(digest.hexdigest())
+    return signatures
+
+
+def _store_strip_cache(objects, signatures, offsets, batch, scales):
+    """Remember the inputs and results of the last run on every object"""
+    strip_counts = np.bincount(batch.strip_objects, minlength=len(objects))
+    per_object_scales = np.split(np.asarray(scales, dtype=np.float64), np.cumsum(strip_counts)[:-1])
+
+    for obj, signature, offset, object_scales in zip(objects, signatures, offsets.tolist(), per_object_scales):
+        obj[CACHE_SIGNATURE] = signature
+        obj[CACHE_OFFSET] = offset
+        obj[CACHE_SCALES] = object_scales.tolist()
+
+
+def _expression_variables(objects, indices, count, locations, keys, cursor_location, seed, properties):
+    """Per-object inputs of the offset and scale expressions, reading custom properties from the objects"""
+    values = {name: np.array([float(obj.get(name, 0.0)) for obj in objects]) for name in properties}
+    return core.expression_variables(locations, indices, count, keys, cursor_location, seed, values)
+
+
+def _compute_offsets(nla_tool, locations, keys, cursor_location=None, emitters=None, variables=None):
+    """Compute the offset in frames for every object in one pass"""
+    if nla_tool.offset_method == 'RANDOM':
+        return core.random_offsets(keys, nla_tool.max_random_offset)
+
+    if nla_tool.offset_method == 'EXPRESSION':
+        return core.compile_expression(nla_tool.offset_expression).evaluate(variables, len(keys))
+
+    if nla_tool.offset_method == 'EMITTERS':
+        return emitters.offsets(locations, nla_tool.offset_multiplier)
+
+    # 3D Cursor distance
+    return core.cursor_offsets(locations, cursor_location, nla_tool.offset_multiplier)
+
+
+def _compute_strip_layout(nla_tool, batch, offsets, keys, variables=None):
+    """Compute the new start and scale of every strip in a batch from the object offsets"""
+    # Apply random scale (absolute, not relative), drawn from each
+    # object's own stream after the value used for its offset
+    if nla_tool.scale_expression.strip():
+        scales = core.compile_expression(nla_tool.scale_expression).evaluate(
+            core.per_strip_variables(variables, batch.strip_objects, batch.strip_ordinals, keys), len(batch)
+        )
+        scales = np.clip(scales, 0.0001, 1000.0)
+    else:
+        scales = core.random_scales(
+            keys, batch.strip_objects, batch.strip_ordinals, nla_tool.scale_min, nla_tool.scale_max
+        )
+
+    # Apply absolute offset (not relative to current position); strips
+    # keep their duration as they move
+    anchors = nla_tool.base_start_frame + offsets[batch.strip_objects]
+    if nla_tool.strip_layout == 'SEQUENCE':
+        track_ids = np.repeat(np.arange(len(batch.tracks)), batch.counts)
+        starts = core.sequence_layout(track_ids, batch.starts, batch.ends, batch.scales, scales, anchors)
+    else:
+        starts = anchors
+
+    return starts, scales
+
+
+def _bake_layers(anim_data):
+    """Collect what the NLA stack of one object evaluates, bottom to top
+
+    Returns a list of layers ``(action, strip, low, high)``: the action, its
+    strip values (``None`` for the active action) and the scene frames the
+    layer covers, including hold extrapolation. Raises ``ValueError`` for
+    stacks a flat action cannot reproduce, such as blending or animated
+    influence.
+    """
+    if anim_data.use_tweak_mode:
+        raise ValueError("NLA is in tweak mode")
+
+    tracks = [track for track in anim_data.nla_tracks if not track.mute]
+    if any(track.is_solo for track in tracks):
+        tracks = [track for track in tracks if track.is_solo]
+
+    layers = []
+    for track in tracks:
+        strips = sorted((strip for strip in track.strips if not strip.mute), key=lambda strip: strip.frame_start)
+        for index, strip in enumerate(strips):
+            if strip.type != 'CLIP' or strip.action is None:
+                raise ValueError(f"strip '{strip.name}' is not an action clip")
+            if strip.blend_type != 'REPLACE':
+                raise ValueError(f"strip '{strip.name}' uses {strip.blend_type.lower()} blending")
+            if strip.use_animated_influence or strip.use_animated_time:
+                raise ValueError(f"strip '{strip.name}' has animated influence or time")
+            if strip.blend_in > 0.0 or strip.blend_out > 0.0:
+                raise ValueError(f"strip '{strip.name}' blends in or out")
+
+            low = strip.frame_start
+            high = strip.frame_end
+            if strip.extrapolation == 'HOLD' and index == 0:
+                low = -np.inf
+            if strip.extrapolation in {'HOLD', 'HOLD_FORWARD'}:
+                high = strips[index + 1].frame_start if index + 1 < len(strips) else np.inf
+
+            values = {
+                "frame_start": strip.frame_start,
+                "frame_end": strip.frame_end,
+                "action_frame_start": strip.action_frame_start,
+                "action_frame_end": strip.action_frame_end,
+                "scale": strip.scale,
+                "repeat": strip.repeat,
+                "reverse": strip.use_reverse,
+            }
+            layers.append((strip.action, values, low, high))
+
+    # The active action is evaluated on top of the NLA stack
+    if anim_data.action is not None:
+        if anim_data.action_blend_type != 'REPLACE' or anim_data.action_influence < 1.0:
+            raise ValueError("the active action is blended over the NLA")
+        layers.append((anim_data.action, None, -np.inf, np.inf))
+
+    return layers
+
+
+def _bake_sample_times(layers, step):
+    """Frames to sample: every step over the strips' range plus each strip boundary"""
+    strips = [strip for _, strip, _, _ in layers if strip is not None]
+    if strips:
+        boundaries = np.array([[strip["frame_start"], strip["frame_end"]] for strip in strips]).ravel()
+    else:
+        boundaries = np.array([frame for action, _, _, _ in layers for frame in action.frame_range])
+
+    first = np.floor(boundaries.min())
+    last = np.ceil(boundaries.max())
+    return np.union1d(np.arange(first, last + step, step), boundaries)
+
+
+def _bake_object_action(obj, step):
+    """Resample the NLA result of one object into a new flat action
+
+    For every animated channel each sample frame is assigned to the topmost
+    layer covering it, scene frames are mapped to action frames per layer in
+    one vectorized pass, and the keys of every new F-Curve are written in
+    bulk. Returns the new action and its number of keys.
+    """
+    layers = _bake_layers(obj.animation_data)
+    if not layers:
+        raise ValueError("nothing to bake")
+
+    times = _bake_sample_times(layers, step)
+
+    # Source F-Curves of every channel, per layer
+    channels = {}
+    for layer_index, (action, _, _, _) in enumerate(layers):
+        for fcurve in action.fcurves:
+            if fcurve.mute:
+                continue
+            key = (fcurve.data_path, fcurve.array_index)
+            channels.setdefault(key, {})[layer_index] = fcurve
+
+    # Action frame of every sample, per layer
+    covered = []
+    action_times = []
+    for action, strip, low, high in layers:
+        covered.append((times >= low) & (times <= high))
+        action_times.append(times if strip is None else core.strip_action_times(times, strip))
+
+    baked = bpy.data.actions.new(f"{obj.name}_baked")
+    key_count = 0
+    for (data_path, array_index), fcurves in channels.items():
+        # Upper layers replace lower ones wherever they cover the frame
+        winner = np.full(len(times), -1)
+        for layer_index in fcurves:
+            winner[covered[layer_index]] = layer_index
+
+        keyed = winner >= 0
+        if not keyed.any():
+            continue
+
+        values = np.empty(len(times))
+        for layer_index, fcurve in fcurves.items():
+            mask = winner == layer_index
+            evaluate = fcurve.evaluate
+            values[mask] = [evaluate(frame) for frame in action_times[layer_index][mask].tolist()]
+
+        source = next(iter(fcurves.values()))
+        group = source.group.name if source.group else ""
+        fcurve = baked.fcurves.new(data_path=data_path, index=array_index, action_group=group)
+        fcurve.keyframe_points.add(int(keyed.sum()))
+        points = np.column_stack([times[keyed], values[keyed]]).astype(np.float32)
+        fcurve.keyframe_points.foreach_set("co", points.ravel())
+        fcurve.update()
+        key_count += int(keyed.sum())
+
+    return baked, key_count
+
+
+def _action_fingerprint(action):
+    """Hash the F-Curve data of an action, or return ``None`` if it cannot be compared
+
+    Keyframe arrays are read in bulk and hashed per F-Curve, in data path
+    order, together with the settings that change how the curve evaluates.
+    Actions with F-Curve modifiers are left alone.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((action.use_frame_range, tuple(action.frame_range), action.use_cyclic)).encode())
+
+    fcurves = sorted(action.fcurves, key=lambda fcurve: (fcurve.data_path, fcurve.array_index))
+    for fcurve in fcurves:
+        if fcurve.modifiers:
+            return None
+
+        count = len(fcurve.keyframe_points)
+        digest.update(repr((
+            fcurve.data_path, fcurve.array_index, count, fcurve.extrapolation, fcurve.mute,
+        )).encode())
+
+        for attribute in ("co", "handle_left", "handle_right"):
+            values = np.empty(count * 2, dtype=np.float32)
+            fcurve.keyframe_points.foreach_get(attribute, values)
+            digest.update(values.tobytes())
+        for attribute in ("interpolation", "easing", "handle_left_type", "handle_right_type"):
+            values = np.empty(count, dtype=np.int32)
+            fcurve.keyframe_points.foreach_get(attribute, values)
+            digest.update(values.tobytes())
+
+    return digest.digest()
+
+
+def _remap_action_users(replacements):
+    """Point every NLA strip and active action using a duplicate at its canonical action
+
+    ``replacements`` maps the pointer of each duplicate to its canonical
+    action. Users found through ``bpy.data.user_map`` in a single scan are
+    repointed directly; anything else still holding a duplicate (drivers,
+    constraints) falls back to ``user_remap``.
+    """
+    duplicates = [action for action in bpy.data.actions if action.as_pointer() in replacements]
+    user_ids = set()
+    for users in bpy.data.user_map(subset=duplicates).values():
+        user_ids.update(users)
+
+    for user_id in user_ids:
+        anim_data = getattr(user_id, "animation_data", None)
+        if anim_data is None:
+            continue
+        if anim_data.action is not None and anim_data.action.as_pointer() in replacements:
+            anim_data.action = replacements[anim_data.action.as_pointer()]
+        for track in anim_data.nla_tracks:
+            for strip in track.strips:
+                if strip.action is not None and strip.action.as_pointer() in replacements:
+                    strip.action = replacements[strip.action.as_pointer()]
+
+    for action in duplicates:
+        if action.users - int(action.use_fake_user) > 0:
+            action.user_remap(replacements[action.as_pointer()])
+
+    return duplicates
+
+
+# Components and foreach_get key of every attribute data type the mesh fingerprint reads
+_ATTRIBUTE_LAYOUTS = {
+    'FLOAT': (1, "value", np.float32),
+    'INT': (1, "value", np.int32),
+    'INT8': (1, "value", np.int32),
+    'BOOLEAN': (1, "value", bool),
+    'FLOAT2': (2, "vector", np.float32),
+    'INT32_2D': (2, "value", np.int32),
+    'FLOAT_VECTOR': (3, "vector", np.float32),
+    'FLOAT_COLOR': (4, "color", np.float32),
+    'BYTE_COLOR': (4, "color", np.float32),
+    'QUATERNION': (4, "value", np.float32),
+    'FLOAT4X4': (16, "value", np.float32),
+}
+
+
+def _mesh_fingerprint(mesh, tolerance=0.0):
+    """Hash the geometry of a mesh, or return ``None`` if it cannot be shared safely
+
+    Vertex positions, edges, face corners and every named attribute (UVs,
+    material indices, smoothing, colors...) are read in bulk. With a
+    ``tolerance`` the positions are snapped to a grid of that size first, so
+    meshes that differ by less than it usually hash the same.
+    """
+    if mesh.shape_keys is not None or mesh.has_custom_normals:
+        return None
+
+    digest = hashlib.blake2b(digest_size=16)
+    vertex_count = len(mesh.vertices)
+    edge_count = len(mesh.edges)
+    loop_count = len(mesh.loops)
+    face_count = len(mesh.polygons)
+    digest.update(repr((vertex_count, edge_count, loop_count, face_count)).encode())
+    digest.update(repr([material.as_pointer() if material else 0 for material in mesh.materials]).encode())
+
+    positions = np.empty(vertex_count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", positions)
+    if tolerance > 0.0:
+        digest.update(np.round(positions / tolerance).astype(np.int64).tobytes())
+    else:
+        digest.update(positions.tobytes())
+
+    for collection, attribute, count in (
+        (mesh.edges, "vertices", edge_count * 2),
+        (mesh.loops, "vertex_index", loop_count),
+        (mesh.polygons, "loop_start", face_count),
+    ):
+        values = np.empty(count, dtype=np.int32)
+        collection.foreach_get(attribute, values)
+        digest.update(values.tobytes())
+
+    # Internal attributes start with a dot (selection, hiding) and topology was hashed above
+    attributes = sorted(
+        (attribute for attribute in mesh.attributes if not attribute.name.startswith(".") and attribute.name != "position"),
+        key=lambda attribute: attribute.name,
+    )
+    for attribute in attributes:
+        layout = _ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+        if layout is None:
+            return None
+        components, key, dtype = layout
+        values = np.empty(len(attribute.data) * components, dtype=dtype)
+        attribute.data.foreach_get(key, values)
+        digest.update(repr((attribute.name, attribute.domain, attribute.data_type)).encode())
+        digest.update(values.tobytes())
+
+    return digest.digest()
+
+
+# Storage size of one attribute value in bytes, per attribute data type
+_ATTRIBUTE_BYTES = {
+    'FLOAT': 4, 'INT': 4, 'INT8': 1, 'BOOLEAN': 1, 'FLOAT2': 8, 'INT32_2D': 8, 'INT16_2D': 4,
+    'FLOAT_VECTOR': 12, 'FLOAT_COLOR': 16, 'BYTE_COLOR': 4, 'QUATERNION': 16, 'FLOAT4X4': 64,
+}
+
+# Approximate size in bytes of Blender's fixed structs, for the footprint estimate
+_STRUCT_BYTES = {
+    "mesh": 1024,
+    "action": 512,
+    "fcurve": 256,
+    # BezTriple: control points, handles and interpolation settings
+    "keyframe": 72,
+    "object": 1536,
+    "nla_track": 128,
+    "nla_strip": 320,
+}
+
+
+def _mesh_bytes(mesh):
+    """Estimated size of a mesh: topology arrays, named attributes and shape keys"""
+    domains = {
+        'POINT': len(mesh.vertices), 'EDGE': len(mesh.edges),
+        'CORNER': len(mesh.loops), 'FACE': len(mesh.polygons),
+    }
+    # Positions, edge vertices, corner vertices and edges, face offsets
+    total = _STRUCT_BYTES["mesh"] + domains['POINT'] * 12 + domains['EDGE'] * 8
+    total += domains['CORNER'] * 8 + (domains['FACE'] + 1) * 4
+
+    for attribute in mesh.attributes:
+        if attribute.name.startswith(".") or attribute.name == "position":
+            continue
+        total += domains.get(attribute.domain, 0) * _ATTRIBUTE_BYTES.get(attribute.data_type, 0)
+
+    if mesh.shape_keys is not None:
+        total += len(mesh.shape_keys.key_blocks) * domains['POINT'] * 12
+    return total
+
+
+def _id_users(collection):
+    """Real and fake user counts of every datablock in a bpy.data collection, read in bulk"""
+    users = np.empty(len(collection), dtype=np.int32)
+    fake_users = np.empty(len(collection), dtype=bool)
+    collection.foreach_get("users", users)
+    collection.foreach_get("use_fake_user", fake_users)
+    return users, fake_users
+
+
+def _footprint_snapshot():
+    """Estimated bytes, users and orphans of the meshes, actions and objects in the file"""
+    meshes = bpy.data.meshes
+    mesh_elements = np.array(
+        [(len(mesh.vertices), len(mesh.polygons)) for mesh in meshes], dtype=np.int64
+    ).reshape(-1, 2)
+
+    actions = bpy.data.actions
+    keyframes = np.array(
+        [sum(len(fcurve.keyframe_points) for fcurve in action.fcurves) for action in actions], dtype=np.int64
+    )
+    fcurves = np.array([len(action.fcurves) for action in actions], dtype=np.int64)
+    action_sizes = _STRUCT_BYTES["action"] + fcurves * _STRUCT_BYTES["fcurve"] + keyframes * _STRUCT_BYTES["keyframe"]
+
+    objects = bpy.data.objects
+    nla = np.array([
+        (len(obj.animation_data.nla_tracks), sum(len(track.strips) for track in obj.animation_data.nla_tracks))
+        if obj.animation_data else (0, 0)
+        for obj in objects
+    ], dtype=np.int64).reshape(-1, 2)
+    object_sizes = _STRUCT_BYTES["object"] + nla[:, 0] * _STRUCT_BYTES["nla_track"] + nla[:, 1] * _STRUCT_BYTES["nla_strip"]
+
+    return {
+        "meshes": core.footprint_summary(
+            [_mesh_bytes(mesh) for mesh in meshes], *_id_users(meshes),
+            vertices=mesh_elements[:, 0], faces=mesh_elements[:, 1],
+        ),
+        "actions": core.footprint_summary(action_sizes, *_id_users(actions), fcurves=fcurves, keyframes=keyframes),
+        "objects": core.footprint_summary(object_sizes, *_id_users(objects), strips=nla[:, 1]),
+    }
+
+
+# Footprint before and after the last run of each operator, shown in the panel and exported as JSON
+_footprint_results = {}
+
+
+def _nla_cost_features(obj):
+    """Describe the NLA stack of one object as (tracks, strips, fcurves, instanced)
+
+    Muted tracks and strips are not evaluated and are left out. The F-Curve
+    count covers the actions of every strip plus the active action.
+    """
+    anim_data = obj.animation_data
+    tracks = [track for track in anim_data.nla_tracks if not track.mute]
+    strips = [strip for track in tracks for strip in track.strips if not strip.mute]
+    actions = [strip.action for strip in strips if strip.action is not None]
+    if anim_data.action is not None:
+        actions.append(anim_data.action)
+
+    # Objects sharing their data with others, or instancing a collection
+    instanced = (obj.data is not None and obj.data.users > 1) or obj.instance_type == 'COLLECTION'
+    return len(tracks), len(strips), sum(len(action.fcurves) for action in actions), int(instanced)
+
+
+def _time_frame_range(scene, frames, repeats):
+    """Best wall time over ``repeats`` passes of evaluating every frame"""
+    # Warm up on another frame so relation rebuilds are not timed and the first frame changes
+    scene.frame_set(frames[-1])
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for frame in frames:
+            scene.frame_set(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _time_frame_range_without_nla(scene, frames, repeats, objects):
+    """Time the frame range with NLA evaluation turned off on some objects"""
+    anim_datas = [obj.animation_data for obj in objects]
+    states = [anim_data.use_nla for anim_data in anim_datas]
+    try:
+        for anim_data in anim_datas:
+            anim_data.use_nla = False
+        return _time_frame_range(scene, frames, repeats)
+    finally:
+        for anim_data, state in zip(anim_datas, states):
+            anim_data.use_nla = state
+
+
+# Result of the last NLA cost analysis, shown in the panel and exported as JSON
+_nla_cost_report = {}
+
+
+class _OperatorProfile:
+    """Phase timings, counters and an optional cProfile run for one operator call
+
+    When profiling is disabled every method is a cheap no-op, so operators can
+    be instrumented unconditionally.
+    """
+
+    def __init__(self, operator_name, nla_tool):
+        self.operator_name = operator_name
+        self.enabled = nla_tool.use_profiling
+        self.log_path = _profile_log_path(nla_tool)
+        self.phases = {}
+        self.counts = {}
+        self.result = None
+        self.footprint = None
+        self._profiler = cProfile.Profile() if self.enabled and nla_tool.use_cprofile else None
+        self._footprint_before = None
+        self._use_footprint = nla_tool.use_footprint
+        self._start = 0.0
+
+    def __enter__(self):
+        # The snapshot is taken outside the timed span
+        if self._use_footprint:
+            self._footprint_before = _footprint_snapshot()
+        self._start = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._profiler is not None:
+            self._profiler.disable()
+        total = time.perf_counter() - self._start
+        if self._footprint_before is not None:
+            self._record_footprint()
+        if self.enabled:
+            self._finish(total)
+        return False
+
+    def _record_footprint(self):
+        after = _footprint_snapshot()
+        self.footprint = core.footprint_delta(self._footprint_before, after)
+        _footprint_results[self.operator_name] = {
+            "operator": self.operator_name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "before": self._footprint_before,
+            "after": after,
+            "delta": self.footprint,
+        }
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Time a named phase; repeated phases accumulate"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, **counts):
+        """Add to the number of objects, tracks, strips, ... touched"""
+        if self.enabled:
+            for name, value in counts.items():
+                self.counts[name] = self.counts.get(name, 0) + value
+
+    def _finish(self, total):
+        record = {
+            "operator": self.operator_name,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "file": bpy.data.filepath,
+            "total": total,
+            "phases": self.phases,
+            "counts": self.counts,
+            "result": self.result,
+        }
+        if self.footprint is not None:
+            record["footprint"] = self.footprint
+
+        log_dir = os.path.dirname(self.log_path)
+        if self._profiler is not None:
+            stats_name = f"{self.operator_name.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+            record["cprofile"] = os.path.join(log_dir, stats_name)
+
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            if self._profiler is not None:
+                self._profiler.dump_stats(record["cprofile"])
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Animation Object Tools: could not write profile log: {e}")
+
+        _profile_results[self.operator_name] = record
+
+
+# Last profile record per operator, shown in the Profiling sub-panel
+_profile_results = {}
+
+
+def _profile_log_path(nla_tool):
+    if nla_tool.profile_log_path:
+        return bpy.path.abspath(nla_tool.profile_log_path)
+    return os.path.join(tempfile.gettempdir(), "animation_object_tools_profile.jsonl")
+
+
+class _ProfiledOperator:
+    """Mixin running ``run(context, profile)`` under an operator profile"""
+
+    def execute(self, context):
+        with _OperatorProfile(self.bl_idname, context.scene.nla_strip_randomizer) as profile:
+            result = self.run(context, profile)
+            profile.result = sorted(result)
+        return result
+
+
+class _ChunkedOperator(_ProfiledOperator):
+    """Mixin splitting an operator into prepare / process_chunk / finish steps
+
+    ``prepare(context, profile)`` returns the list of work items (or a result
+    set to stop early), ``process_chunk(context, profile, items)`` handles a
+    slice of them and ``finish(context, profile, cancelled)`` reports and
+    returns the operator result.
+
+    ``execute`` processes everything at once. When modal execution is enabled
+    ``invoke`` instead processes the items from a timer in chunks sized to the
+    per-step time budget, with a progress bar and Esc to cancel. Every chunk
+    leaves the objects it touched complete, so cancelling keeps a consistent
+    scene.
+    """
+
+    # Events still handled by Blender while a modal run is in progress
+    _PASS_THROUGH_EVENTS = {
+        'MOUSEMOVE', 'INBETWEEN_MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE',
+        'TRACKPADPAN', 'TRACKPADZOOM', 'NDOF_MOTION',
+    }
+
+    # Items in the first modal chunk, before any step has been timed
+    _first_chunk_size = 64
+
+    def run(self, context, profile):
+        items = self.prepare(context, profile)
+        if isinstance(items, set):
+            return items
+
+        self.process_chunk(context, profile, items)
+        return self.finish(context, profile, cancelled=False)
+
+    def invoke(self, context, event):
+        nla_tool = context.scene.nla_strip_randomizer
+        if not nla_tool.use_modal:
+            return self.execute(context)
+
+        self._profile = _OperatorProfile(self.bl_idname, nla_tool).__enter__()
+        items = self.prepare(context, self._profile)
+        if isinstance(items, set):
+            return self._close_profile(items)
+
+        self._items = items
+        self._done = 0
+        self._chunk_size = self._first_chunk_size
+        self._budget = nla_tool.modal_time_budget / 1000.0
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.progress_begin(0, max(len(items), 1))
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            return self._end_modal(context, cancelled=True)
+        if event.type != 'TIMER' or event.timer is not self._timer:
+            return {'PASS_THROUGH'} if event.type in self._PASS_THROUGH_EVENTS else {'RUNNING_MODAL'}
+
+        chunk = self._items[self._done:self._done + self._chunk_size]
+        start = time.perf_counter()
+        self.process_chunk(context, self._profile, chunk)
+        elapsed = time.perf_counter() - start
+        self._done += len(chunk)
+
+        # Size the next chunk so it fits the time budget, growing at most 4x per step
+        if elapsed > 0.0:
+            fitting = int(len(chunk) * self._budget / elapsed)
+            self._chunk_size = max(1, min(fitting, self._chunk_size * 4))
+        else:
+            self._chunk_size *= 4
+
+        context.window_manager.progress_update(self._done)
+        context.workspace.status_text_set(
+            f"{self.bl_label}: {self._done} / {len(self._items)} (Esc to cancel)"
+        )
+
+        if self._done >= len(self._items):
+            return self._end_modal(context, cancelled=False)
+        return {'RUNNING_MODAL'}
+
+    def _end_modal(self, context, cancelled):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+        context.workspace.status_text_set(None)
+
+        return self._close_profile(self.finish(context, self._profile, cancelled))
+
+    def _close_profile(self, result):
+        self._profile.result = sorted(result)
+        self._profile.__exit__(None, None, None)
+        return result
+
+
+class NLA_OT_apply_offset_and_random_scale(_ChunkedOperator, Operator):
     """Apply absolute offset based on distance to 3D cursor or random, and randomize strip scale"""
     bl_idname = "nla.apply_offset_and_random_scale"
     bl_label = "Apply Offset & Random Scale"
-    bl_options = {'REGISTER', 'UNDO'}
+    # Undo is pushed by _commit_undo(), through the strip journal or a global undo step
+    bl_options = {'REGISTER'}
     
-    def execute(self, context):
+    def prepare(self, context, profile):
         scene = context.scene
         nla_tool = scene.nla_strip_randomizer
         
-        # Get selected objects
-        selected_objects = [obj for obj in bpy.context.selected_objects if obj.animation_data]
+        # Get the target objects (selection, scene or collection)
+        selected_objects = _resolve_animated_targets(context, nla_tool)
         
         if not selected_objects:
-            self.report({'WARNING'}, "No objects with animation data selected")
+            if nla_tool.target_scope == 'SELECTED':
+                self.report({'WARNING'}, "No objects with animation data selected")
+            else:
+                self.report({'WARNING'}, "No animated objects found in the target scope")
             return {'CANCELLED'}
         
-        for obj in selected_objects:
-            # Calculate offset frames based on method
-            if nla_tool.offset_method == 'RANDOM':
-                # Random offset
-                offset_frames = random.uniform(0, nla_tool.max_random_offset)
+        # Step 1: Gather object locations and hash the inputs of every object
+        with profile.phase("gather"):
+            emitters = None
+            if nla_tool.offset_method == 'EMITTERS':
+                emitters = _gather_emitters(context, nla_tool)
+                if len(emitters) == 0:
+                    self.report({'WARNING'}, "No emitter points found")
+                    return {'CANCELLED'}
+
+            expressions = []
+            try:
+                if nla_tool.offset_method == 'EXPRESSION':
+                    expressions.append(core.compile_expression(nla_tool.offset_expression))
+                if nla_tool.scale_expression.strip():
+                    expressions.append(core.compile_expression(nla_tool.scale_expression))
+            except ValueError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
+
+            if nla_tool.offset_method == 'RANDOM' and not expressions:
+                locations = np.zeros((len(selected_objects), 3))
             else:
-                # 3D Cursor distance
-                cursor_location = scene.cursor.location
-                distance = (obj.location - cursor_location).length
-                offset_frames = distance * nla_tool.offset_multiplier
-            
-            # Get animation data
+                locations = _gather_locations(selected_objects)
+
+            settings_digest = _settings_digest(nla_tool, scene.cursor.location, emitters)
+
+            # Only recompute objects whose inputs changed since the last run; the
+            # signatures do not cover custom properties or an object's place in the targets
+            targets = list(range(len(selected_objects)))
+            uses_untracked_inputs = any(expression.names & {"index", "count", "prop"} for expression in expressions)
+            if nla_tool.use_incremental and not uses_untracked_inputs:
+                signatures = _strip_signatures(
+                    selected_objects, locations, settings_digest, _StripBatch(selected_objects)
+                )
+                targets = [
+                    index for index, (obj, signature) in enumerate(zip(selected_objects, signatures))
+                    if obj.get(CACHE_SIGNATURE) != signature
+                ]
+                if not targets:
+                    self.report({'INFO'}, f"All {len(selected_objects)} objects are up to date")
+                    return {'FINISHED'}
+
+        self._selected_objects = selected_objects
+        self._locations = locations
+        self._settings_digest = settings_digest
+        self._emitters = emitters
+        self._expressions = expressions
+        self._updated_count = 0
+        self._journal_parts = []
+        return targets
+
+    def process_chunk(self, context, profile, items):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+
+        # Step 2: Gather strip data in bulk
+        with profile.phase("gather"):
+            objects = [self._selected_objects[index] for index in items]
+            locations = self._locations[items]
+            keys = core.object_keys([obj.name for obj in objects], nla_tool.random_seed)
+            batch = _StripBatch(objects)
+
+        profile.count(objects=len(objects), tracks=len(batch.tracks), strips=len(batch))
+
+        # Step 3: Compute every offset and scale in one vectorized pass
+        with profile.phase("compute"):
+            variables = None
+            if self._expressions:
+                properties = set().union(*(expression.properties for expression in self._expressions))
+                variables = _expression_variables(
+                    objects, items, len(self._selected_objects), locations, keys,
+                    scene.cursor.location, nla_tool.random_seed, properties,
+                )
+
+            offsets = _compute_offsets(nla_tool, locations, keys, scene.cursor.location, self._emitters, variables)
+            starts, scales = _compute_strip_layout(nla_tool, batch, offsets, keys, variables)
+
+        # Step 4: Write the results back in bulk and cache them on the objects;
+        # the signatures hash what Blender actually stored, after any clamping
+        with profile.phase("write_back"):
+            batch.write(starts, scales, sequential=nla_tool.strip_layout == 'SEQUENCE')
+            written = batch.read()
+            signatures = _strip_signatures(objects, locations, self._settings_digest, batch, written)
+            _store_strip_cache(objects, signatures, offsets, batch, scales)
+
+            if nla_tool.use_undo_journal:
+                self._journal_parts.append((batch, *written))
+
+        self._updated_count += len(objects)
+
+    def finish(self, context, profile, cancelled):
+        nla_tool = context.scene.nla_strip_randomizer
+        selected_count = len(self._selected_objects)
+
+        if self._updated_count:
+            self._commit_undo(nla_tool)
+
+        if cancelled:
+            self.report({'WARNING'}, f"Cancelled after updating {self._updated_count} of {selected_count} objects")
+            return {'FINISHED'}
+
+        if nla_tool.use_incremental:
+            self.report({'INFO'}, f"Updated {self._updated_count} of {selected_count} objects" + _undo_hint(nla_tool))
+            return {'FINISHED'}
+
+        self.report({'INFO'}, f"Applied offset and random scale to {selected_count} objects" + _undo_hint(nla_tool))
+        return {'FINISHED'}
+
+    def _commit_undo(self, nla_tool):
+        _commit_strip_undo(nla_tool, self.bl_label, self._journal_parts)
+        self._journal_parts = []
+
+
+class NLA_OT_preview_cursor_offset(Operator):
+    """Preview the cursor distance offsets live while moving the 3D cursor or editing the settings"""
+    bl_idname = "nla.preview_cursor_offset"
+    bl_label = "Live Cursor Preview"
+    # Undo is pushed on confirm, through the strip journal or a global undo step
+    bl_options = {'REGISTER'}
+
+    # Events still handled by Blender while the preview runs: view navigation,
+    # placing the cursor and editing the settings in the sidebar
+    _PASS_THROUGH_EVENTS = _ChunkedOperator._PASS_THROUGH_EVENTS | {'LEFTMOUSE', 'RIGHTMOUSE'}
+
+    _running = False
+
+    @classmethod
+    def poll(cls, context):
+        return not cls._running and context.scene.nla_strip_randomizer.offset_method == 'CURSOR'
+
+    def invoke(self, context, event):
+        nla_tool = context.scene.nla_strip_randomizer
+
+        # Cache positions, strip references and original strip values once
+        self._objects = _resolve_animated_targets(context, nla_tool)
+        if not self._objects:
+            self.report({'WARNING'}, "No animated objects found in the target scope")
+            return {'CANCELLED'}
+
+        self._locations = _gather_locations(self._objects)
+        self._batch = _StripBatch(self._objects)
+        self._inputs = None
+        self._offsets = None
+        self._scales = None
+        self._update_time = 0.0
+
+        try:
+            self._update(context)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(1.0 / 60.0, window=context.window)
+        wm.modal_handler_add(self)
+        NLA_OT_preview_cursor_offset._running = True
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        try:
+            return self._handle_event(context, event)
+        except Exception:
+            # Blender drops the modal handler on an error; stop the preview so it can be started again
+            self._stop(context)
+            raise
+
+    def _handle_event(self, context, event):
+        if event.type == 'ESC':
+            return self._end(context, confirmed=False)
+        if event.type in {'RET', 'NUMPAD_ENTER'} and event.value == 'PRESS':
+            # Settings changed since the last timer tick are applied before committing
+            try:
+                self._update(context)
+            except ValueError as e:
+                self.report({'ERROR'}, str(e))
+                return {'RUNNING_MODAL'}
+            return self._end(context, confirmed=True)
+
+        if event.type == 'TIMER' and event.timer is self._timer:
+            try:
+                self._update(context)
+            except ValueError as e:
+                # Typically a scale expression that is still being typed
+                context.workspace.status_text_set(f"{self.bl_label}: {e}")
+            except ReferenceError:
+                self.report({'WARNING'}, "Preview targets were removed, preview stopped")
+                return self._end(context, confirmed=None)
+            return {'RUNNING_MODAL'}
+
+        return {'PASS_THROUGH'} if event.type in self._PASS_THROUGH_EVENTS else {'RUNNING_MODAL'}
+
+    def _update(self, context):
+        """Recompute and write the strips if the cursor or a setting changed since the last update"""
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+        cursor_location = tuple(scene.cursor.location)
+        inputs = (
+            cursor_location, nla_tool.offset_multiplier, nla_tool.base_start_frame, nla_tool.strip_layout,
+            nla_tool.scale_min, nla_tool.scale_max, nla_tool.random_seed, nla_tool.scale_expression,
+        )
+        if inputs == self._inputs:
+            return
+
+        start = time.perf_counter()
+        keys = core.object_keys([obj.name for obj in self._objects], nla_tool.random_seed)
+        variables = None
+        if nla_tool.scale_expression.strip():
+            expression = core.compile_expression(nla_tool.scale_expression)
+            variables = _expression_variables(
+                self._objects, np.arange(len(self._objects)), len(self._objects), self._locations, keys,
+                cursor_location, nla_tool.random_seed, expression.properties,
+            )
+
+        offsets = core.cursor_offsets(self._locations, cursor_location, nla_tool.offset_multiplier)
+        starts, scales = _compute_strip_layout(nla_tool, self._batch, offsets, keys, variables)
+        self._batch.write(starts, scales, sequential=nla_tool.strip_layout == 'SEQUENCE')
+
+        self._inputs = inputs
+        self._offsets = offsets
+        self._scales = scales
+        self._update_time = time.perf_counter() - start
+
+        _tag_animation_editors(context)
+        context.workspace.status_text_set(
+            f"{self.bl_label}: {len(self._objects)} objects, {len(self._batch)} strips, "
+            f"{self._update_time * 1000.0:.1f} ms per update (Enter to confirm, Esc to cancel)"
+        )
+
+    def _stop(self, context):
+        """Remove the timer and status text and allow a new preview"""
+        NLA_OT_preview_cursor_offset._running = False
+        context.window_manager.event_timer_remove(self._timer)
+        context.workspace.status_text_set(None)
+
+    def _end(self, context, confirmed):
+        """Finish the preview; ``confirmed`` None stops it without touching the strips"""
+        self._stop(context)
+
+        if confirmed is None:
+            return {'CANCELLED'}
+
+        nla_tool = context.scene.nla_strip_randomizer
+        if not confirmed:
+            # Put the cached original values back
+            self._batch.write(self._batch.starts, self._batch.scales, sequential=True)
+            _tag_animation_editors(context)
+            return {'CANCELLED'}
+
+        # Commit the previewed layout as one undo step and cache it like an applied run
+        written = self._batch.read()
+        signatures = _strip_signatures(
+            self._objects, self._locations, _settings_digest(nla_tool, context.scene.cursor.location, None),
+            self._batch, written,
+        )
+        _store_strip_cache(self._objects, signatures, self._offsets, self._batch, self._scales)
+        parts = [(self._batch, *written)] if nla_tool.use_undo_journal else []
+        _commit_strip_undo(nla_tool, self.bl_label, parts)
+
+        self.report({'INFO'}, f"Applied cursor offset to {len(self._objects)} objects" + _undo_hint(nla_tool))
+        return {'FINISHED'}
+
+
+@bpy.app.handlers.persistent
+def _reset_cursor_preview(*args):
+    """Loading a file ends any running preview without calling its modal handler"""
+    NLA_OT_preview_cursor_offset._running = False
+
+
+def _tag_animation_editors(context):
+    """Redraw the editors showing strips, which do not follow foreach_set writes on their own"""
+    for area in context.screen.areas:
+        if area.type in {'NLA_EDITOR', 'DOPESHEET_EDITOR', 'GRAPH_EDITOR', 'VIEW_3D'}:
+            area.tag_redraw()
+
+
+class NLA_OT_strip_journal_undo(Operator):
+    """Undo the last strip layout change recorded in the strip journal"""
+    bl_idname = "nla.strip_journal_undo"
+    bl_label = "Undo Strip Layout"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _strip_journal.can_undo
+    
+    def execute(self, context):
+        entry, restored = _strip_journal.undo()
+        self.report({'INFO'}, f"Undid '{entry.label}' on {restored} track(s)")
+        return {'FINISHED'}
+
+
+class NLA_OT_strip_journal_redo(Operator):
+    """Redo the last strip layout change undone from the strip journal"""
+    bl_idname = "nla.strip_journal_redo"
+    bl_label = "Redo Strip Layout"
+    bl_options = {'REGISTER'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _strip_journal.can_redo
+    
+    def execute(self, context):
+        entry, restored = _strip_journal.redo()
+        self.report({'INFO'}, f"Redid '{entry.label}' on {restored} track(s)")
+        return {'FINISHED'}
+
+
+class NLA_OT_export_strip_layout(_ProfiledOperator, Operator, ExportHelper):
+    """Save the strip timing of the target objects to a compact binary file"""
+    bl_idname = "nla.export_strip_layout"
+    bl_label = "Export Strip Layout"
+    bl_options = {'REGISTER'}
+    
+    filename_ext = ".npz"
+    filter_glob: StringProperty(default="*.npz", options={'HIDDEN'})
+    
+    def run(self, context, profile):
+        nla_tool = context.scene.nla_strip_randomizer
+        objects = _resolve_animated_targets(context, nla_tool)
+        
+        if not objects:
+            self.report({'WARNING'}, "No animated objects found in the target scope")
+            return {'CANCELLED'}
+        
+        with profile.phase("gather"):
+            batch = _StripBatch(objects)
+        with profile.phase("save"):
+            _save_strip_layout(self.filepath, batch)
+        
+        profile.count(objects=len(objects), tracks=len(batch.tracks), strips=len(batch))
+        self.report({'INFO'}, f"Exported {len(batch)} strips of {len(objects)} objects")
+        return {'FINISHED'}
+
+
+class NLA_OT_import_strip_layout(_ProfiledOperator, Operator, ImportHelper):
+    """Apply a strip timing layout saved with Export Strip Layout, matching objects by name"""
+    bl_idname = "nla.import_strip_layout"
+    bl_label = "Import Strip Layout"
+    # Undo is pushed through the strip journal or a global undo step, like the randomizer
+    bl_options = {'REGISTER'}
+    
+    filename_ext = ".npz"
+    filter_glob: StringProperty(default="*.npz", options={'HIDDEN'})
+    
+    def run(self, context, profile):
+        nla_tool = context.scene.nla_strip_randomizer
+        
+        with profile.phase("load"):
+            try:
+                layout = _load_strip_layout(self.filepath)
+            except (OSError, ValueError, KeyError) as e:
+                self.report({'ERROR'}, f"Cannot read '{self.filepath}': {e}")
+                return {'CANCELLED'}
+        
+        # Step 1: Find the objects through a name index and read their strips in bulk
+        with profile.phase("gather"):
+            objects = list(_layout_objects(layout).values())
+            if not objects:
+                self.report({'WARNING'}, "No objects of the layout were found in this file")
+                return {'CANCELLED'}
+            batch = _StripBatch(objects)
+            names = [batch.objects[index].name for index in batch.track_objects.tolist()]
+            starts, scales, matched = core.match_layout(
+                layout, names, batch.track_indices, batch.counts, batch.starts, batch.scales
+            )
+        
+        if not matched:
+            self.report({'WARNING'}, "No tracks of the layout match this file")
+            return {'CANCELLED'}
+        
+        # Step 2: Write everything back in bulk; cached results no longer apply
+        with profile.phase("write_back"):
+            batch.write(starts, scales, sequential=True)
+            for obj in objects:
+                obj.pop(CACHE_SIGNATURE, None)
+        
+        _commit_strip_undo(nla_tool, self.bl_label, [(batch, *batch.read())])
+        
+        profile.count(objects=len(objects), tracks=matched, strips=len(batch))
+        skipped = len(layout["counts"]) - matched
+        self.report({'INFO'}, (
+            f"Imported the layout of {matched} tracks" + (f", skipped {skipped}" if skipped else "") + _undo_hint(nla_tool)
+        ))
+        return {'FINISHED'}
+
+
+class NLA_OT_bake_strips_to_action(_ChunkedOperator, Operator):
+    """Bake the NLA result of each target object into a single flat action for faster playback"""
+    bl_idname = "nla.bake_strips_to_action"
+    bl_label = "Bake Strips to Action"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def prepare(self, context, profile):
+        nla_tool = context.scene.nla_strip_randomizer
+        targets = _resolve_animated_targets(context, nla_tool)
+        
+        if not targets:
+            self.report({'WARNING'}, "No animated objects found in the target scope")
+            return {'CANCELLED'}
+        
+        self._targets = targets
+        self._baked_count = 0
+        self._skipped = []
+        return list(range(len(targets)))
+
+    def process_chunk(self, context, profile, items):
+        nla_tool = context.scene.nla_strip_randomizer
+
+        for index in items:
+            obj = self._targets[index]
             anim_data = obj.animation_data
-            if not anim_data or not anim_data.nla_tracks:
+
+            with profile.phase("bake"):
+                try:
+                    baked, key_count = _bake_object_action(obj, nla_tool.bake_step)
+                except ValueError as e:
+                    self._skipped.append(f"{obj.name}: {e}")
+                    continue
+
+            # The flat action replaces the whole stack
+            with profile.phase("write_back"):
+                anim_data.action = baked
+                if nla_tool.bake_clear_nla:
+                    for track in list(anim_data.nla_tracks):
+                        anim_data.nla_tracks.remove(track)
+                else:
+                    for track in anim_data.nla_tracks:
+                        track.mute = True
+
+            profile.count(objects=1, fcurves=len(baked.fcurves), keys=key_count)
+            self._baked_count += 1
+
+    def finish(self, context, profile, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, f"Cancelled after baking {self._baked_count} of {len(self._targets)} objects")
+        if self._baked_count > 0:
+            self.report({'INFO'}, f"Baked {self._baked_count} objects to flat actions")
+        if self._skipped:
+            self.report({'WARNING'}, f"Skipped {len(self._skipped)} objects: {'; '.join(self._skipped[:5])}")
+        
+        return {'FINISHED'}
+
+
+class NLA_OT_analyze_nla_cost(_ChunkedOperator, Operator):
+    """Step the frame range and attribute NLA evaluation time to the target objects"""
+    bl_idname = "nla.analyze_nla_cost"
+    bl_label = "Analyze NLA Cost"
+    bl_options = {'REGISTER'}
+
+    # Every item times the whole frame range, so start with a single one
+    _first_chunk_size = 1
+
+    # Work item standing for the baseline timing, which runs before the groups
+    _BASELINE = -1
+    
+    def prepare(self, context, profile):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+        targets = _resolve_animated_targets(context, nla_tool)
+        
+        if not targets:
+            self.report({'WARNING'}, "No animated objects found in the target scope")
+            return {'CANCELLED'}
+        
+        # Step 1: Describe every stack and group objects with the same layout;
+        # F-Curve counts are bucketed so the number of timed passes stays small
+        with profile.phase("gather"):
+            features = np.array([_nla_cost_features(obj) for obj in targets], dtype=np.int64).reshape(-1, 4)
+            grouped = features.copy()
+            grouped[:, 2] = core.count_buckets(features[:, 2])
+            group_ids, group_features, group_sizes = core.group_rows(grouped)
+        
+        self._frames = list(range(scene.frame_start, scene.frame_end + 1, nla_tool.cost_frame_step))
+        if not self._frames:
+            self.report({'WARNING'}, "The scene frame range is empty")
+            return {'CANCELLED'}
+        self._frame = (scene.frame_current, scene.frame_subframe)
+        
+        self._baseline = None
+        self._targets = targets
+        self._features = features
+        self._group_ids = group_ids
+        self._group_features = group_features
+        self._members = np.split(np.argsort(group_ids, kind="stable"), np.cumsum(group_sizes)[:-1])
+        self._ablated = np.full(len(group_sizes), np.nan)
+        # The baseline is timed as the first step, so a modal run can be cancelled during it
+        return [self._BASELINE] + list(range(len(group_sizes)))
+
+    def process_chunk(self, context, profile, items):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+
+        for group in items:
+            if group == self._BASELINE:
+                # Step 2: Time the frame range with everything evaluated
+                with profile.phase("baseline"):
+                    self._baseline = _time_frame_range(scene, self._frames, nla_tool.cost_repeats)
+                continue
+
+            # Step 3: Time the range again with the NLA of one group turned off
+            objects = [self._targets[index] for index in self._members[group].tolist()]
+            with profile.phase("ablate"):
+                self._ablated[group] = _time_frame_range_without_nla(
+                    scene, self._frames, nla_tool.cost_repeats, objects
+                )
+        profile.count(groups=len(items) - items.count(self._BASELINE))
+
+    def finish(self, context, profile, cancelled):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+        frame, subframe = self._frame
+        scene.frame_set(frame, subframe=subframe)
+
+        if self._baseline is None:
+            self.report({'WARNING'}, "Cancelled before the baseline was timed")
+            return {'CANCELLED'}
+
+        # Step 4: Share each group's cost among its objects by F-Curve count
+        per_frame = 1000.0 / len(self._frames)
+        group_costs, object_costs = core.attribute_costs(
+            self._group_ids, self._baseline, self._ablated, weights=self._features[:, 2] + 1
+        )
+        group_sizes = np.bincount(self._group_ids, minlength=len(group_costs))
+
+        def stack(values):
+            tracks, strips, fcurves, instanced = values
+            return {"tracks": tracks, "strips": strips, "fcurves": fcurves, "instanced": bool(instanced)}
+
+        groups = [
+            dict(stack(self._group_features[group].tolist()),
+                 objects=int(group_sizes[group]),
+                 ms_per_frame=float(group_costs[group]) * per_frame,
+                 ms_per_object_frame=float(group_costs[group]) * per_frame / group_sizes[group])
+            for group in core.top_indices(group_costs, len(group_costs)).tolist()
+        ]
+        top_objects = [
+            dict(stack(self._features[index].tolist()),
+                 name=self._targets[index].name,
+                 ms_per_frame=float(object_costs[index]) * per_frame)
+            for index in core.top_indices(object_costs, nla_tool.cost_top_count).tolist()
+        ]
+
+        _nla_cost_report.clear()
+        _nla_cost_report.update({
+            "file": bpy.data.filepath,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "frames": {"start": scene.frame_start, "end": scene.frame_end,
+                       "step": nla_tool.cost_frame_step, "count": len(self._frames)},
+            "repeats": nla_tool.cost_repeats,
+            "objects": len(self._targets),
+            "measured_groups": int(np.count_nonzero(~np.isnan(self._ablated))),
+            "total_groups": len(group_costs),
+            "ms_per_frame": self._baseline * per_frame,
+            "nla_ms_per_frame": float(np.nansum(group_costs)) * per_frame,
+            # Fcurve counts of groups are the lower bound of a power-of-two bucket
+            "groups": groups,
+            "top_objects": top_objects,
+        })
+
+        profile.count(objects=len(self._targets), frames=len(self._frames))
+        if cancelled:
+            self.report({'WARNING'}, (
+                f"Cancelled after timing {_nla_cost_report['measured_groups']} of {len(group_costs)} groups"
+            ))
+        self.report({'INFO'}, (
+            f"Playback {_nla_cost_report['ms_per_frame']:.2f} ms/frame, "
+            f"NLA of {len(self._targets)} objects {_nla_cost_report['nla_ms_per_frame']:.2f} ms/frame"
+        ))
+        return {'FINISHED'}
+
+
+class NLA_OT_export_nla_cost_report(_ProfiledOperator, Operator, ExportHelper):
+    """Save the result of the last NLA cost analysis as JSON"""
+    bl_idname = "nla.export_nla_cost_report"
+    bl_label = "Export NLA Cost Report"
+    bl_options = {'REGISTER'}
+    
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    
+    @classmethod
+    def poll(cls, context):
+        return bool(_nla_cost_report)
+    
+    def run(self, context, profile):
+        with profile.phase("save"):
+            try:
+                with open(self.filepath, "w") as f:
+                    json.dump(_nla_cost_report, f, indent=2)
+            except OSError as e:
+                self.report({'ERROR'}, f"Cannot write '{self.filepath}': {e}")
+                return {'CANCELLED'}
+        
+        self.report({'INFO'}, f"Exported the NLA cost report to {self.filepath}")
+        return {'FINISHED'}
+
+
+class NLA_OT_export_footprint_report(Operator, ExportHelper):
+    """Save the current memory footprint and the before/after footprint of each operator as JSON"""
+    bl_idname = "nla.export_footprint_report"
+    bl_label = "Export Footprint Report"
+    # Not profiled, so exporting does not replace a measured run with its own
+    bl_options = {'REGISTER'}
+    
+    filename_ext = ".json"
+    filter_glob: StringProperty(default="*.json", options={'HIDDEN'})
+    
+    def execute(self, context):
+        report = {
+            "file": bpy.data.filepath,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "addon_version": ".".join(str(part) for part in bl_info["version"]),
+            "current": _footprint_snapshot(),
+            "operators": _footprint_results,
+        }
+        try:
+            with open(self.filepath, "w") as f:
+                json.dump(report, f, indent=2)
+        except OSError as e:
+            self.report({'ERROR'}, f"Cannot write '{self.filepath}': {e}")
+            return {'CANCELLED'}
+        
+        self.report({'INFO'}, f"Exported the footprint report to {self.filepath}")
+        return {'FINISHED'}
+
+
+class NLA_OT_deduplicate_actions(_ChunkedOperator, Operator):
+    """Share one action between all identical actions and remove the duplicates"""
+    bl_idname = "nla.deduplicate_actions"
+    bl_label = "Deduplicate Actions"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def prepare(self, context, profile):
+        actions = list(bpy.data.actions)
+        if len(actions) < 2:
+            self.report({'INFO'}, "No duplicate actions found")
+            return {'FINISHED'}
+        
+        self._actions = actions
+        self._groups = {}
+        return list(range(len(actions)))
+
+    def process_chunk(self, context, profile, items):
+        # Step 1: Fingerprint the F-Curve data of every action
+        with profile.phase("hash"):
+            for index in items:
+                action = self._actions[index]
+                fingerprint = _action_fingerprint(action)
+                if fingerprint is not None:
+                    self._groups.setdefault(fingerprint, []).append(action)
+        profile.count(actions=len(items))
+
+    def finish(self, context, profile, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, "Cancelled before any action was deduplicated")
+            return {'CANCELLED'}
+
+        # Step 2: Keep the first action by name of every group
+        replacements = {}
+        for group in self._groups.values():
+            if len(group) < 2:
+                continue
+            group.sort(key=lambda action: action.name)
+            canonical = group[0]
+            for duplicate in group[1:]:
+                replacements[duplicate.as_pointer()] = canonical
+                if duplicate.use_fake_user:
+                    canonical.use_fake_user = True
+
+        if not replacements:
+            self.report({'INFO'}, "No duplicate actions found")
+            return {'FINISHED'}
+
+        # Step 3: Repoint strips and active actions, then remove all duplicates in one batch
+        with profile.phase("remap"):
+            duplicates = _remap_action_users(replacements)
+        with profile.phase("remove"):
+            canonical_count = len({action.as_pointer() for action in replacements.values()})
+            bpy.data.batch_remove(duplicates)
+
+        profile.count(removed=len(duplicates))
+        self.report({'INFO'}, f"Removed {len(duplicates)} duplicate actions, kept {canonical_count} shared actions")
+        return {'FINISHED'}
+
+
+class NLA_OT_deduplicate_meshes(_ChunkedOperator, Operator):
+    """Relink objects with identical mesh data to one shared mesh and remove the copies"""
+    bl_idname = "nla.deduplicate_meshes"
+    bl_label = "Deduplicate Meshes"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def prepare(self, context, profile):
+        # Vertex group weights live on the mesh but their names on the object, so leave those alone
+        objects = [
+            obj for obj in context.scene.objects
+            if obj.type == 'MESH' and obj.data is not None and not obj.vertex_groups
+        ]
+        meshes = list({obj.data.as_pointer(): obj.data for obj in objects}.values())
+        if len(meshes) < 2:
+            self.report({'INFO'}, "No duplicate meshes found")
+            return {'FINISHED'}
+        
+        self._objects = objects
+        self._meshes = meshes
+        self._groups = {}
+        return list(range(len(meshes)))
+
+    def process_chunk(self, context, profile, items):
+        tolerance = context.scene.nla_strip_randomizer.mesh_merge_tolerance
+
+        # Step 1: Fingerprint the geometry of every mesh
+        with profile.phase("hash"):
+            for index in items:
+                mesh = self._meshes[index]
+                fingerprint = _mesh_fingerprint(mesh, tolerance)
+                if fingerprint is not None:
+                    self._groups.setdefault(fingerprint, []).append(mesh)
+        profile.count(meshes=len(items))
+
+    def finish(self, context, profile, cancelled):
+        if cancelled:
+            self.report({'WARNING'}, "Cancelled before any mesh was relinked")
+            return {'CANCELLED'}
+
+        # Step 2: Keep the first mesh by name of every group
+        replacements = {}
+        for group in self._groups.values():
+            if len(group) < 2:
                 continue
-            
-            # Process each NLA track
-            for track in anim_data.nla_tracks:
-                if not track.strips:
-                    continue
-                
-                # Process each strip in the track
-                for strip in track.strips:
-                    # Store original duration
-                    original_duration = strip.frame_end_ui - strip.frame_start_ui
-                    
-                    # Apply absolute offset (not relative to current position)
-                    strip.frame_start_ui = nla_tool.base_start_frame + offset_frames
-                    
-                    # Maintain duration by adjusting end frame
-                    strip.frame_end_ui = strip.frame_start_ui + original_duration
-                    
-                    # Apply random scale (absolute, not relative)
-                    random_scale = random.uniform(nla_tool.scale_min, nla_tool.scale_max)
-                    strip.scale = random_scale
-        
-        self.report({'INFO'}, f"Applied offset and random scale to {len(selected_objects)} objects")
+            group.sort(key=lambda mesh: mesh.name)
+            for duplicate in group[1:]:
+                replacements[duplicate.as_pointer()] = group[0]
+
+        if not replacements:
+            self.report({'INFO'}, "No duplicate meshes found")
+            return {'FINISHED'}
+
+        # Step 3: Relink the objects; their transforms are untouched
+        with profile.phase("relink"):
+            relinked = 0
+            for obj in self._objects:
+                canonical = replacements.get(obj.data.as_pointer())
+                if canonical is not None:
+                    obj.data = canonical
+                    relinked += 1
+
+        # Step 4: Remove the meshes nothing uses anymore in one batch
+        with profile.phase("remove"):
+            orphaned = [
+                mesh for mesh in self._meshes
+                if mesh.as_pointer() in replacements and mesh.users - int(mesh.use_fake_user) == 0
+            ]
+            bpy.data.batch_remove(orphaned)
+
+        profile.count(objects=relinked, removed=len(orphaned))
+        self.report({'INFO'}, f"Relinked {relinked} objects to shared meshes, removed {len(orphaned)} meshes")
         return {'FINISHED'}
 
 
-class NLA_OT_fix_parent_transforms(Operator):
+class NLA_OT_fix_parent_transforms(_ChunkedOperator, Operator):
     """Fix parent transforms for selected objects"""
     bl_idname = "nla.fix_parent_transforms"
     bl_label = "Fix Parent Transforms"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def execute(self, context):
-        fixed_count = 0
-        skipped_count = 0
-        error_count = 0
-        
-        for obj in bpy.context.selected_objects:
-            if obj.parent is None:
-                skipped_count += 1
-                continue
+    def prepare(self, context, profile):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+        selected_objects = bpy.context.selected_objects
+        parented = [obj for obj in selected_objects if obj.parent is not None]
+        profile.count(objects=len(parented))
 
-            parent = obj.parent
+        with profile.phase("gather"):
+            # Step 1: Sort the selection so nested parents come before their children
+            parented = _hierarchy_order(parented)
+            parents = [obj.parent for obj in parented]
 
-            try:
-                # Set the object as active and the only selected one
-                bpy.ops.object.select_all(action='DESELECT')
-                obj.select_set(True)
-                bpy.context.view_layer.objects.active = obj
+            # Step 2: Read every world matrix once, before anything is modified
+            if nla_tool.parent_fix_mode == 'RANGE':
+                frames = np.arange(scene.frame_start, scene.frame_end + 1, nla_tool.parent_fix_frame_step)
+                samples = _sample_world_matrices(scene, parented + parents, frames)
+                world_matrices = samples[:, :len(parented)]
+                parent_matrices = samples[:, len(parented):]
+                profile.count(frames=len(frames))
+            else:
+                frames = None
+                world_matrices = _gather_world_matrices(parented)
+                parent_matrices = _gather_world_matrices(parents)
 
-                # Step 1: Store world transform
-                world_matrix = obj.matrix_world.copy()
+        # Step 3: Compute all local matrices in one batch (parent^-1 @ world)
+        with profile.phase("compute"):
+            local_matrices, invertible = core.solve_local_matrices(parent_matrices, world_matrices)
 
-                # Step 2: Clear parent while keeping world transform
-                bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+            delta_scaled = np.ones(len(parented), dtype=bool)
+            if frames is not None:
+                # Objects are keyed on every frame, so one singular parent matrix rules the object out
+                invertible = invertible.all(axis=0)
 
-                # Step 3: Reassign parent directly
-                obj.parent = parent
+                # The keyed channels sit under the delta transforms, which Blender applies on top;
+                # a zero delta scale cannot be factored out
+                delta_locations, delta_rotations, delta_scales = _delta_transforms(parented)
+                delta_scaled = (delta_scales != 0.0).all(axis=1)
+                channel_matrices = core.remove_delta_transforms(
+                    local_matrices.swapaxes(0, 1),  # Frame-major samples to object-major: (N, F, ...)
+                    delta_locations[:, np.newaxis],
+                    delta_rotations[:, np.newaxis],
+                    np.where(delta_scaled[:, np.newaxis], delta_scales, 1.0)[:, np.newaxis],
+                )
+                locations, rotations, scales = core.split_matrices(channel_matrices)
 
-                # Step 4: Compute and apply correct local matrix
-                local_matrix = parent.matrix_world.inverted() @ world_matrix
-                obj.matrix_parent_inverse.identity()
-                obj.matrix_basis = local_matrix
+                # Convert the rotations of all objects sharing a rotation mode at once
+                rotation_channels = [None] * len(parented)
+                modes = {}
+                for index, obj in enumerate(parented):
+                    modes.setdefault(obj.rotation_mode, []).append(index)
+                for rotation_mode, indices in modes.items():
+                    rotation_path, values = _rotation_channels(rotations[indices], rotation_mode)
+                    for index, object_values in zip(indices, values):
+                        rotation_channels[index] = (rotation_path, object_values)
+                self._channels = (locations, rotation_channels, scales)
 
-                fixed_count += 1
+        self._parented = parented
+        self._frames = frames
+        self._local_matrices = local_matrices
+        self._invertible = invertible.tolist()
+        self._delta_scaled = delta_scaled.tolist()
+        self._fixed_count = 0
+        self._error_count = 0
+        self._skipped_count = len(selected_objects) - len(parented)
+        return list(range(len(parented)))
+
+    def process_chunk(self, context, profile, items):
+        # Step 4: Apply the local matrices with an identity parent inverse
+        with profile.phase("write_back"):
+            for index in items:
+                obj = self._parented[index]
+                try:
+                    if not self._invertible[index]:
+                        raise ValueError(f"parent '{obj.parent.name}' matrix does not have an inverse")
+                    if not self._delta_scaled[index]:
+                        raise ValueError("delta scale has a zero axis")
+
+                    obj.matrix_parent_inverse.identity()
+                    if self._frames is None:
+                        obj.matrix_basis = mathutils.Matrix(self._local_matrices[index].tolist())
+                    else:
+                        self._key_local_motion(obj, index)
+
+                    self._fixed_count += 1
+
+                except Exception as e:
+                    self._error_count += 1
+                    self.report({'ERROR'}, f"Failed to fix '{obj.name}': {e}")
+
+    def _key_local_motion(self, obj, index):
+        """Key the local transform of one object on every sampled frame"""
+        locations, rotation_channels, scales = self._channels
+        rotation_path, rotation_values = rotation_channels[index]
+        _write_transform_keys(obj, self._frames, [
+            ("location", locations[index]),
+            (rotation_path, rotation_values),
+            ("scale", scales[index]),
+        ])
+
+    def finish(self, context, profile, cancelled):
+        # Step 5: A single view layer update refreshes every world matrix
+        with profile.phase("depsgraph_update"):
+            context.view_layer.update()
 
-            except Exception as e:
-                error_count += 1
-                self.report({'ERROR'}, f"Failed to fix '{obj.name}': {e}")
-        
         # Report results
-        if fixed_count > 0:
-            self.report({'INFO'}, f"Fixed {fixed_count} objects")
-        if skipped_count > 0:
-            self.report({'WARNING'}, f"Skipped {skipped_count} objects (no parent)")
-        if error_count > 0:
-            self.report({'ERROR'}, f"Failed to fix {error_count} objects")
+        if cancelled:
+            self.report({'WARNING'}, f"Cancelled after {self._fixed_count} of {len(self._parented)} objects")
+        if self._fixed_count > 0:
+            if self._frames is not None:
+                self.report({'INFO'}, f"Fixed {self._fixed_count} objects over {len(self._frames)} frames")
+            else:
+                self.report({'INFO'}, f"Fixed {self._fixed_count} objects")
+        if self._skipped_count > 0:
+            self.report({'WARNING'}, f"Skipped {self._skipped_count} objects (no parent)")
+        if self._error_count > 0:
+            self.report({'ERROR'}, f"Failed to fix {self._error_count} objects")
         
         return {'FINISHED'}
 
 
-class NLA_OT_replace_with_instance(Operator):
+class NLA_OT_replace_with_instance(_ChunkedOperator, Operator):
     """Replace selected objects with instances of the active object"""
     bl_idname = "nla.replace_with_instance"
     bl_label = "Replace with Instance"
     bl_options = {'REGISTER', 'UNDO'}
     
-    def execute(self, context):
+    def prepare(self, context, profile):
         # Reference to the active (source/template) object
         active_obj = bpy.context.active_object
 
@@ -171,31 +2613,274 @@ class NLA_OT_replace_with_instance(Operator):
             self.report({'WARNING'}, "No other objects selected to replace.")
             return {'CANCELLED'}
         
+        profile.count(objects=len(targets))
+
+        # Read every target's world matrix once, before any target is removed;
+        # each chunk takes the next rows, as chunks follow the item order
+        with profile.phase("gather"):
+            self._matrices = _gather_world_matrices(targets)
+        self._row = 0
+
+        self._active_obj = active_obj
+        self._target_count = len(targets)
+        self._replace_mode = context.scene.nla_strip_randomizer.replace_mode
+        self._transfer_data = context.scene.nla_strip_randomizer.replace_transfer_data
+        self._replaced_count = 0
+        self._points = []
+        return targets
+
+    def process_chunk(self, context, profile, items):
+        matrices = self._matrices[self._row:self._row + len(items)]
+        self._row += len(items)
+
+        if self._replace_mode == 'BULK':
+            self._replaced_count += self._replace_bulk(context, self._active_obj, items, matrices, profile)
+        elif self._replace_mode == 'POINTS':
+            # Step 1: Decompose the transforms; the point object is only
+            # created in finish() once every transform has been gathered
+            with profile.phase("gather"):
+                self._points.append((list(items), *core.decompose_matrices(matrices)))
+        else:
+            with profile.phase("write_back"):
+                self._replaced_count += self._replace_sequential(context, self._active_obj, items, matrices)
+
+    def finish(self, context, profile, cancelled):
+        active_obj = self._active_obj
+
+        if self._replace_mode == 'POINTS' and not cancelled:
+            self._replaced_count = self._replace_points(context, active_obj, profile)
+
+        if cancelled:
+            self.report({'WARNING'}, f"Cancelled after replacing {self._replaced_count} of {self._target_count} objects")
+        elif self._replaced_count > 0:
+            self.report({'INFO'}, f"Replaced {self._replaced_count} object(s) with instance of '{active_obj.name}'")
+        
+        return {'FINISHED'}
+
+    def _replace_sequential(self, context, active_obj, targets, matrices):
         replaced_count = 0
         
-        for target in targets:
+        for target, matrix in zip(targets, matrices):
+            target_name = target.name
             try:
-                # Store the original transform
-                matrix = target.matrix_world.copy()
-
-                # Remove the target object
-                bpy.data.objects.remove(target, do_unlink=True)
 
                 # Create a new instance (duplicate object with same data)
                 new_obj = bpy.data.objects.new(name=f"{active_obj.name}_inst", object_data=active_obj.data)
-                bpy.context.collection.objects.link(new_obj)
+                context.collection.objects.link(new_obj)
 
-                # Copy the original transform
-                new_obj.matrix_world = matrix
+                # Copy the original transform, or move everything over from the target
+                if self._transfer_data:
+                    _transfer_object_data(target, new_obj)
+                else:
+                    new_obj.matrix_world = mathutils.Matrix(matrix.tolist())
+
+                # Remove the target object
+                bpy.data.objects.remove(target, do_unlink=True)
                 
                 replaced_count += 1
 
             except Exception as e:
-                self.report({'ERROR'}, f"Failed to replace '{target.name}': {e}")
+                self.report({'ERROR'}, f"Failed to replace '{target_name}': {e}")
+
+        return replaced_count
+
+    def _replace_bulk(self, context, active_obj, targets, matrices, profile):
+        replaced = []
+
+        # Step 1: Create every instance first, in the collections of its target
+        with profile.phase("write_back"):
+            for target, matrix in zip(targets, matrices):
+                try:
+                    collections = target.users_collection or (context.collection,)
+
+                    new_obj = bpy.data.objects.new(name=f"{active_obj.name}_inst", object_data=active_obj.data)
+                    for collection in collections:
+                        collection.objects.link(new_obj)
+
+                    if self._transfer_data:
+                        _transfer_object_data(target, new_obj)
+                    else:
+                        new_obj.matrix_world = mathutils.Matrix(matrix.tolist())
+
+                    replaced.append(target)
+
+                except Exception as e:
+                    self.report({'ERROR'}, f"Failed to replace '{target.name}': {e}")
+
+        # Step 2: Remove the targets and their now-orphaned data in one batch
+        with profile.phase("remove"):
+            if replaced:
+                _remove_objects_with_orphaned_data(replaced, keep=(active_obj.data,) if active_obj.data else ())
+
+        return len(replaced)
+
+    def _replace_points(self, context, active_obj, profile):
+        targets = [target for chunk in self._points for target in chunk[0]]
+        positions, rotations, scales = (
+            np.concatenate([chunk[part] for chunk in self._points]) for part in (1, 2, 3)
+        )
+
+        with profile.phase("write_back"):
+            # Step 2: Collapse all transforms into one point mesh
+            mesh = bpy.data.meshes.new(f"{active_obj.name}_points")
+            mesh.vertices.add(len(targets))
+            mesh.vertices.foreach_set("co", positions.ravel())
+
+            rotation_attribute = mesh.attributes.new("instance_rotation", 'QUATERNION', 'POINT')
+            rotation_attribute.data.foreach_set("value", rotations.ravel())
+            scale_attribute = mesh.attributes.new("instance_scale", 'FLOAT_VECTOR', 'POINT')
+            scale_attribute.data.foreach_set("vector", scales.ravel())
+            mesh.update()
+
+            # Step 3: A single object instances the active object on every point
+            points_obj = bpy.data.objects.new(f"{active_obj.name}_instances", mesh)
+            context.collection.objects.link(points_obj)
+
+            modifier = points_obj.modifiers.new(name="Instance on Points", type='NODES')
+            modifier.node_group = _instance_on_points_node_group(active_obj)
+
+        # Step 4: Remove the targets and their now-orphaned data in one batch
+        with profile.phase("remove"):
+            _remove_objects_with_orphaned_data(targets, keep=(active_obj.data,) if active_obj.data else ())
+
+        return len(targets)
+
+
+class NLA_OT_lod_add_level(Operator):
+    """Add a proxy mesh level to the LOD chain"""
+    bl_idname = "nla.lod_add_level"
+    bl_label = "Add LOD Level"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def execute(self, context):
+        levels = context.scene.nla_strip_randomizer.lod_levels
+        distance = max((level.distance for level in levels), default=0.0)
+        levels.add().distance = distance * 2.0 if distance > 0.0 else 25.0
+        return {'FINISHED'}
+
+
+class NLA_OT_lod_remove_level(Operator):
+    """Remove a proxy mesh level from the LOD chain"""
+    bl_idname = "nla.lod_remove_level"
+    bl_label = "Remove LOD Level"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    index: IntProperty(name="Index", default=0, min=0)
+    
+    def execute(self, context):
+        levels = context.scene.nla_strip_randomizer.lod_levels
+        if self.index < len(levels):
+            levels.remove(self.index)
+        return {'FINISHED'}
+
+
+class NLA_OT_update_lods(_ProfiledOperator, Operator):
+    """Relink every instance of the LOD template to the level for its distance to the active camera"""
+    bl_idname = "nla.update_lods"
+    bl_label = "Update LODs"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _LODSwitcher.ready(context.scene)
+    
+    def run(self, context, profile):
+        scene = context.scene
+        if scene.camera is None:
+            self.report({'WARNING'}, "The scene has no active camera")
+            return {'CANCELLED'}
+        
+        # Gather the instances again, they may have moved or been added
+        with profile.phase("gather"):
+            _lod_switcher.invalidate()
+            instances = _lod_switcher.instances_for(scene)
+        
+        with profile.phase("compute"):
+            levels = instances.levels_for_camera(np.array(scene.camera.matrix_world.translation))
+        
+        with profile.phase("write_back"):
+            changed = instances.apply(levels)
+        
+        profile.count(objects=len(instances.objects), cells=len(instances.cells[1]), relinked=changed)
+        self.report({'INFO'}, f"Relinked {changed} of {len(instances.objects)} instances")
+        return {'FINISHED'}
+
+
+class NLA_OT_reset_lods(_ProfiledOperator, Operator):
+    """Relink every instance of the LOD template to the full resolution mesh"""
+    bl_idname = "nla.reset_lods"
+    bl_label = "Reset LODs"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _LODSwitcher.ready(context.scene)
+    
+    def run(self, context, profile):
+        nla_tool = context.scene.nla_strip_randomizer
+        # Stop the handlers from switching the instances back
+        nla_tool.lod_update_mode = 'OFF'
+        
+        with profile.phase("write_back"):
+            _lod_switcher.invalidate()
+            changed = _lod_switcher.update(context.scene, lambda instances: np.zeros_like(instances.levels))
+        
+        profile.count(relinked=changed)
+        self.report({'INFO'}, f"Relinked {changed} instances to the full resolution mesh")
+        return {'FINISHED'}
+
+
+class NLA_OT_bake_lods(_ProfiledOperator, Operator):
+    """Compute the LOD level of every instance on every frame from the camera path, for playback and render"""
+    bl_idname = "nla.bake_lods"
+    bl_label = "Bake LODs"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        return _LODSwitcher.ready(context.scene)
+    
+    def run(self, context, profile):
+        scene = context.scene
+        nla_tool = scene.nla_strip_randomizer
+        if scene.camera is None:
+            self.report({'WARNING'}, "The scene has no active camera")
+            return {'CANCELLED'}
+        
+        # The handlers must not relink anything while the camera is sampled
+        nla_tool.lod_update_mode = 'OFF'
+        frames = np.arange(scene.frame_start, scene.frame_end + 1)
+        
+        # Step 1: Sample the camera path with one scene evaluation per frame
+        with profile.phase("gather"):
+            _lod_switcher.invalidate()
+            instances = _lod_switcher.instances_for(scene)
+            camera_locations = _sample_world_matrices(scene, [scene.camera], frames)[:, 0, :3, 3]
         
-        if replaced_count > 0:
-            self.report({'INFO'}, f"Replaced {replaced_count} object(s) with instance of '{active_obj.name}'")
+        # Step 2: Compute the levels of every frame and keep only the changes
+        with profile.phase("compute"):
+            levels = np.stack([instances.levels_for_camera(location) for location in camera_locations])
+            initial, offsets, objects, values = core.lod_changes(levels)
         
+        # Step 3: Store the table in the scene so it is saved with the file and used by renders
+        with profile.phase("write_back"):
+            names = [obj.name for obj in instances.objects]
+            token = hashlib.blake2b(levels.tobytes(), digest_size=8)
+            token.update("\0".join(names).encode())
+            scene[LOD_BAKE] = {
+                "token": token.hexdigest(),
+                "frame_start": int(frames[0]),
+                "names": names,
+                "initial": initial.astype(np.int32).tolist(),
+                "offsets": offsets.astype(np.int32).tolist(),
+                "objects": objects.astype(np.int32).tolist(),
+                "values": values.astype(np.int32).tolist(),
+            }
+            nla_tool.lod_update_mode = 'BAKED'
+            _apply_baked_lods(scene)
+        
+        profile.count(objects=len(instances.objects), frames=len(frames), changes=len(objects))
+        self.report({'INFO'}, f"Baked {len(frames)} frames for {len(instances.objects)} instances, {len(objects)} switches")
         return {'FINISHED'}
 
 
@@ -216,15 +2901,36 @@ class NLA_PT_strip_randomizer(Panel):
         box = layout.box()
         box.label(text="Offset Settings", icon='ANIM')
         
+        col = box.column(align=True)
+        col.prop(nla_tool, "target_scope", text="Targets")
+        if nla_tool.target_scope == 'COLLECTION':
+            col.prop(nla_tool, "target_collection", text="Collection")
+        if _animated_index.valid:
+            object_count, strip_count = _animated_index.totals()
+            col.label(text=f"Animated: {object_count} objects, {strip_count} strips", icon='NLA')
+        
         col = box.column(align=True)
         col.prop(nla_tool, "offset_method", text="Offset Method")
         col.prop(nla_tool, "base_start_frame", text="Base Start Frame")
+        col.prop(nla_tool, "strip_layout", text="Layout")
         
         if nla_tool.offset_method == 'RANDOM':
             col.prop(nla_tool, "max_random_offset", text="Max Random Offset")
+        elif nla_tool.offset_method == 'EXPRESSION':
+            col.prop(nla_tool, "offset_expression", text="Offset")
+            col.label(text="dist, x, y, z, index, count, rand, noise(), prop()")
         else:
+            if nla_tool.offset_method == 'EMITTERS':
+                col.prop(nla_tool, "emitter_source", text="Emitters")
+                if nla_tool.emitter_source == 'COLLECTION':
+                    col.prop(nla_tool, "emitter_collection", text="Collection")
+                else:
+                    col.prop(nla_tool, "emitter_object", text="Object")
+                col.prop(nla_tool, "emitter_delay_property", text="Delay")
             col.prop(nla_tool, "offset_multiplier", text="Offset Multiplier")
             col.label(text="Frames per unit distance")
+            if nla_tool.offset_method == 'CURSOR':
+                col.operator("nla.preview_cursor_offset", text="Live Preview", icon='HIDE_OFF')
         
         # Scale settings
         box = layout.box()
@@ -233,6 +2939,10 @@ class NLA_PT_strip_randomizer(Panel):
         col = box.column(align=True)
         col.prop(nla_tool, "scale_min", text="Scale Min")
         col.prop(nla_tool, "scale_max", text="Scale Max")
+        col.prop(nla_tool, "scale_expression", text="Expression")
+        col.prop(nla_tool, "random_seed", text="Seed")
+        
+        layout.prop(nla_tool, "use_incremental", text="Incremental Re-apply")
         
         # Apply button
         layout.separator()
@@ -240,10 +2950,36 @@ class NLA_PT_strip_randomizer(Panel):
                        text="Apply Offset & Random Scale", 
                        icon='PLAY')
         
+        if nla_tool.use_undo_journal:
+            row = layout.row(align=True)
+            row.operator("nla.strip_journal_undo", text="Undo Layout", icon='LOOP_BACK')
+            row.operator("nla.strip_journal_redo", text="Redo Layout", icon='LOOP_FORWARDS')
+        
+        row = layout.row(align=True)
+        row.operator("nla.export_strip_layout", text="Export Layout", icon='EXPORT')
+        row.operator("nla.import_strip_layout", text="Import Layout", icon='IMPORT')
+        
+        # Bake to flat actions
+        layout.separator()
+        box = layout.box()
+        box.label(text="Actions", icon='ACTION')
+        col = box.column(align=True)
+        col.prop(nla_tool, "bake_step", text="Frame Step")
+        col.prop(nla_tool, "bake_clear_nla", text="Remove NLA Tracks")
+        box.operator("nla.bake_strips_to_action", 
+                    text="Bake Strips to Action", 
+                    icon='REC')
+        box.operator("nla.deduplicate_actions", 
+                    text="Deduplicate Actions", 
+                    icon='DUPLICATE')
+        
         # Parent transform fix
         layout.separator()
         box = layout.box()
         box.label(text="Parent Transform Fix", icon='CONSTRAINT')
+        box.prop(nla_tool, "parent_fix_mode", text="Mode")
+        if nla_tool.parent_fix_mode == 'RANGE':
+            box.prop(nla_tool, "parent_fix_frame_step", text="Frame Step")
         box.operator("nla.fix_parent_transforms", 
                     text="Fix Parent Transforms", 
                     icon='CONSTRAINT_BONE')
@@ -252,24 +2988,282 @@ class NLA_PT_strip_randomizer(Panel):
         layout.separator()
         box = layout.box()
         box.label(text="Object Replacement", icon='OBJECT_DATA')
+        box.prop(nla_tool, "replace_mode", text="Mode")
+        row = box.row()
+        row.active = nla_tool.replace_mode != 'POINTS'
+        row.prop(nla_tool, "replace_transfer_data", text="Keep Animation & Hierarchy")
         box.operator("nla.replace_with_instance", 
                     text="Replace with Instance", 
                     icon='DUPLICATE')
+        
+        # Level of detail for the instances
+        sub = box.box()
+        sub.label(text="Level of Detail", icon='MOD_DECIM')
+        sub.prop(nla_tool, "lod_template", text="Template")
+        for index, level in enumerate(nla_tool.lod_levels):
+            row = sub.row(align=True)
+            row.prop(level, "mesh", text="")
+            row.prop(level, "distance", text="From")
+            row.operator("nla.lod_remove_level", text="", icon='X').index = index
+        sub.operator("nla.lod_add_level", text="Add Proxy Level", icon='ADD')
+        col = sub.column(align=True)
+        col.prop(nla_tool, "lod_cell_size", text="Cell Size")
+        col.prop(nla_tool, "lod_update_mode", text="Per Frame")
+        row = sub.row(align=True)
+        row.operator("nla.update_lods", text="Update", icon='FILE_REFRESH')
+        row.operator("nla.bake_lods", text="Bake", icon='REC')
+        row.operator("nla.reset_lods", text="Reset", icon='LOOP_BACK')
+        
+        box.prop(nla_tool, "mesh_merge_tolerance", text="Merge Tolerance")
+        box.operator("nla.deduplicate_meshes", 
+                    text="Deduplicate Meshes", 
+                    icon='MESH_DATA')
+        
+        # Execution settings
+        layout.separator()
+        box = layout.box()
+        box.label(text="Execution", icon='PREFERENCES')
+        
+        col = box.column(align=True)
+        col.prop(nla_tool, "use_modal", text="Run in Chunks")
+        sub = col.column(align=True)
+        sub.active = nla_tool.use_modal
+        sub.prop(nla_tool, "modal_time_budget", text="Time Budget (ms)")
+        
+        col = box.column(align=True)
+        col.prop(nla_tool, "use_undo_journal", text="Strip Undo Journal")
+        sub = col.column(align=True)
+        sub.active = nla_tool.use_undo_journal
+        sub.prop(nla_tool, "undo_journal_steps", text="Steps")
+        if _strip_journal.entries:
+            sub.label(text=f"{len(_strip_journal.entries)} step(s), {_strip_journal.nbytes / 1024.0:.1f} KB")
+
+
+class NLA_PT_strip_randomizer_profiling(Panel):
+    """Timings of the last run of each operator"""
+    bl_label = "Profiling"
+    bl_idname = "NLA_PT_strip_randomizer_profiling"
+    bl_parent_id = "NLA_PT_strip_randomizer"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Tool'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw_header(self, context):
+        self.layout.prop(context.scene.nla_strip_randomizer, "use_profiling", text="")
+    
+    def draw(self, context):
+        layout = self.layout
+        nla_tool = context.scene.nla_strip_randomizer
+        
+        col = layout.column(align=True)
+        col.active = nla_tool.use_profiling
+        col.prop(nla_tool, "use_cprofile", text="cProfile Dumps")
+        col.prop(nla_tool, "profile_log_path", text="Log")
+        
+        if not _profile_results:
+            layout.label(text="No profiled runs yet")
+            return
+        
+        for record in _profile_results.values():
+            box = layout.box()
+            box.label(text=f"{record['operator']}: {record['total'] * 1000.0:.1f} ms", icon='TIME')
+            
+            col = box.column(align=True)
+            for phase, seconds in record["phases"].items():
+                row = col.row()
+                row.label(text=phase)
+                row.label(text=f"{seconds * 1000.0:.1f} ms")
+            for name, value in record["counts"].items():
+                row = col.row()
+                row.label(text=name)
+                row.label(text=str(value))
+
+
+class NLA_PT_strip_randomizer_nla_cost(Panel):
+    """Which objects' NLA stacks cost the most playback time"""
+    bl_label = "NLA Cost"
+    bl_idname = "NLA_PT_strip_randomizer_nla_cost"
+    bl_parent_id = "NLA_PT_strip_randomizer"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Tool'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self, context):
+        layout = self.layout
+        nla_tool = context.scene.nla_strip_randomizer
+        
+        col = layout.column(align=True)
+        col.prop(nla_tool, "cost_frame_step", text="Frame Step")
+        col.prop(nla_tool, "cost_repeats", text="Repeats")
+        col.prop(nla_tool, "cost_top_count", text="Top Objects")
+        
+        row = layout.row(align=True)
+        row.operator("nla.analyze_nla_cost", text="Analyze NLA Cost", icon='SORTTIME')
+        row.operator("nla.export_nla_cost_report", text="", icon='EXPORT')
+        
+        if not _nla_cost_report:
+            layout.label(text="No analysis yet")
+            return
+        
+        report = _nla_cost_report
+        col = layout.column(align=True)
+        col.label(text=f"Playback: {report['ms_per_frame']:.2f} ms/frame", icon='TIME')
+        col.label(text=f"NLA: {report['nla_ms_per_frame']:.2f} ms/frame ({report['objects']} objects)")
+        
+        box = layout.box()
+        box.label(text="Groups (tracks / strips / F-Curves)", icon='GROUP')
+        col = box.column(align=True)
+        for group in report["groups"][:nla_tool.cost_top_count]:
+            row = col.row()
+            instanced = ", instanced" if group["instanced"] else ""
+            row.label(text=f"{group['tracks']} / {group['strips']} / {group['fcurves']}+{instanced} x{group['objects']}")
+            row.label(text=f"{group['ms_per_frame']:.2f} ms")
+        
+        box = layout.box()
+        box.label(text="Top Objects", icon='OBJECT_DATA')
+        col = box.column(align=True)
+        for entry in report["top_objects"]:
+            row = col.row()
+            row.label(text=entry["name"])
+            row.label(text=f"{entry['ms_per_frame']:.3f} ms")
+
+
+def _format_bytes(value):
+    """Signed byte count in the largest fitting unit"""
+    if abs(value) < 1024:
+        return f"{value:+d} B"
+    for unit in ("KB", "MB", "GB"):
+        value /= 1024.0
+        if abs(value) < 1024.0 or unit == "GB":
+            return f"{value:+.1f} {unit}"
+
+
+class NLA_PT_strip_randomizer_footprint(Panel):
+    """Memory footprint change of the last run of each operator"""
+    bl_label = "Footprint"
+    bl_idname = "NLA_PT_strip_randomizer_footprint"
+    bl_parent_id = "NLA_PT_strip_randomizer"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Tool'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw_header(self, context):
+        self.layout.prop(context.scene.nla_strip_randomizer, "use_footprint", text="")
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.operator("nla.export_footprint_report", text="Export Footprint", icon='EXPORT')
+        
+        if not _footprint_results:
+            layout.label(text="No measured runs yet")
+            return
+        
+        for entry in _footprint_results.values():
+            box = layout.box()
+            box.label(text=entry["operator"], icon='MEMORY')
+            col = box.column(align=True)
+            for block_type, delta in entry["delta"].items():
+                after = entry["after"][block_type]
+                row = col.row()
+                row.label(text=f"{block_type}: {after['count']} ({delta['count']:+d})")
+                row.label(text=_format_bytes(delta["bytes"]))
+                if delta["orphans"]:
+                    row.label(text=f"orphans {delta['orphans']:+d}")
+
+
+def _poll_mesh_object(self, obj):
+    return obj.type == 'MESH'
+
+
+class NLAStripRandomizerLODLevel(bpy.types.PropertyGroup):
+    """One proxy mesh of the LOD chain"""
+    
+    mesh: PointerProperty(
+        name="Proxy Mesh",
+        description="Mesh the instances use from this distance on",
+        type=bpy.types.Mesh
+    )
+    
+    distance: FloatProperty(
+        name="Distance",
+        description="Camera distance from which this proxy replaces the finer levels",
+        default=25.0,
+        min=0.0,
+        subtype='DISTANCE'
+    )
 
 
 class NLAStripRandomizerProperties(bpy.types.PropertyGroup):
     """Properties for Animation Object Tools"""
     
+    target_scope: EnumProperty(
+        name="Target Scope",
+        description="Which animated objects the strip tools work on",
+        items=[
+            ('SELECTED', "Selected", "Selected objects with animation data"),
+            ('SCENE', "Scene", "All objects with NLA tracks in the scene"),
+            ('COLLECTION', "Collection", "All objects with NLA tracks in a collection and its children"),
+        ],
+        default='SELECTED'
+    )
+    
+    target_collection: PointerProperty(
+        name="Target Collection",
+        description="Collection whose animated objects are targeted",
+        type=bpy.types.Collection
+    )
+    
     offset_method: EnumProperty(
         name="Offset Method",
         description="How to calculate the offset for strips",
         items=[
             ('RANDOM', "Random", "Random offset within specified range"),
             ('CURSOR', "3D Cursor", "Offset based on distance from 3D cursor"),
+            ('EMITTERS', "Emitters", "Offset based on distance to the nearest emitter point"),
+            ('EXPRESSION', "Expression", "Offset computed by a formula of per-object inputs"),
         ],
         default='RANDOM'
     )
     
+    offset_expression: StringProperty(
+        name="Offset Expression",
+        description="Offset in frames as a formula of dist (to the 3D cursor), x, y, z, index, count, rand, "
+                    "noise(value), prop(\"name\") and math functions, e.g. dist ** 2 * 0.1 + noise(index * 0.3) * 5",
+        default="dist * 2.0"
+    )
+    
+    emitter_source: EnumProperty(
+        name="Emitter Source",
+        description="Where the emitter points come from",
+        items=[
+            ('COLLECTION', "Collection", "Origins of the objects in a collection, such as empties"),
+            ('GEOMETRY', "Geometry", "Vertices of a mesh or curve object"),
+        ],
+        default='COLLECTION'
+    )
+    
+    emitter_collection: PointerProperty(
+        name="Emitter Collection",
+        description="Collection whose objects act as emitters",
+        type=bpy.types.Collection
+    )
+    
+    emitter_object: PointerProperty(
+        name="Emitter Object",
+        description="Mesh or curve object whose vertices act as emitters",
+        type=bpy.types.Object
+    )
+    
+    emitter_delay_property: StringProperty(
+        name="Emitter Delay",
+        description="Custom property on emitter objects, or float point attribute on emitter geometry, "
+                    "holding an extra delay in frames (leave empty for none)",
+        default="delay"
+    )
+    
     base_start_frame: FloatProperty(
         name="Base Start Frame",
         description="Base frame position for all strips (absolute positioning)",
@@ -280,6 +3274,16 @@ class NLAStripRandomizerProperties(bpy.types.PropertyGroup):
         soft_max=1000.0
     )
     
+    strip_layout: EnumProperty(
+        name="Strip Layout",
+        description="How strips sharing a track are placed",
+        items=[
+            ('ABSOLUTE', "Absolute", "Move every strip of an object to the same offset frame"),
+            ('SEQUENCE', "Keep Sequence", "Move each track as a whole, keeping strip order and gaps and pushing overlapping strips apart"),
+        ],
+        default='ABSOLUTE'
+    )
+    
     max_random_offset: FloatProperty(
         name="Max Random Offset",
         description="Maximum random offset in frames",
@@ -292,7 +3296,7 @@ class NLAStripRandomizerProperties(bpy.types.PropertyGroup):
     
     offset_multiplier: FloatProperty(
         name="Offset Multiplier",
-        description="How many frames per unit distance from 3D cursor",
+        description="How many frames per unit distance from 3D cursor or nearest emitter",
         default=1.0,
         min=0.0,
         max=100.0,
@@ -319,14 +3323,230 @@ class NLAStripRandomizerProperties(bpy.types.PropertyGroup):
         soft_min=0.1,
         soft_max=5.0
     )
+    
+    scale_expression: StringProperty(
+        name="Scale Expression",
+        description="Optional strip scale formula replacing the random range; takes the offset inputs plus "
+                    "strip (index of the strip within its object), and rand is drawn per strip",
+        default=""
+    )
+    
+    random_seed: IntProperty(
+        name="Seed",
+        description="Seed for the random offsets and scales; each object draws from a stream "
+                    "derived from this seed and its name",
+        default=0,
+        min=0
+    )
+    
+    use_incremental: BoolProperty(
+        name="Incremental",
+        description="Only recompute objects whose location, settings or strips changed since the last run",
+        default=False
+    )
+    
+    use_profiling: BoolProperty(
+        name="Profiling",
+        description="Record phase timings and counts for every operator run",
+        default=False
+    )
+    
+    use_cprofile: BoolProperty(
+        name="cProfile Dumps",
+        description="Also run cProfile and dump the stats next to the profile log",
+        default=False
+    )
+    
+    use_footprint: BoolProperty(
+        name="Footprint Accounting",
+        description="Estimate the memory of meshes, actions and objects before and after every operator run",
+        default=False
+    )
+    
+    use_modal: BoolProperty(
+        name="Run in Chunks",
+        description="Process large selections in time-sliced chunks with a progress bar; press Esc to cancel",
+        default=False
+    )
+    
+    modal_time_budget: FloatProperty(
+        name="Time Budget",
+        description="Target time per chunk in milliseconds when running in chunks",
+        default=50.0,
+        min=5.0,
+        max=1000.0,
+        soft_min=10.0,
+        soft_max=200.0
+    )
+    
+    use_undo_journal: BoolProperty(
+        name="Strip Undo Journal",
+        description="Record strip layout changes in a compact undo journal instead of a full undo step; "
+                    "use Undo/Redo Layout to step through it, Ctrl+Z does not undo them",
+        default=True
+    )
+    
+    undo_journal_steps: IntProperty(
+        name="Journal Steps",
+        description="Maximum number of strip layout changes kept in the undo journal",
+        default=32,
+        min=1,
+        max=1000
+    )
+    
+    profile_log_path: StringProperty(
+        name="Profile Log",
+        description="JSON lines file the profile records are appended to "
+                    "(defaults to animation_object_tools_profile.jsonl in the temp directory)",
+        default="",
+        subtype='FILE_PATH'
+    )
+    
+    bake_step: IntProperty(
+        name="Bake Frame Step",
+        description="Frames between baked keys; strip boundaries are always keyed",
+        default=1,
+        min=1,
+        max=100
+    )
+    
+    bake_clear_nla: BoolProperty(
+        name="Remove NLA Tracks",
+        description="Remove the NLA tracks after baking instead of muting them",
+        default=False
+    )
+    
+    cost_frame_step: IntProperty(
+        name="Cost Frame Step",
+        description="Frames between the frames evaluated by the NLA cost analysis",
+        default=1,
+        min=1,
+        max=100
+    )
+    
+    cost_repeats: IntProperty(
+        name="Cost Repeats",
+        description="Passes over the frame range per measurement; the fastest pass is used",
+        default=3,
+        min=1,
+        max=10
+    )
+    
+    cost_top_count: IntProperty(
+        name="Top Objects",
+        description="Number of most expensive objects and groups listed in the NLA cost report",
+        default=10,
+        min=1,
+        max=1000
+    )
+    
+    parent_fix_mode: EnumProperty(
+        name="Parent Fix Mode",
+        description="Which frames the parent transform fix preserves",
+        items=[
+            ('CURRENT', "Current Frame", "Fix the local transform at the current frame"),
+            ('RANGE', "Frame Range", "Keep world-space motion over the scene frame range by keying the local transforms"),
+        ],
+        default='CURRENT'
+    )
+    
+    parent_fix_frame_step: IntProperty(
+        name="Parent Fix Frame Step",
+        description="Frames between keys when fixing parent transforms over the frame range",
+        default=1,
+        min=1,
+        max=100
+    )
+    
+    replace_transfer_data: BoolProperty(
+        name="Keep Animation & Hierarchy",
+        description="Move animation data (sharing actions), NLA tracks, parent, children and custom properties "
+                    "of each replaced object onto its instance (Bulk and Sequential modes)",
+        default=False
+    )
+    
+    mesh_merge_tolerance: FloatProperty(
+        name="Merge Tolerance",
+        description="Vertex positions closer than this are treated as identical when looking for duplicate meshes "
+                    "(0 for exact matches)",
+        default=0.0,
+        min=0.0,
+        soft_max=0.01,
+        precision=5,
+        subtype='DISTANCE'
+    )
+    
+    lod_template: PointerProperty(
+        name="LOD Template",
+        description="Object whose mesh is the full resolution level; objects using its mesh or a proxy are its instances",
+        type=bpy.types.Object,
+        poll=_poll_mesh_object
+    )
+    
+    lod_levels: CollectionProperty(
+        name="LOD Levels",
+        description="Proxy meshes of the template, each used from its camera distance on",
+        type=NLAStripRandomizerLODLevel
+    )
+    
+    lod_cell_size: FloatProperty(
+        name="LOD Cell Size",
+        description="Size of the grid cells instances are bucketed into; whole cells switch level "
+                    "together unless they straddle a distance",
+        default=10.0,
+        min=0.01,
+        subtype='DISTANCE'
+    )
+    
+    lod_update_mode: EnumProperty(
+        name="LOD Update",
+        description="How the LOD levels follow the camera during playback and rendering",
+        items=[
+            ('OFF', "Off", "Only switch levels with Update LODs"),
+            ('LIVE', "Live", "Switch levels for the camera after every frame change"),
+            ('BAKED', "Baked", "Switch to the levels baked with Bake LODs before every frame is evaluated"),
+        ],
+        default='OFF'
+    )
+    
+    replace_mode: EnumProperty(
+        name="Replace Mode",
+        description="How selected objects are replaced with instances",
+        items=[
+            ('BULK', "Bulk", "Create all instances in the targets' collections, then remove the targets and their orphaned data in one batch"),
+            ('SEQUENTIAL', "Sequential", "Remove and replace objects one at a time, linking instances to the active collection"),
+            ('POINTS', "Point Instances", "Collapse all targets into one point object that instances the active object with Geometry Nodes"),
+        ],
+        default='BULK'
+    )
 
 
 # Registration
 classes = (
     NLA_OT_apply_offset_and_random_scale,
+    NLA_OT_preview_cursor_offset,
+    NLA_OT_bake_strips_to_action,
+    NLA_OT_analyze_nla_cost,
+    NLA_OT_export_nla_cost_report,
+    NLA_OT_export_footprint_report,
+    NLA_OT_deduplicate_actions,
     NLA_OT_fix_parent_transforms,
     NLA_OT_replace_with_instance,
+    NLA_OT_deduplicate_meshes,
+    NLA_OT_lod_add_level,
+    NLA_OT_lod_remove_level,
+    NLA_OT_update_lods,
+    NLA_OT_reset_lods,
+    NLA_OT_bake_lods,
+    NLA_OT_strip_journal_undo,
+    NLA_OT_strip_journal_redo,
+    NLA_OT_export_strip_layout,
+    NLA_OT_import_strip_layout,
     NLA_PT_strip_randomizer,
+    NLA_PT_strip_randomizer_profiling,
+    NLA_PT_strip_randomizer_nla_cost,
+    NLA_PT_strip_randomizer_footprint,
+    NLAStripRandomizerLODLevel,
     NLAStripRandomizerProperties,
 )
 
@@ -339,9 +3559,40 @@ def register():
     bpy.types.Scene.nla_strip_randomizer = bpy.props.PointerProperty(
         type=NLAStripRandomizerProperties
     )
+    
+    # Register handlers
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(_invalidate_animated_index)
+        handlers.append(_invalidate_lod_instances)
+    bpy.app.handlers.load_post.append(_clear_strip_journal)
+    bpy.app.handlers.load_post.append(_reset_cursor_preview)
+    bpy.app.handlers.depsgraph_update_post.append(_update_animated_index)
+    bpy.app.handlers.frame_change_pre.append(_apply_baked_lods)
+    bpy.app.handlers.frame_change_post.append(_update_live_lods)
 
 
 def unregister():
+    # Unregister handlers
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        for handler in (_invalidate_animated_index, _invalidate_lod_instances):
+            if handler in handlers:
+                handlers.remove(handler)
+    for handlers, handler in (
+        (bpy.app.handlers.load_post, _clear_strip_journal),
+        (bpy.app.handlers.load_post, _reset_cursor_preview),
+        (bpy.app.handlers.depsgraph_update_post, _update_animated_index),
+        (bpy.app.handlers.frame_change_pre, _apply_baked_lods),
+        (bpy.app.handlers.frame_change_post, _update_live_lods),
+    ):
+        if handler in handlers:
+            handlers.remove(handler)
+    _strip_journal.clear()
+    _animated_index.invalidate()
+    _nla_cost_report.clear()
+    _footprint_results.clear()
+    _lod_switcher.invalidate()
+    NLA_OT_preview_cursor_offset._running = False
+    
     # Unregister properties
     del bpy.types.Scene.nla_strip_randomizer
     
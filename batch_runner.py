@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Headless batch runner for Animation Object Tools
+Applies one of the addon operators to many .blend files, running a pool of
+background Blender processes side by side and writing a JSON summary per file.
+
+Example:
+    python batch_runner.py "shots/**/*.blend" --operator offset \
+        --set offset_method=CURSOR --set offset_multiplier=2.5 --jobs 8
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+ADDON_DIR = Path(__file__).resolve().parent
+ADDON_MODULE = "animation_object_tools"
+
+# Short command-line names for the addon operators
+OPERATORS = {
+    "offset": "apply_offset_and_random_scale",
+    "parent_fix": "fix_parent_transforms",
+    "replace": "replace_with_instance",
+    "dedup_meshes": "deduplicate_meshes",
+    "bake": "bake_strips_to_action",
+    "dedup_actions": "deduplicate_actions",
+    "nla_cost": "analyze_nla_cost",
+}
+
+SELECTIONS = ("saved", "all", "animated", "parented")
+
+
+def parse_args(argv):
+    """Parse the command line of the runner or of a worker"""
+    parser = argparse.ArgumentParser(
+        description="Apply an Animation Object Tools operator to many .blend files in background Blender processes"
+    )
+    parser.add_argument("files", nargs="*", help=".blend files or glob patterns (** is supported)")
+    parser.add_argument("--operator", choices=sorted(OPERATORS), required=True,
+                        help="Operator to apply to every file")
+    parser.add_argument("--set", dest="settings", action="append", default=[], metavar="NAME=VALUE",
+                        help="Set an Animation Object Tools setting, e.g. offset_method=CURSOR (repeatable)")
+    parser.add_argument("--select", choices=SELECTIONS, default="saved",
+                        help="Objects to select before running the operator (default: the selection saved in the file)")
+    parser.add_argument("--active", metavar="OBJECT",
+                        help="Name of the object to make active, e.g. the template for replace")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of Blender processes to run at once (default: CPU count)")
+    parser.add_argument("--output-dir", type=Path,
+                        help="Save results into this directory instead of overwriting the input files")
+    parser.add_argument("--no-save", action="store_true", help="Do not save the processed files")
+    parser.add_argument("--summary-dir", type=Path, default=Path("batch_summaries"),
+                        help="Directory for the per-file JSON summaries (default: ./batch_summaries)")
+    parser.add_argument("--blender", help="Path to the Blender executable")
+    parser.add_argument("--timeout", type=float, default=None, help="Timeout per file in seconds")
+
+    # Internal arguments used when this script runs inside Blender
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    parser.add_argument("--summary", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def parse_settings(settings):
+    """Turn NAME=VALUE strings into a dict, decoding JSON values where possible"""
+    values = {}
+    for setting in settings:
+        name, separator, value = setting.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid setting '{setting}', expected NAME=VALUE")
+        try:
+            values[name] = json.loads(value)
+        except json.JSONDecodeError:
+            values[name] = value
+    return values
+
+
+def expand_files(patterns):
+    """Expand glob patterns into a sorted list of unique .blend files"""
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        files.extend(Path(match).resolve() for match in matches if match.endswith(".blend"))
+    return sorted(set(files))
+
+
+def output_paths(files, output_dir):
+    """Where each file is saved under output_dir, keeping its folders below the common root
+
+    Recursive globs often match files with the same name in different
+    folders, so flattening them into output_dir would overwrite results.
+    """
+    if len(files) == 1:
+        root = files[0].parent
+    else:
+        root = Path(os.path.commonpath(files))
+    return [output_dir / blend_file.relative_to(root) for blend_file in files]
+
+
+# ---------------------------------------------------------------------------
+# Worker side (runs inside Blender)
+# ---------------------------------------------------------------------------
+
+def load_addon():
+    """Import and register the addon straight from this directory"""
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location(
+        ADDON_MODULE, ADDON_DIR / "__init__.py", submodule_search_locations=[str(ADDON_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.register()
+    return module
+
+
+def apply_settings(bpy, settings):
+    """Copy the requested values onto the scene's addon settings"""
+    nla_tool = bpy.context.scene.nla_strip_randomizer
+    data_collections = {"Object": bpy.data.objects, "Collection": bpy.data.collections}
+
+    for name, value in settings.items():
+        prop = nla_tool.bl_rna.properties.get(name)
+        if prop is None:
+            raise ValueError(f"Unknown setting '{name}'")
+        if prop.type == 'POINTER':
+            value = data_collections[prop.fixed_type.identifier].get(value) if value else None
+        setattr(nla_tool, name, value)
+
+
+def select_objects(bpy, selection, active_name):
+    """Prepare the selection the operator will work on"""
+    view_layer = bpy.context.view_layer
+
+    if selection != "saved":
+        for obj in view_layer.objects:
+            if selection == "all":
+                selected = True
+            elif selection == "animated":
+                selected = obj.animation_data is not None
+            else:
+                selected = obj.parent is not None
+            obj.select_set(selected)
+
+    if active_name:
+        active_obj = bpy.data.objects.get(active_name)
+        if active_obj is None:
+            raise ValueError(f"Active object '{active_name}' not found")
+        active_obj.select_set(True)
+        view_layer.objects.active = active_obj
+
+    return len(bpy.context.selected_objects)
+
+
+def run_worker(args):
+    """Apply the operator to the file Blender has opened and write the summary"""
+    import bpy
+
+    summary = {
+        "file": bpy.data.filepath,
+        "operator": args.operator,
+        "settings": parse_settings(args.settings),
+        "status": "ok",
+    }
+    timings = summary["timings"] = {}
+    start = time.perf_counter()
+    addon = None
+
+    try:
+        addon = load_addon()
+        apply_settings(bpy, summary["settings"])
+        summary["selected_objects"] = select_objects(bpy, args.select, args.active)
+        timings["setup"] = time.perf_counter() - start
+
+        operator = getattr(bpy.ops.nla, OPERATORS[args.operator])
+        operator_start = time.perf_counter()
+        summary["result"] = sorted(operator())
+        timings["operator"] = time.perf_counter() - operator_start
+        if 'FINISHED' not in summary["result"]:
+            # The operator's own report is printed to the Blender output, which the runner keeps
+            raise RuntimeError(f"{OPERATORS[args.operator]} did not finish ({', '.join(summary['result'])})")
+        if args.operator == "nla_cost":
+            summary["nla_cost"] = dict(addon._nla_cost_report)
+        footprint = addon._footprint_results.get(f"nla.{OPERATORS[args.operator]}")
+        if footprint:
+            summary["footprint"] = footprint["delta"]
+
+        if args.output:
+            save_start = time.perf_counter()
+            bpy.ops.wm.save_as_mainfile(filepath=args.output)
+            timings["save"] = time.perf_counter() - save_start
+            summary["output"] = args.output
+
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = str(e)
+
+    finally:
+        timings["worker_total"] = time.perf_counter() - start
+        if addon is not None:
+            addon.unregister()
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    return 0 if summary["status"] == "ok" else 1
+
+
+# ---------------------------------------------------------------------------
+# Runner side (plain Python)
+# ---------------------------------------------------------------------------
+
+def run_file(blender_exe, blend_file, index, output, args):
+    """Process one file in its own background Blender process, saving it to ``output`` if given"""
+    summary_path = args.summary_dir / f"{index:04d}_{blend_file.stem}.json"
+    # A summary left by an earlier run must not stand in for this one if Blender fails
+    summary_path.unlink(missing_ok=True)
+
+    cmd = [
+        blender_exe, "--background", "--factory-startup", str(blend_file),
+        "--python", str(Path(__file__).resolve()), "--",
+        "--worker", "--operator", args.operator, "--select", args.select,
+        "--summary", str(summary_path),
+    ]
+    for setting in args.settings:
+        cmd += ["--set", setting]
+    if args.active:
+        cmd += ["--active", args.active]
+    if output:
+        cmd += ["--output", str(output)]
+
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=args.timeout)
+        returncode = result.returncode
+        stdout = result.stdout
+        stderr = result.stderr
+    except subprocess.TimeoutExpired:
+        returncode = None
+        stdout = ""
+        stderr = "timed out"
+    wall_time = time.perf_counter() - start
+
+    if summary_path.exists():
+        with open(summary_path) as f:
+            summary = json.load(f)
+    else:
+        # Blender failed before the worker could write anything
+        summary = {"file": str(blend_file), "operator": args.operator, "status": "error",
+                   "error": stderr.strip()[-2000:], "timings": {}}
+
+    # A crash after the summary was written, or a timeout, still fails the file
+    if returncode != 0 and summary["status"] == "ok":
+        summary["status"] = "error"
+        summary["error"] = stderr.strip()[-2000:] or f"Blender exited with code {returncode}"
+    if summary["status"] != "ok" and stdout.strip():
+        # Operator reports such as "No objects with animation data selected" end up here
+        summary["log"] = stdout.strip()[-2000:]
+
+    summary["returncode"] = returncode
+    summary["timings"]["wall"] = wall_time
+    with open(summary_path, "w") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def run_batch(args):
+    """Spread the files over a pool of Blender processes"""
+    from build_extension import find_blender_executable
+
+    blender_exe = args.blender or find_blender_executable()
+    if not blender_exe:
+        print("❌ Blender executable not found! Use --blender to specify it.")
+        return 1
+
+    files = expand_files(args.files)
+    if not files:
+        print("❌ No .blend files matched")
+        return 1
+
+    parse_settings(args.settings)
+    args.summary_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.no_save:
+        outputs = [None] * len(files)
+    elif args.output_dir:
+        outputs = output_paths(files, args.output_dir)
+        for output in outputs:
+            output.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        outputs = files
+
+    jobs = max(1, min(args.jobs, len(files)))
+    print(f"🚀 Processing {len(files)} file(s) with {jobs} Blender process(es)")
+
+    start = time.perf_counter()
+    summaries = []
+    # Each task waits on its own Blender process, so threads are enough to drive the pool
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_file, blender_exe, blend_file, index, output, args)
+                   for index, (blend_file, output) in enumerate(zip(files, outputs))]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            status = "✅" if summary["status"] == "ok" else "❌"
+            print(f"{status} {summary['file']} ({summary['timings']['wall']:.2f}s)")
+    total = time.perf_counter() - start
+
+    failed = [summary for summary in summaries if summary["status"] != "ok"]
+    report = {
+        "operator": args.operator,
+        "jobs": jobs,
+        "files": len(files),
+        "failed": len(failed),
+        "wall_time": total,
+        "files_per_second": len(files) / total if total > 0 else None,
+        "summaries": sorted(summaries, key=lambda summary: summary["file"]),
+    }
+    with open(args.summary_dir / "batch_summary.json", "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📋 {len(files) - len(failed)} succeeded, {len(failed)} failed in {total:.2f}s")
+    return 1 if failed else 0
+
+
+def main():
+    """Entry point for both the runner and the Blender workers"""
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+
+    if args.worker:
+        return run_worker(args)
+    return run_batch(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,762 @@
+"""
+NumPy core of Animation Object Tools
+
+The algorithms behind the operators, working on plain arrays only: random
+streams, offsets and scales, strip layouts, offset/scale expressions, NLA
+time mapping, local matrices for the parent fix, replacement planning,
+evaluation cost attribution, level-of-detail selection and memory
+footprint accounting.
+Nothing here imports bpy, so the core runs and is tested with plain pytest;
+the operators in __init__.py bulk-read Blender data into arrays, call these
+functions and bulk-write the results.
+"""
+
+import ast
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+
+# ---------------------------------------------------------------------------
+# Random streams
+# ---------------------------------------------------------------------------
+
+def object_keys(names, seed):
+    """Derive a stable 64-bit random stream key from the seed and each object name"""
+    return np.array(
+        [
+            int.from_bytes(hashlib.blake2b(f"{seed}:{name}".encode(), digest_size=8).digest(), "little")
+            for name in names
+        ],
+        dtype=np.uint64,
+    )
+
+
+def hash_uniform(keys, counters, low, high):
+    """Deterministic uniform values for every (key, counter) pair
+
+    Each value is a SplitMix64 hash of the key and counter, so an object
+    always draws the same numbers no matter which other objects are selected.
+    """
+    with np.errstate(over='ignore'):
+        x = keys.astype(np.uint64) + (np.asarray(counters, dtype=np.uint64) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    unit = (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+    return low + (high - low) * unit
+
+
+def value_noise(values, seed):
+    """Smooth 1D value noise in [-1, 1], deterministic for the seed"""
+    values = np.asarray(values, dtype=np.float64)
+    cells = np.floor(values)
+    t = values - cells
+    t = t * t * (3.0 - 2.0 * t)
+
+    key = int.from_bytes(hashlib.blake2b(f"{seed}:noise".encode(), digest_size=8).digest(), "little")
+    keys = np.full(values.shape, key, dtype=np.uint64)
+    cells = cells.astype(np.int64).view(np.uint64)
+    low = hash_uniform(keys, cells, -1.0, 1.0)
+    high = hash_uniform(keys, cells + np.uint64(1), -1.0, 1.0)
+    return low + (high - low) * t
+
+
+# ---------------------------------------------------------------------------
+# Offsets and scales
+# ---------------------------------------------------------------------------
+
+def random_offsets(keys, max_offset):
+    """Random offset of every object, the first value of its stream"""
+    return hash_uniform(keys, np.zeros(len(keys)), 0.0, max_offset)
+
+
+def random_scales(keys, strip_objects, strip_ordinals, low, high):
+    """Random scale of every strip, drawn from its object's stream after the offset"""
+    return hash_uniform(keys[strip_objects], strip_ordinals + 1, low, high)
+
+
+def cursor_offsets(locations, cursor_location, multiplier):
+    """Offset of every object in proportion to its distance from the cursor"""
+    cursor = np.asarray(cursor_location, dtype=np.float64)
+    distances = np.linalg.norm(locations - cursor, axis=1)
+    return distances * multiplier
+
+
+# ---------------------------------------------------------------------------
+# Strip layouts
+# ---------------------------------------------------------------------------
+
+def resolve_overlaps(first, starts, lengths):
+    """Sorted sweep pushing every strip right until it no longer overlaps the previous one
+
+    ``first`` marks the first strip of every track in arrays sorted by track
+    and start. The recurrence ``start[i] = max(start[i], start[i-1] + length[i-1])``
+    is solved for all tracks at once: relative to the summed lengths before
+    each strip it becomes a running maximum, computed per track by lifting
+    every track above the previous one.
+    """
+    if len(starts) == 0:
+        return starts
+
+    indices = np.arange(len(starts))
+    track_first = np.maximum.accumulate(np.where(first, indices, 0))
+    track_rank = np.cumsum(first) - 1
+
+    cumulative = np.cumsum(lengths) - lengths
+    before = cumulative - cumulative[track_first]
+    relative = starts - before
+
+    span = relative.max() - relative.min() + 1.0
+    lifted = relative + track_rank * span
+    relative = np.maximum.accumulate(lifted) - track_rank * span
+
+    return relative + before
+
+
+def sequence_layout(track_ids, starts, ends, old_scales, new_scales, anchors):
+    """Offset and scale whole strip sequences, keeping order and gaps per track
+
+    The first strip of every track starts at its anchor frame. Each further
+    strip follows the new end of the previous one after the original gap, and
+    strips that overlapped before are pushed apart by a sorted sweep.
+
+    Returns the new start of every strip.
+    """
+    # Sort strips by track, then start: O(n log n)
+    order = np.lexsort((starts, track_ids))
+    sorted_tracks = track_ids[order]
+    sorted_starts = starts[order].astype(np.float64)
+    sorted_ends = ends[order].astype(np.float64)
+
+    durations = sorted_ends - sorted_starts
+    lengths = durations * new_scales[order] / old_scales[order]
+
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_tracks[1:] != sorted_tracks[:-1]
+
+    # Distance from the previous strip's start: its new length plus the original gap
+    steps = np.zeros(len(order))
+    steps[1:] = lengths[:-1] + (sorted_starts[1:] - sorted_ends[:-1])
+    steps[first] = 0.0
+
+    cumulative = np.cumsum(steps)
+    track_first = np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    new_starts = anchors[order] + cumulative - cumulative[track_first]
+    new_starts = resolve_overlaps(first, new_starts, lengths)
+
+    result = np.empty(len(order))
+    result[order] = new_starts
+    return result
+
+
+def match_layout(layout, track_names, track_indices, counts, starts, scales):
+    """Pick saved layout values for every strip of the current tracks
+
+    ``layout`` holds the arrays of a saved layout; the other arguments
+    describe the current tracks (owner name, track index, strip count) and
+    their flat strip values. Tracks are matched by object name and track
+    index and must hold the same number of strips. Returns the starts and
+    scales to write, with unmatched strips keeping their current values, and
+    the number of matched tracks.
+    """
+    layout_counts = layout["counts"].astype(np.int64)
+    offsets = np.cumsum(layout_counts) - layout_counts
+    sources = {
+        (name, track_index): (offset, count)
+        for name, track_index, offset, count in zip(
+            layout["object_names"].tolist(), layout["track_indices"].tolist(),
+            offsets.tolist(), layout_counts.tolist(),
+        )
+    }
+
+    targets = []
+    source_ranges = []
+    offset = 0
+    for name, track_index, count in zip(track_names, track_indices, np.asarray(counts).tolist()):
+        source = sources.get((name, track_index))
+        if source is not None and source[1] == count:
+            targets.append(np.arange(offset, offset + count))
+            source_ranges.append(np.arange(source[0], source[0] + count))
+        offset += count
+
+    starts = np.array(starts, copy=True)
+    scales = np.array(scales, copy=True)
+    if targets:
+        strips = np.concatenate(targets)
+        source_strips = np.concatenate(source_ranges)
+        starts[strips] = layout["starts"][source_strips]
+        scales[strips] = layout["scales"][source_strips]
+    return starts, scales, len(targets)
+
+
+# ---------------------------------------------------------------------------
+# Offset and scale expressions
+# ---------------------------------------------------------------------------
+
+class Expression:
+    """An offset or scale formula checked against a whitelist and compiled once
+
+    Only arithmetic, comparisons, ``a if condition else b``, numbers and the
+    names below are accepted, so evaluating the compiled code over NumPy
+    arrays cannot reach anything else. Conditionals become ``where()`` calls
+    and ``prop("name")`` reads a custom property of every object.
+    """
+
+    FUNCTIONS = {
+        "sqrt": np.sqrt, "sin": np.sin, "cos": np.cos, "tan": np.tan, "abs": np.abs,
+        "exp": np.exp, "log": np.log, "floor": np.floor, "ceil": np.ceil,
+        "min": np.minimum, "max": np.maximum, "clip": np.clip, "where": np.where,
+    }
+    VARIABLES = {"dist", "x", "y", "z", "index", "count", "rand", "strip"}
+    CONSTANTS = {"pi": np.pi}
+    NODES = (
+        ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.IfExp, ast.Call, ast.Name,
+        ast.Constant, ast.Load, ast.operator, ast.unaryop, ast.cmpop,
+    )
+
+    def __init__(self, source):
+        try:
+            tree = ast.parse(source.strip() or "0", mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"invalid expression '{source}': {e.msg}") from None
+
+        allowed = self.VARIABLES | set(self.FUNCTIONS) | set(self.CONSTANTS) | {"noise", "prop"}
+        self.names = set()
+        self.properties = set()
+        property_names = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, self.NODES) or isinstance(node, ast.MatMult):
+                raise ValueError(f"'{type(node).__name__}' is not allowed in expressions")
+            if isinstance(node, ast.Name):
+                if node.id not in allowed:
+                    raise ValueError(f"unknown name '{node.id}' in expression '{source}'")
+                self.names.add(node.id)
+            elif isinstance(node, ast.Compare) and len(node.ops) > 1:
+                raise ValueError("chained comparisons are not supported, combine them with & or |")
+            elif isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.keywords:
+                    raise ValueError(f"only plain function calls are allowed in expression '{source}'")
+                if node.func.id == "prop":
+                    if len(node.args) != 1 or not isinstance(node.args[0], ast.Constant) \
+                            or not isinstance(node.args[0].value, str):
+                        raise ValueError("prop() takes a single property name in quotes")
+                    self.properties.add(node.args[0].value)
+                    property_names.add(id(node.args[0]))
+            elif isinstance(node, ast.Constant):
+                if isinstance(node.value, str) and id(node) in property_names:
+                    continue
+                if not isinstance(node.value, (int, float)):
+                    raise ValueError(f"constant {node.value!r} is not allowed in expressions")
+                # Float arithmetic overflows quickly instead of building huge integers
+                node.value = float(node.value)
+
+        tree = ast.fix_missing_locations(self._Conditionals().visit(tree))
+        self.source = source
+        self._code = compile(tree, "<expression>", 'eval')
+
+    class _Conditionals(ast.NodeTransformer):
+        """Rewrite ``a if condition else b`` to ``where(condition, a, b)``"""
+
+        def visit_IfExp(self, node):
+            self.generic_visit(node)
+            return ast.Call(
+                func=ast.Name(id="where", ctx=ast.Load()), args=[node.test, node.body, node.orelse], keywords=[]
+            )
+
+    def evaluate(self, variables, count):
+        """Evaluate over the arrays in ``variables`` and return ``count`` floats
+
+        ``variables`` also holds ``noise`` and the custom property arrays,
+        keyed by property name under ``"properties"``.
+        """
+        namespace = dict(self.FUNCTIONS, **self.CONSTANTS)
+        namespace.update((name, value) for name, value in variables.items() if name != "properties")
+        namespace["prop"] = variables["properties"].__getitem__
+
+        try:
+            with np.errstate(all='ignore'):
+                result = eval(self._code, {"__builtins__": {}}, namespace)
+            result = np.broadcast_to(np.asarray(result, dtype=np.float64), (count,))
+        except (ArithmeticError, TypeError, ValueError) as e:
+            raise ValueError(f"cannot evaluate expression '{self.source}': {e}") from None
+        return np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+_compiled_expressions = {}
+
+
+def compile_expression(source):
+    """Parse and check an expression once, reusing the result for the same text"""
+    expression = _compiled_expressions.get(source)
+    if expression is None:
+        expression = _compiled_expressions[source] = Expression(source)
+    return expression
+
+
+def expression_variables(locations, indices, count, keys, cursor_location, seed, properties):
+    """Per-object NumPy inputs of the offset and scale expressions
+
+    ``properties`` maps custom property names to per-object value arrays.
+    """
+    locations = np.asarray(locations, dtype=np.float64)
+    cursor = np.asarray(cursor_location, dtype=np.float64)
+    return {
+        "dist": np.linalg.norm(locations - cursor, axis=1),
+        "x": locations[:, 0],
+        "y": locations[:, 1],
+        "z": locations[:, 2],
+        "index": np.asarray(indices, dtype=np.float64),
+        "count": float(count),
+        "rand": hash_uniform(keys, np.zeros(len(keys)), 0.0, 1.0),
+        "strip": np.zeros(len(locations)),
+        "noise": lambda values: value_noise(values, seed),
+        "properties": properties,
+    }
+
+
+def per_strip_variables(variables, strip_objects, strip_ordinals, keys):
+    """Repeat per-object expression inputs for every strip, with per-strip ``rand`` and ``strip``
+
+    ``rand`` uses the same stream as the random scale, so
+    ``scale_min + rand * (scale_max - scale_min)`` reproduces it.
+    """
+    strip_variables = {
+        name: value[strip_objects] if isinstance(value, np.ndarray) else value
+        for name, value in variables.items() if name != "properties"
+    }
+    strip_variables["properties"] = {
+        name: values[strip_objects] for name, values in variables["properties"].items()
+    }
+    strip_variables["rand"] = hash_uniform(keys[strip_objects], strip_ordinals + 1, 0.0, 1.0)
+    strip_variables["strip"] = np.asarray(strip_ordinals, dtype=np.float64)
+    return strip_variables
+
+
+# ---------------------------------------------------------------------------
+# NLA time mapping
+# ---------------------------------------------------------------------------
+
+def strip_action_times(times, strip):
+    """Map scene frames to frames of a strip's action, as the NLA evaluates them
+
+    ``strip`` is a dict of plain strip values. Frames outside the strip are
+    clamped to it, which is what hold extrapolation shows.
+    """
+    times = np.clip(times, strip["frame_start"], strip["frame_end"])
+    length = strip["action_frame_end"] - strip["action_frame_start"]
+    period = length * strip["scale"]
+
+    if period > 0.0:
+        mapped = np.mod(times - strip["frame_start"], period) / strip["scale"]
+    else:
+        mapped = np.zeros_like(times)
+
+    # The very end of a whole number of repeats shows the end of the action, not its start again
+    if strip["repeat"] == np.floor(strip["repeat"]):
+        mapped = np.where(times >= strip["frame_end"], length, mapped)
+
+    if strip["reverse"]:
+        return strip["action_frame_end"] - mapped
+    return strip["action_frame_start"] + mapped
+
+
+# ---------------------------------------------------------------------------
+# Matrices
+# ---------------------------------------------------------------------------
+
+def solve_local_matrices(parent_matrices, world_matrices):
+    """Local matrices (parent^-1 @ world) for any batch shape of 4x4 matrices
+
+    Returns the local matrices and a mask of the parents that could be
+    inverted; locals of singular parents are zero.
+    """
+    invertible = np.linalg.det(parent_matrices) != 0.0
+    parent_inverses = np.zeros_like(parent_matrices)
+    parent_inverses[invertible] = np.linalg.inv(parent_matrices[invertible])
+    return parent_inverses @ world_matrices, invertible
+
+
+def split_matrices(matrices):
+    """Split (..., 4, 4) matrices into locations, rotation matrices and scales
+
+    Matches ``Matrix.decompose()``: a negative determinant negates all three
+    scale axes.
+    """
+    basis = matrices[..., :3, :3]
+    scales = np.linalg.norm(basis, axis=-2)
+    scales[np.linalg.det(basis) < 0.0] *= -1.0
+
+    safe_scales = np.where(scales == 0.0, 1.0, scales)
+    rotations = basis / safe_scales[..., np.newaxis, :]
+    return matrices[..., :3, 3], rotations, scales
+
+
+def matrices_to_quaternions(rotations):
+    """Convert (..., 3, 3) rotation matrices to (w, x, y, z) unit quaternions with w >= 0
+
+    Every matrix uses the best conditioned of the four standard formulas
+    (trace, or the largest diagonal element).
+    """
+    m = rotations
+    m00, m11, m22 = m[..., 0, 0], m[..., 1, 1], m[..., 2, 2]
+    trace = m00 + m11 + m22
+
+    candidates = np.stack([
+        np.stack([1.0 + trace, m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]], -1),
+        np.stack([m[..., 2, 1] - m[..., 1, 2], 1.0 + m00 - m11 - m22, m[..., 0, 1] + m[..., 1, 0], m[..., 0, 2] + m[..., 2, 0]], -1),
+        np.stack([m[..., 0, 2] - m[..., 2, 0], m[..., 0, 1] + m[..., 1, 0], 1.0 - m00 + m11 - m22, m[..., 1, 2] + m[..., 2, 1]], -1),
+        np.stack([m[..., 1, 0] - m[..., 0, 1], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 2] + m[..., 2, 1], 1.0 - m00 - m11 + m22], -1),
+    ], -2)
+
+    choice = np.argmax(np.stack([trace, m00, m11, m22], -1), axis=-1)
+    quaternions = np.take_along_axis(candidates, choice[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    quaternions[quaternions[..., 0] < 0.0] *= -1.0
+    return quaternions
+
+
+def make_quaternions_continuous(quaternions):
+    """Flip signs along (..., F, 4) sequences so neighbouring quaternions interpolate the short way
+
+    q and -q are the same rotation.
+    """
+    flips = np.ones(quaternions.shape[:-1])
+    dots = np.sum(quaternions[..., 1:, :] * quaternions[..., :-1, :], axis=-1)
+    flips[..., 1:] = np.where(dots < 0.0, -1.0, 1.0)
+    return quaternions * np.cumprod(flips, axis=-1)[..., np.newaxis]
+
+
+# Axis sequence and parity of every Euler order, as in Blender's rotation order table
+EULER_ORDERS = {
+    'XYZ': ((0, 1, 2), False),
+    'XZY': ((0, 2, 1), True),
+    'YXZ': ((1, 0, 2), True),
+    'YZX': ((1, 2, 0), False),
+    'ZXY': ((2, 0, 1), False),
+    'ZYX': ((2, 1, 0), True),
+}
+
+
+def _euler_solutions(rotations, order):
+    """Both Euler angle triples of (..., 3, 3) rotation matrices, following Blender's decomposition
+
+    Near gimbal lock the last axis is set to zero and both triples are equal.
+    """
+    (i, j, k), parity = EULER_ORDERS[order]
+
+    # Blender indexes matrices as [column][row]
+    def at(column, row):
+        return rotations[..., row, column]
+
+    cy = np.hypot(at(i, i), at(i, j))
+    regular = cy > 16.0 * np.finfo(np.float32).eps
+
+    first = np.empty(rotations.shape[:-2] + (3,))
+    first[..., i] = np.where(regular, np.arctan2(at(j, k), at(k, k)), np.arctan2(-at(k, j), at(j, j)))
+    first[..., j] = np.arctan2(-at(i, k), cy)
+    first[..., k] = np.where(regular, np.arctan2(at(i, j), at(i, i)), 0.0)
+
+    second = first.copy()
+    second[..., i] = np.where(regular, np.arctan2(-at(j, k), -at(k, k)), first[..., i])
+    second[..., j] = np.where(regular, np.arctan2(-at(i, k), -cy), first[..., j])
+    second[..., k] = np.where(regular, np.arctan2(-at(i, j), -at(i, i)), first[..., k])
+
+    if parity:
+        return -first, -second
+    return first, second
+
+
+def _compatible_eulers(eulers, previous):
+    """Shift (..., 3) Euler angles by whole turns to stay close to the previous angles"""
+    delta = eulers - previous
+    turns = np.where(np.abs(delta) > 5.1, np.sign(delta) * np.floor(np.abs(delta) / (2.0 * np.pi) + 0.5), 0.0)
+    eulers = eulers - turns * 2.0 * np.pi
+
+    # One axis more than 180 degrees off while the other two are small
+    delta = eulers - previous
+    large = np.abs(delta) > 3.2
+    small = np.abs(delta) < 1.6
+    for axis in range(3):
+        others = [other for other in range(3) if other != axis]
+        flip = large[..., axis] & small[..., others[0]] & small[..., others[1]]
+        eulers[..., axis] -= np.where(flip, np.sign(delta[..., axis]) * 2.0 * np.pi, 0.0)
+    return eulers
+
+
+def matrices_to_eulers(rotations, order):
+    """Convert (..., F, 3, 3) rotation matrix sequences to continuous Euler angles in ``order``
+
+    The first frame takes the smaller of the two solutions; every later frame
+    takes the solution closest to the previous frame after shifting it by
+    whole turns, like Blender's ``to_euler(order, compatible)``. The loop runs
+    over frames only, all sequences of a frame are handled at once.
+    """
+    first, second = _euler_solutions(np.asarray(rotations, dtype=np.float64), order)
+
+    eulers = np.empty_like(first)
+    use_second = np.abs(first[..., 0, :]).sum(-1) > np.abs(second[..., 0, :]).sum(-1)
+    eulers[..., 0, :] = np.where(use_second[..., np.newaxis], second[..., 0, :], first[..., 0, :])
+
+    for frame in range(1, first.shape[-2]):
+        previous = eulers[..., frame - 1, :]
+        candidates = [_compatible_eulers(solution[..., frame, :].copy(), previous) for solution in (first, second)]
+        distances = [np.abs(candidate - previous).sum(-1) for candidate in candidates]
+        eulers[..., frame, :] = np.where((distances[1] < distances[0])[..., np.newaxis], candidates[1], candidates[0])
+    return eulers
+
+
+def eulers_to_matrices(eulers, order):
+    """Convert (..., 3) Euler angles in ``order`` to (..., 3, 3) rotation matrices
+
+    The first axis of the order is applied first, so 'XYZ' gives Rz @ Ry @ Rx.
+    """
+    eulers = np.asarray(eulers, dtype=np.float64)
+    matrices = np.broadcast_to(np.eye(3), eulers.shape[:-1] + (3, 3))
+    for axis in ("XYZ".index(name) for name in order):
+        angles = eulers[..., axis]
+        following, last = (axis + 1) % 3, (axis + 2) % 3
+        rotation = np.zeros(angles.shape + (3, 3))
+        rotation[..., axis, axis] = 1.0
+        rotation[..., following, following] = np.cos(angles)
+        rotation[..., last, last] = np.cos(angles)
+        rotation[..., following, last] = -np.sin(angles)
+        rotation[..., last, following] = np.sin(angles)
+        matrices = rotation @ matrices
+    return matrices
+
+
+def quaternions_to_matrices(quaternions):
+    """Convert (..., 4) (w, x, y, z) quaternions to (..., 3, 3) rotation matrices, normalizing them first"""
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    norms = np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(quaternions / np.where(norms == 0.0, 1.0, norms), -1, 0)
+    return np.stack([
+        np.stack([1.0 - 2.0 * (y * y + z * z), 2.0 * (x * y - w * z), 2.0 * (x * z + w * y)], axis=-1),
+        np.stack([2.0 * (x * y + w * z), 1.0 - 2.0 * (x * x + z * z), 2.0 * (y * z - w * x)], axis=-1),
+        np.stack([2.0 * (x * z - w * y), 2.0 * (y * z + w * x), 1.0 - 2.0 * (x * x + y * y)], axis=-1),
+    ], axis=-2)
+
+
+def remove_delta_transforms(matrices, delta_locations, delta_rotations, delta_scales):
+    """Factor delta transforms out of (..., 4, 4) local matrices
+
+    Blender builds an object's local matrix as
+    ``T(location + delta_location) @ delta_rotation @ rotation @ S(scale * delta_scale)``.
+    The returned matrices decompose into the location, rotation and scale
+    channels that reproduce ``matrices`` on top of the given (..., 3) delta
+    locations, (..., 3, 3) delta rotation matrices and (..., 3) delta scales,
+    which must not contain zeros.
+    """
+    result = np.array(matrices, dtype=np.float64)
+    delta_rotations = np.asarray(delta_rotations, dtype=np.float64)
+    result[..., :3, 3] -= delta_locations
+    # Rotation matrices are orthogonal, so the transpose is the inverse
+    result[..., :3, :3] = np.swapaxes(delta_rotations, -1, -2) @ result[..., :3, :3]
+    result[..., :3, :3] /= np.asarray(delta_scales, dtype=np.float64)[..., np.newaxis, :]
+    return result
+
+
+def quaternions_to_axis_angles(quaternions):
+    """Convert (..., 4) unit quaternions to (angle, x, y, z) values"""
+    w = np.clip(quaternions[..., 0], -1.0, 1.0)
+    angles = 2.0 * np.arccos(w)
+    sines = np.sqrt(np.maximum(1.0 - w * w, 0.0))
+
+    axes = np.zeros(quaternions.shape[:-1] + (3,))
+    axes[..., 1] = 1.0
+    rotating = sines > 1e-8
+    axes[rotating] = quaternions[rotating][:, 1:] / sines[rotating][:, np.newaxis]
+    return np.concatenate([angles[..., np.newaxis], axes], axis=-1)
+
+
+def decompose_matrices(matrices):
+    """Decompose (N, 4, 4) matrices into position, (w, x, y, z) rotation and scale arrays"""
+    positions, rotations, scales = split_matrices(matrices)
+    quaternions = matrices_to_quaternions(rotations)
+    return positions.astype(np.float32), quaternions.astype(np.float32), scales.astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# Replacement planning
+# ---------------------------------------------------------------------------
+
+def orphaned_data(data_keys, users):
+    """Data left without users once every object in a batch is removed
+
+    ``data_keys`` holds the key of the data used by every removed object
+    (``None`` for objects without data, or data that must be kept) and
+    ``users`` the current number of real users of every key.
+    """
+    removed_users = Counter(key for key in data_keys if key is not None)
+    return [key for key, count in removed_users.items() if users[key] <= count]
+
+
+# ---------------------------------------------------------------------------
+# Evaluation cost attribution
+# ---------------------------------------------------------------------------
+
+def count_buckets(counts):
+    """Round counts down to a power of two (0, 1, 2, 4, 8, ...) so similar objects share a group"""
+    counts = np.asarray(counts, dtype=np.int64)
+    buckets = np.zeros_like(counts)
+    positive = counts > 0
+    buckets[positive] = 1 << (np.log2(counts[positive]).astype(np.int64))
+    return buckets
+
+
+def group_rows(features):
+    """Group objects with identical feature rows
+
+    Returns the group of every object, the feature row of every group and
+    the number of objects in every group.
+    """
+    features = np.asarray(features, dtype=np.int64).reshape(len(features), -1)
+    group_features, group_ids, group_sizes = np.unique(
+        features, axis=0, return_inverse=True, return_counts=True
+    )
+    return group_ids.reshape(-1), group_features, group_sizes
+
+
+def attribute_costs(group_ids, baseline, ablated, weights=None):
+    """Split measured evaluation time over groups and their objects
+
+    ``baseline`` is the time with everything evaluated and ``ablated[g]`` the
+    time with the animation of group ``g`` disabled (NaN for groups that were
+    not measured). The cost of a group is the time its animation adds,
+    clipped at zero for timing noise, and is shared by its objects in
+    proportion to ``weights`` (evenly by default). Returns the per-group and
+    per-object costs; unmeasured groups and their objects cost NaN.
+    """
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    weights = np.ones(len(group_ids)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    group_costs = np.maximum(baseline - np.asarray(ablated, dtype=np.float64), 0.0)
+    group_weights = np.bincount(group_ids, weights=weights, minlength=len(group_costs))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shares = np.where(group_weights[group_ids] > 0.0, weights / group_weights[group_ids], 0.0)
+    return group_costs, group_costs[group_ids] * shares
+
+
+def top_indices(costs, count):
+    """Indices of the ``count`` largest costs, largest first, ignoring NaN"""
+    costs = np.asarray(costs, dtype=np.float64)
+    order = np.argsort(-np.nan_to_num(costs, nan=-np.inf), kind="stable")
+    order = order[~np.isnan(costs[order])]
+    return order[:count]
+
+
+# ---------------------------------------------------------------------------
+# Level of detail
+# ---------------------------------------------------------------------------
+
+def lod_cells(positions, cell_size):
+    """Bucket positions into a uniform grid
+
+    Returns the cell of every position plus the centre and bounding radius
+    (distance from the centre to the farthest member) of every occupied cell.
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    if not len(positions):
+        return np.empty(0, dtype=np.int64), np.empty((0, 3)), np.empty(0)
+
+    coordinates = np.floor(positions / cell_size).astype(np.int64)
+    _, cell_ids, sizes = np.unique(coordinates, axis=0, return_inverse=True, return_counts=True)
+    cell_ids = cell_ids.reshape(-1)
+
+    centers = np.stack([
+        np.bincount(cell_ids, weights=positions[:, axis], minlength=len(sizes)) for axis in range(3)
+    ], axis=1) / sizes[:, np.newaxis]
+
+    order = np.argsort(cell_ids, kind="stable")
+    distances = np.linalg.norm(positions - centers[cell_ids], axis=1)
+    radii = np.maximum.reduceat(distances[order], np.concatenate([[0], np.cumsum(sizes)[:-1]]))
+    return cell_ids, centers, radii
+
+
+def lod_levels(positions, camera_location, thresholds, cells):
+    """LOD level of every position: the number of ascending distance thresholds it reaches
+
+    ``cells`` comes from ``lod_cells``. A cell whose bounding sphere lies in
+    one distance band takes its level from the centre distance as a whole;
+    only positions in cells straddling a threshold are measured one by one.
+    """
+    cell_ids, centers, radii = cells
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    camera = np.asarray(camera_location, dtype=np.float64)
+
+    center_distances = np.linalg.norm(centers - camera, axis=1)
+    near = np.searchsorted(thresholds, center_distances - radii, side="right")
+    far = np.searchsorted(thresholds, center_distances + radii, side="right")
+
+    levels = near[cell_ids].astype(np.int8)
+    straddling = np.flatnonzero((near != far)[cell_ids])
+    if len(straddling):
+        distances = np.linalg.norm(np.asarray(positions, dtype=np.float64)[straddling] - camera, axis=1)
+        levels[straddling] = np.searchsorted(thresholds, distances, side="right")
+    return levels
+
+
+def lod_changes(levels):
+    """Compact (F, N) per-frame levels into the first frame and the changes of each later frame
+
+    Returns ``(initial, offsets, objects, values)``; the changes of frame
+    index ``f`` are ``objects[offsets[f]:offsets[f + 1]]`` set to the matching
+    ``values``.
+    """
+    levels = np.asarray(levels, dtype=np.int8)
+    changed = levels[1:] != levels[:-1]
+    frame_indices, objects = np.nonzero(changed)
+    counts = np.bincount(frame_indices + 1, minlength=len(levels))
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    return levels[0].copy(), offsets, objects, levels[1:][changed]
+
+
+def lod_levels_at(initial, offsets, objects, values, frame_index):
+    """Replay baked LOD changes up to a frame index, clamped to the baked range"""
+    frame_index = min(max(int(frame_index), 0), len(offsets) - 2)
+    end = offsets[frame_index + 1]
+
+    # The last change of every object wins
+    changed_objects, last = np.unique(objects[:end][::-1], return_index=True)
+    levels = np.array(initial, dtype=np.int8)
+    levels[changed_objects] = values[:end][::-1][last]
+    return levels
+
+
+# ---------------------------------------------------------------------------
+# Memory footprint
+# ---------------------------------------------------------------------------
+
+def footprint_summary(sizes, users, fake_users, **elements):
+    """Count, estimated bytes, users and orphans of the datablocks of one type
+
+    ``sizes``, ``users`` and ``fake_users`` hold one value per datablock; a
+    datablock whose only users are fake users is an orphan. Keyword arrays
+    (vertices, keyframes, ...) are summed into the summary as well.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    users = np.asarray(users, dtype=np.int64)
+    orphaned = users - np.asarray(fake_users, dtype=np.int64) <= 0
+
+    summary = {
+        "count": len(sizes),
+        "bytes": int(sizes.sum()),
+        "users": int(users.sum()),
+        "orphans": int(np.count_nonzero(orphaned)),
+        "orphan_bytes": int(sizes[orphaned].sum()),
+    }
+    for name, values in elements.items():
+        summary[name] = int(np.sum(values, dtype=np.int64))
+    return summary
+
+
+def footprint_delta(before, after):
+    """Difference ``after - before`` of every counter of every datablock type in two snapshots"""
+    delta = {}
+    for block_type in sorted(set(before) | set(after)):
+        old = before.get(block_type, {})
+        new = after.get(block_type, {})
+        delta[block_type] = {name: new.get(name, 0) - old.get(name, 0) for name in {**old, **new}}
+    return delta
@@ -1,10 +1,21 @@
 """
 Test script for NLA Strip Randomizer addon
 This script creates sample objects with NLA animation data for testing the addon.
+
+It also contains a headless benchmark suite for the addon operators:
+
+    blender --background --factory-startup --python test_nla_strip_randomizer.py -- \
+        --benchmark --sizes 100,1000,10000,50000 --output bench.json --baseline benchmark_baseline.json
 """
 
 import bpy
+import bmesh
 import random
+import argparse
+import json
+import os
+import sys
+import time
 
 def create_test_scene():
     """Create a test scene with objects that have NLA animation data"""
@@ -95,7 +106,264 @@ def print_object_info():
                 print(f"      End: {strip.frame_end_ui}")
                 print(f"      Scale: {strip.scale}")
 
+def ensure_addon_registered():
+    """Register the addon from this directory if it is not enabled yet
+
+    Self-contained, as the extension package ships this script without the
+    batch runner.
+    """
+    if hasattr(bpy.types.Scene, "nla_strip_randomizer"):
+        return
+
+    import importlib.util
+
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    spec = importlib.util.spec_from_file_location(
+        "animation_object_tools", os.path.join(addon_dir, "__init__.py"), submodule_search_locations=[addon_dir]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    module.register()
+
+
+def clear_scene():
+    """Remove every object, mesh and action in the file in one batch"""
+    ids = list(bpy.data.objects) + list(bpy.data.meshes) + list(bpy.data.actions)
+    bpy.data.batch_remove(ids)
+
+
+def create_action_pool(count=4, length=30):
+    """Create a few shared actions for the generated strips"""
+    actions = []
+    for i in range(count):
+        action = bpy.data.actions.new(name=f"BenchAction_{i}")
+        for index in range(3):
+            fcurve = action.fcurves.new(data_path="location", index=index)
+            fcurve.keyframe_points.add(2)
+            fcurve.keyframe_points.foreach_set("co", [1, 0, length, 1 + i])
+            fcurve.update()
+        actions.append(action)
+    return actions
+
+
+def create_cube_mesh(name, size):
+    """Create a cube mesh without going through operators"""
+    mesh = bpy.data.meshes.new(name)
+    bm = bmesh.new()
+    bmesh.ops.create_cube(bm, size=size)
+    bm.to_mesh(mesh)
+    bm.free()
+    return mesh
+
+
+def generate_scene(object_count, tracks_per_object=1, strips_per_track=1,
+                   hierarchy_depth=0, duplicate_ratio=0.5, seed=0):
+    """Generate a parametric benchmark scene
+
+    Objects are spread over a cube that grows with the object count. Every
+    object gets ``tracks_per_object`` NLA tracks of ``strips_per_track``
+    strips, objects are chained into parent hierarchies ``hierarchy_depth``
+    levels deep, and ``duplicate_ratio`` of them carry a copy of the template
+    mesh so they can be replaced with instances.
+
+    Returns a dict with the template object and the generated object lists.
+    """
+    clear_scene()
+    rng = random.Random(seed)
+    scene = bpy.context.scene
+    collection = scene.collection
+
+    actions = create_action_pool()
+    template_mesh = create_cube_mesh("BenchTemplate", 1.0)
+    variant_mesh = create_cube_mesh("BenchVariant", 0.5)
+
+    template = bpy.data.objects.new("BenchTemplate", template_mesh)
+    collection.objects.link(template)
+
+    extent = max(object_count, 1) ** (1.0 / 3.0) * 2.0
+    chain_length = hierarchy_depth + 1
+    objects = []
+    duplicates = []
+    parented = []
+
+    for i in range(object_count):
+        is_duplicate = rng.random() < duplicate_ratio
+        mesh = (template_mesh if is_duplicate else variant_mesh).copy()
+        obj = bpy.data.objects.new(f"BenchObject_{i}", mesh)
+        collection.objects.link(obj)
+        obj.location = (rng.uniform(-extent, extent),
+                        rng.uniform(-extent, extent),
+                        rng.uniform(-extent, extent))
+
+        if i % chain_length:
+            obj.parent = objects[i - 1]
+            parented.append(obj)
+        if is_duplicate:
+            duplicates.append(obj)
+
+        anim_data = obj.animation_data_create()
+        for t in range(tracks_per_object):
+            track = anim_data.nla_tracks.new()
+            track.name = f"Track_{t}"
+            for s in range(strips_per_track):
+                action = actions[(i + t + s) % len(actions)]
+                track.strips.new(name=f"Strip_{s}", start=1 + s * 40, action=action)
+
+        objects.append(obj)
+
+    bpy.context.view_layer.update()
+
+    return {
+        "template": template,
+        "objects": objects,
+        "parented": parented,
+        "duplicates": duplicates,
+    }
+
+
+def select_only(objects, active=None):
+    """Select exactly the given objects"""
+    for obj in bpy.context.view_layer.objects:
+        obj.select_set(False)
+    for obj in objects:
+        obj.select_set(True)
+    if active is not None:
+        active.select_set(True)
+        bpy.context.view_layer.objects.active = active
+
+
+def time_operator(operator):
+    """Run an operator and return its result and the elapsed seconds"""
+    start = time.perf_counter()
+    result = operator()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark_size(object_count, tracks_per_object, strips_per_track,
+                       hierarchy_depth, duplicate_ratio, seed):
+    """Time all three operators on one generated scene"""
+    start = time.perf_counter()
+    scene_data = generate_scene(object_count, tracks_per_object, strips_per_track,
+                                hierarchy_depth, duplicate_ratio, seed)
+    generate_time = time.perf_counter() - start
+
+    strip_count = object_count * tracks_per_object * strips_per_track
+    print(f"\nGenerated {object_count} objects ({strip_count} strips) in {generate_time:.2f}s")
+
+    results = []
+    runs = [
+        ("apply_offset_and_random_scale", scene_data["objects"], None, bpy.ops.nla.apply_offset_and_random_scale),
+        ("fix_parent_transforms", scene_data["parented"], None, bpy.ops.nla.fix_parent_transforms),
+        ("replace_with_instance", scene_data["duplicates"], scene_data["template"], bpy.ops.nla.replace_with_instance),
+    ]
+
+    for name, objects, active, operator in runs:
+        select_only(objects, active)
+        result, seconds = time_operator(operator)
+        print(f"  {name}: {seconds:.3f}s on {len(objects)} objects {sorted(result)}")
+        results.append({
+            "operator": name,
+            "size": object_count,
+            "objects": len(objects),
+            "strips": strip_count,
+            "seconds": seconds,
+            "result": sorted(result),
+        })
+
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance, min_delta):
+    """Return the runs that are slower than the stored baseline allows"""
+    reference = {(entry["operator"], entry["size"]): entry["seconds"] for entry in baseline["results"]}
+    regressions = []
+
+    for entry in results:
+        expected = reference.get((entry["operator"], entry["size"]))
+        if expected is None:
+            continue
+        limit = max(expected * (1.0 + tolerance), expected + min_delta)
+        if entry["seconds"] > limit:
+            regressions.append({**entry, "baseline": expected, "limit": limit})
+
+    return regressions
+
+
+def run_benchmarks(argv):
+    """Run the benchmark suite from the command line and return an exit code"""
+    parser = argparse.ArgumentParser(description="Benchmark the Animation Object Tools operators")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--sizes", default="100,1000,10000,50000",
+                        help="Comma separated object counts (default: 100,1000,10000,50000)")
+    parser.add_argument("--tracks", type=int, default=1, help="NLA tracks per object")
+    parser.add_argument("--strips", type=int, default=1, help="Strips per track")
+    parser.add_argument("--depth", type=int, default=2, help="Parent hierarchy depth")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.5,
+                        help="Fraction of objects that are replaceable duplicates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Fail when a run is slower than this stored result file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown relative to the baseline (default: 0.25)")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="Slowdowns below this many seconds are never regressions (default: 0.05)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Store these results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    # A mistyped baseline must fail the regression gate, not skip it; check before the long runs
+    if args.baseline and not args.update_baseline and not os.path.exists(args.baseline):
+        print(f"ERROR Baseline file not found: {args.baseline} (use --update-baseline to create it)")
+        return 2
+
+    ensure_addon_registered()
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(",")):
+        results.extend(run_benchmark_size(size, args.tracks, args.strips, args.depth,
+                                          args.duplicate_ratio, args.seed))
+
+    report = {
+        "blender": bpy.app.version_string,
+        "parameters": {
+            "tracks": args.tracks,
+            "strips": args.strips,
+            "depth": args.depth,
+            "duplicate_ratio": args.duplicate_ratio,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta)
+        for entry in regressions:
+            print(f"REGRESSION {entry['operator']} @ {entry['size']}: "
+                  f"{entry['seconds']:.3f}s > {entry['limit']:.3f}s (baseline {entry['baseline']:.3f}s)")
+        if regressions:
+            return 1
+        print("No regressions against the baseline")
+
+    return 0
+
+
 if __name__ == "__main__":
+    script_args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if "--benchmark" in script_args:
+        sys.exit(run_benchmarks(script_args))
+
     # Create test scene
     test_objects = create_test_scene()
     
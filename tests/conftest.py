@@ -0,0 +1,45 @@
+"""
+pytest setup: make the NumPy core importable and load the addon against the fake bpy
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ADDON_DIR = Path(__file__).resolve().parent.parent
+ADDON_MODULE = "animation_object_tools"
+
+sys.path.insert(0, str(ADDON_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_bpy  # noqa: E402
+
+# The addon directory is itself a package, so pytest imports its __init__.py
+# while setting up the tests; the fake modules have to be in place by then
+fake_bpy.install()
+
+
+@pytest.fixture(scope="session")
+def addon():
+    """The addon module, imported from this directory without registering it"""
+    if ADDON_MODULE in sys.modules:
+        return sys.modules[ADDON_MODULE]
+
+    spec = importlib.util.spec_from_file_location(
+        ADDON_MODULE, ADDON_DIR / "__init__.py", submodule_search_locations=[str(ADDON_DIR)]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def blend_data():
+    """The fake bpy.data, emptied again after the test"""
+    data = sys.modules["bpy"].data
+    yield data
+    data.objects.clear()
+    data.removed.clear()
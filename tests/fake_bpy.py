@@ -0,0 +1,306 @@
+"""
+Lightweight stand-in for the parts of bpy the addon touches at import time
+
+Installing it lets plain pytest import the addon module and drive its
+bulk-read/bulk-write adapters with the fake objects, tracks and strips
+below. It only models what the tests use; anything that needs a real
+Blender session (operators, depsgraph, Geometry Nodes) is out of scope.
+"""
+
+import importlib.util
+import sys
+import types
+
+import numpy as np
+
+
+class _Placeholder:
+    """Base class standing in for every bpy.types class"""
+
+
+def _property(*args, **kwargs):
+    """bpy.props functions only need to return something at class creation time"""
+    return ("property", kwargs)
+
+
+class _Types(types.ModuleType):
+    def __getattr__(self, name):
+        cls = type(name, (_Placeholder,), {})
+        setattr(self, name, cls)
+        return cls
+
+
+def install():
+    """Register fake bpy, mathutils and bpy_extras modules unless Blender's are available"""
+    if importlib.util.find_spec("bpy") is not None:
+        return False
+
+    bpy = types.ModuleType("bpy")
+    bpy.props = types.ModuleType("bpy.props")
+    for name in (
+        "FloatProperty", "IntProperty", "BoolProperty", "EnumProperty", "PointerProperty",
+        "StringProperty", "CollectionProperty", "FloatVectorProperty",
+    ):
+        setattr(bpy.props, name, _property)
+    bpy.types = _Types("bpy.types")
+
+    bpy.app = types.SimpleNamespace(background=True, handlers=types.SimpleNamespace(
+        persistent=lambda function: function,
+        load_post=[], undo_post=[], redo_post=[], depsgraph_update_post=[],
+        frame_change_pre=[], frame_change_post=[],
+    ))
+    bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+    bpy.data = FakeBlendData()
+    bpy.context = types.SimpleNamespace()
+
+    bpy_extras = types.ModuleType("bpy_extras")
+    bpy_extras.io_utils = types.ModuleType("bpy_extras.io_utils")
+    bpy_extras.io_utils.ExportHelper = type("ExportHelper", (), {})
+    bpy_extras.io_utils.ImportHelper = type("ImportHelper", (), {})
+
+    sys.modules.update({
+        "bpy": bpy,
+        "bpy.props": bpy.props,
+        "bpy.types": bpy.types,
+        "bpy_extras": bpy_extras,
+        "bpy_extras.io_utils": bpy_extras.io_utils,
+        "mathutils": types.ModuleType("mathutils"),
+    })
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Fake data
+# ---------------------------------------------------------------------------
+
+class FakeIDCollection(dict):
+    """Name-keyed collection like bpy.data.objects"""
+
+    def __iter__(self):
+        return iter(self.values())
+
+    def get(self, name, default=None):
+        return dict.get(self, name, default)
+
+
+class FakeBlendData:
+    """bpy.data with the object collection and batch removal"""
+
+    def __init__(self):
+        self.objects = FakeIDCollection()
+        self.removed = []
+
+    def batch_remove(self, ids):
+        for id_data in ids:
+            self.objects.pop(getattr(id_data, "name", None), None)
+            self.removed.append(id_data)
+
+
+class FakeArrays:
+    """Collection read in bulk, storing every attribute as one flat array"""
+
+    def __init__(self, count, **arrays):
+        self.count = count
+        self.arrays = {name: np.asarray(values).ravel() for name, values in arrays.items()}
+
+    def __len__(self):
+        return self.count
+
+    def foreach_get(self, attribute, buffer):
+        buffer[:] = self.arrays[attribute]
+
+
+class FakeFCurve:
+    """F-Curve with (K, 2) keyframe coordinates and flat handles"""
+
+    def __init__(self, data_path, array_index, points):
+        points = np.asarray(points, dtype=np.float32)
+        count = len(points)
+        self.data_path = data_path
+        self.array_index = array_index
+        self.extrapolation = 'CONSTANT'
+        self.mute = False
+        self.modifiers = []
+        self.keyframe_points = FakeArrays(
+            count, co=points, handle_left=points - (1.0, 0.0), handle_right=points + (1.0, 0.0),
+            interpolation=np.full(count, 1), easing=np.zeros(count),
+            handle_left_type=np.zeros(count), handle_right_type=np.zeros(count),
+        )
+
+
+class FakeAction:
+    def __init__(self, name, fcurves=()):
+        self.name = name
+        self.fcurves = list(fcurves)
+        self.use_frame_range = False
+        self.frame_range = (0.0, 0.0)
+        self.use_cyclic = False
+
+
+class FakeMesh:
+    """Mesh with positions, edges and polygons, and a user count for removal"""
+
+    def __init__(self, name, positions, edges=(), polygons=(), users=1):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        loops = [index for polygon in polygons for index in polygon]
+        loop_starts = np.cumsum([0] + [len(polygon) for polygon in polygons])[:-1]
+        self.name = name
+        self.vertices = FakeArrays(len(positions), co=positions)
+        self.edges = FakeArrays(len(edges), vertices=edges)
+        self.loops = FakeArrays(len(loops), vertex_index=np.array(loops, dtype=np.int32))
+        self.polygons = FakeArrays(len(polygons), loop_start=loop_starts)
+        self.attributes = []
+        self.materials = []
+        self.shape_keys = None
+        self.has_custom_normals = False
+        self.users = users
+        self.use_fake_user = False
+
+    def as_pointer(self):
+        return id(self)
+
+
+class FakeStrip:
+    """NLA strip with Blender's setter behaviour
+
+    Moving the start keeps the length and clamps against the neighbouring
+    strips of the track; changing the scale moves the end.
+    """
+
+    def __init__(self, track, start, end, scale=1.0):
+        self.track = track
+        self._start = float(start)
+        self._end = float(end)
+        self._scale = float(scale)
+
+    @property
+    def frame_start_ui(self):
+        return self._start
+
+    @frame_start_ui.setter
+    def frame_start_ui(self, value):
+        length = self._end - self._start
+        previous, following = self.track.neighbours(self)
+        if previous is not None:
+            value = max(value, previous.frame_end_ui)
+        if following is not None:
+            value = min(value, following.frame_start_ui - length)
+        self._start = float(value)
+        self._end = float(value) + length
+
+    @property
+    def frame_end_ui(self):
+        return self._end
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        length = (self._end - self._start) / self._scale * value
+        _, following = self.track.neighbours(self)
+        if following is not None:
+            length = min(length, following.frame_start_ui - self._start)
+        self._end = self._start + length
+        self._scale = float(value)
+
+
+class FakeStrips(list):
+    """Strip collection supporting bulk access"""
+
+    def foreach_get(self, attribute, buffer):
+        for index, strip in enumerate(self):
+            buffer[index] = getattr(strip, attribute)
+
+    def foreach_set(self, attribute, values):
+        for strip, value in zip(self, values):
+            setattr(strip, attribute, float(value))
+
+
+class FakeTrack:
+    def __init__(self, owner, name="NlaTrack"):
+        self.id_data = owner
+        self.name = name
+        self.strips = FakeStrips()
+
+    def add_strip(self, start, end, scale=1.0):
+        strip = FakeStrip(self, start, end, scale)
+        self.strips.append(strip)
+        return strip
+
+    def neighbours(self, strip):
+        """The strips before and after a strip in time"""
+        ordered = sorted(self.strips, key=lambda item: item._start)
+        index = ordered.index(strip)
+        previous = ordered[index - 1] if index > 0 else None
+        following = ordered[index + 1] if index + 1 < len(ordered) else None
+        return previous, following
+
+
+class FakeCollection:
+    """Collection with linked objects and child collections"""
+
+    def __init__(self, name, children=()):
+        self.name = name
+        self.objects = []
+        self.children = list(children)
+
+    @property
+    def children_recursive(self):
+        result = []
+        for child in self.children:
+            result.append(child)
+            result.extend(child.children_recursive)
+        return result
+
+    def link(self, obj):
+        self.objects.append(obj)
+        obj.users_collection.append(self)
+
+    def unlink(self, obj):
+        self.objects.remove(obj)
+        obj.users_collection.remove(self)
+
+    def as_pointer(self):
+        return id(self)
+
+
+class FakeObject(dict):
+    """Object with a name, location, custom properties and NLA tracks"""
+
+    def __init__(self, name, location=(0.0, 0.0, 0.0), **properties):
+        super().__init__(properties)
+        self.name = name
+        self.location = tuple(location)
+        self.animation_data = types.SimpleNamespace(nla_tracks=[])
+        self.rotation_mode = 'XYZ'
+        self.delta_location = (0.0, 0.0, 0.0)
+        self.delta_rotation_euler = (0.0, 0.0, 0.0)
+        self.delta_rotation_quaternion = (1.0, 0.0, 0.0, 0.0)
+        self.delta_scale = (1.0, 1.0, 1.0)
+        self.users_collection = []
+        self.parent = None
+        self.data = None
+        self.update_tags = []
+
+    # Like Blender IDs, objects are always truthy and compared by identity, not by their custom properties
+    __eq__ = object.__eq__
+    __hash__ = object.__hash__
+
+    def __bool__(self):
+        return True
+
+    def add_track(self, strips=()):
+        track = FakeTrack(self)
+        for strip in strips:
+            track.add_strip(*strip)
+        self.animation_data.nla_tracks.append(track)
+        return track
+
+    def update_tag(self, refresh=None):
+        self.update_tags.append(refresh)
+
+    def as_pointer(self):
+        return id(self)
@@ -0,0 +1,392 @@
+"""
+Tests for the bulk read/write adapters, driven with the fake bpy objects
+"""
+
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import core
+from fake_bpy import FakeAction, FakeCollection, FakeFCurve, FakeMesh, FakeObject
+
+
+def spans(track):
+    return [(strip.frame_start_ui, strip.frame_end_ui) for strip in track.strips]
+
+
+def test_strip_batch_reads_every_track(addon):
+    first = FakeObject("A")
+    first.add_track([(0, 10), (20, 30, 2.0)])
+    first.add_track([])
+    first.add_track([(5, 8)])
+    second = FakeObject("B")
+    second.add_track([(1, 4)])
+    empty = FakeObject("C")
+
+    batch = addon._StripBatch([first, empty, second])
+
+    assert len(batch) == 4
+    assert batch.track_indices == [0, 2, 0]
+    np.testing.assert_array_equal(batch.counts, [2, 1, 1])
+    np.testing.assert_array_equal(batch.strip_objects, [0, 0, 0, 2])
+    np.testing.assert_array_equal(batch.strip_ordinals, [0, 1, 2, 0])
+    np.testing.assert_array_equal(batch.starts, [0, 20, 5, 1])
+    np.testing.assert_array_equal(batch.ends, [10, 30, 8, 4])
+    np.testing.assert_array_equal(batch.scales, [1, 2, 1, 1])
+
+
+def test_write_moves_and_scales_strips(addon):
+    obj = FakeObject("A")
+    track = obj.add_track([(0, 10)])
+    batch = addon._StripBatch([obj])
+
+    batch.write(np.array([5.0]), np.array([2.0]))
+
+    assert spans(track) == [(5.0, 25.0)]
+    assert obj.update_tags == [{'TIME'}]
+    starts, ends, scales = batch.read()
+    np.testing.assert_array_equal(scales, [2.0])
+
+
+def test_sequential_write_avoids_neighbour_clamping(addon):
+    obj = FakeObject("A")
+    track = obj.add_track([(0, 10), (12, 22)])
+    target_starts = np.array([30.0, 45.0])
+    target_scales = np.array([1.0, 1.0])
+
+    addon._write_track_strips([track], [2], target_starts, target_scales)
+    # Blender clamps the first strip against the second one, which has not moved yet
+    assert spans(track) == [(2.0, 12.0), (45.0, 55.0)]
+
+    obj = FakeObject("B")
+    track = obj.add_track([(0, 10), (12, 22)])
+    addon._write_track_strips([track], [2], target_starts, target_scales, sequential=True)
+    assert spans(track) == [(30.0, 40.0), (45.0, 55.0)]
+
+
+def test_write_skips_missing_tracks(addon):
+    first = FakeObject("A")
+    kept = first.add_track([(0, 10)])
+    second = FakeObject("B")
+    second.add_track([(0, 10), (20, 30)])
+
+    addon._write_track_strips([None, kept], [2, 1], np.array([5.0, 25.0, 50.0]), np.ones(3))
+
+    assert spans(kept) == [(50.0, 60.0)]
+    assert second.update_tags == []
+    assert first.update_tags == [{'TIME'}]
+
+
+def test_expression_variables_read_custom_properties(addon):
+    objects = [FakeObject("A", delay=2), FakeObject("B")]
+    locations = np.array([[1.0, 0.0, 0.0], [0.0, 3.0, 0.0]])
+    keys = core.object_keys([obj.name for obj in objects], seed=0)
+
+    variables = addon._expression_variables(objects, np.arange(2), 2, locations, keys, (0.0, 0.0, 0.0), 0, {"delay"})
+    result = core.compile_expression('dist + prop("delay")').evaluate(variables, 2)
+
+    np.testing.assert_allclose(result, [3.0, 3.0])
+
+
+def test_compute_offsets_dispatches_on_method(addon):
+    locations = np.array([[0.0, 4.0, 0.0]])
+    keys = core.object_keys(["A"], seed=0)
+    nla_tool = types.SimpleNamespace(offset_method='CURSOR', offset_multiplier=0.5, max_random_offset=10.0)
+
+    np.testing.assert_allclose(addon._compute_offsets(nla_tool, locations, keys, (0.0, 0.0, 0.0)), [2.0])
+
+    nla_tool.offset_method = 'RANDOM'
+    np.testing.assert_array_equal(addon._compute_offsets(nla_tool, locations, keys), core.random_offsets(keys, 10.0))
+
+
+def test_compute_strip_layout_in_both_layouts(addon):
+    obj = FakeObject("A")
+    obj.add_track([(0, 10), (20, 25)])
+    batch = addon._StripBatch([obj])
+    keys = core.object_keys(["A"], seed=0)
+    nla_tool = types.SimpleNamespace(
+        scale_expression="", scale_min=1.0, scale_max=1.0, base_start_frame=100.0, strip_layout='ABSOLUTE',
+    )
+
+    starts, scales = addon._compute_strip_layout(nla_tool, batch, np.array([5.0]), keys)
+    np.testing.assert_array_equal(starts, [105.0, 105.0])
+    np.testing.assert_array_equal(scales, [1.0, 1.0])
+
+    nla_tool.strip_layout = 'SEQUENCE'
+    starts, _ = addon._compute_strip_layout(nla_tool, batch, np.array([5.0]), keys)
+    np.testing.assert_array_equal(starts, [105.0, 125.0])
+
+
+def test_format_bytes(addon):
+    assert addon._format_bytes(512) == "+512 B"
+    assert addon._format_bytes(-3 * 1024 * 1024) == "-3.0 MB"
+    assert addon._format_bytes(5 * 1024 ** 4) == "+5120.0 GB"
+
+
+def test_strip_undo_skips_global_push_in_background(addon):
+    nla_tool = types.SimpleNamespace(use_undo_journal=False, undo_journal_steps=8)
+
+    # The fake bpy has no ops; reaching the push would raise AttributeError
+    addon._commit_strip_undo(nla_tool, "Apply", [])
+
+
+def test_animated_index_follows_objects_not_names(addon):
+    child = FakeCollection("Child")
+    scene_collection = FakeCollection("Scene", [child])
+    other = FakeCollection("Other")
+    first = FakeObject("A")
+    first.add_track([(0, 10), (20, 30)])
+    second = FakeObject("B")
+    second.add_track([(0, 10)])
+    child.link(first)
+    other.link(second)
+
+    index = addon._AnimatedObjectIndex()
+    for obj in (first, second):
+        index.update_object(obj)
+    index.valid = True
+    assert index.objects(scene_collection) == [first]
+    assert index.totals() == (2, 3)
+
+    # Renaming the outside object to the indexed name does not pull it into scope
+    first.name, second.name = "Renamed", "A"
+    assert index.objects(scene_collection) == [first]
+
+    # Unlinked objects drop out on the next query, and from the totals
+    child.unlink(first)
+    first.animation_data.nla_tracks.clear()
+    assert index.objects(scene_collection) == []
+    assert index.totals() == (1, 1)
+
+
+def test_cursor_preview_flag_clears_on_error_and_load(addon):
+    preview_class = addon.NLA_OT_preview_cursor_offset
+    removed = []
+    context = types.SimpleNamespace(
+        window_manager=types.SimpleNamespace(event_timer_remove=removed.append),
+        workspace=types.SimpleNamespace(status_text_set=lambda text: None),
+    )
+    preview = preview_class()
+    preview._timer = "timer"
+
+    def fail(context, event):
+        raise KeyError("boom")
+
+    preview._handle_event = fail
+    preview_class._running = True
+    with pytest.raises(KeyError):
+        preview.modal(context, types.SimpleNamespace(type='TIMER'))
+    assert not preview_class._running
+    assert removed == ["timer"]
+
+    preview_class._running = True
+    addon._reset_cursor_preview(None)
+    assert not preview_class._running
+
+
+def test_strip_journal_undo_redo_round_trip(addon, blend_data):
+    obj = FakeObject("A")
+    track = obj.add_track([(0, 10), (20, 30)])
+    blend_data.objects[obj.name] = obj
+    batch = addon._StripBatch([obj])
+    batch.write(np.array([40.0, 55.0]), np.array([1.0, 2.0]), sequential=True)
+    obj[addon.CACHE_SIGNATURE] = "digest"
+
+    journal = addon._StripJournal()
+    journal.push(addon._JournalEntry("Apply", [(batch, *batch.read())]), limit=8)
+    assert journal.can_undo and not journal.can_redo
+
+    entry, restored = journal.undo()
+    assert (entry.label, restored) == ("Apply", 1)
+    assert spans(track) == [(0.0, 10.0), (20.0, 30.0)]
+    assert addon.CACHE_SIGNATURE not in obj
+
+    journal.redo()
+    assert spans(track) == [(40.0, 50.0), (55.0, 75.0)]
+
+    # A track whose strip count changed is skipped rather than written
+    journal.undo()
+    track.add_strip(100, 110)
+    _, restored = journal.redo()
+    assert restored == 0
+
+
+def test_strip_journal_drops_redo_and_old_steps(addon):
+    journal = addon._StripJournal()
+    entries = [addon._JournalEntry(str(index), []) for index in range(4)]
+    for entry in entries[:3]:
+        journal.push(entry, limit=2)
+    assert journal.entries == entries[1:3]
+
+    journal.position = 1
+    journal.push(entries[3], limit=2)
+    assert journal.entries == [entries[1], entries[3]]
+    assert not journal.can_redo
+
+
+def test_animated_index_rebuilds_after_invalidation(addon, blend_data):
+    scene_collection = FakeCollection("Scene")
+    first = FakeObject("A")
+    first.add_track([(0, 10)])
+    scene_collection.link(first)
+    blend_data.objects[first.name] = first
+
+    index = addon._animated_index
+    try:
+        assert index.objects(scene_collection) == [first]
+
+        # Objects added without a depsgraph update only show up after a rebuild
+        second = FakeObject("B")
+        second.add_track([(0, 10), (20, 30)])
+        scene_collection.link(second)
+        blend_data.objects[second.name] = second
+        assert index.objects(scene_collection) == [first]
+
+        addon._invalidate_animated_index()
+        assert not index.valid
+        assert index.objects(scene_collection) == [first, second]
+        assert index.totals() == (2, 3)
+    finally:
+        index.invalidate()
+
+
+def test_hierarchy_order_puts_parents_first(addon):
+    root = FakeObject("Root")
+    child = FakeObject("Child")
+    grandchild = FakeObject("Grandchild")
+    loose = FakeObject("Loose")
+    child.parent = root
+    grandchild.parent = child
+
+    ordered = addon._hierarchy_order([grandchild, loose, child, root])
+
+    assert ordered.index(root) < ordered.index(child) < ordered.index(grandchild)
+    assert ordered.index(loose) < ordered.index(child)
+    # Parents outside the list still count towards the depth
+    assert addon._hierarchy_order([grandchild, child]) == [child, grandchild]
+
+
+def test_remove_objects_with_orphaned_data(addon, blend_data):
+    shared = FakeMesh("Shared", [(0, 0, 0)], users=2)
+    single = FakeMesh("Single", [(0, 0, 0)])
+    template = FakeMesh("Template", [(0, 0, 0)])
+    objects = [FakeObject(name) for name in "ABCD"]
+    for obj, mesh in zip(objects, (shared, shared, single, template)):
+        obj.data = mesh
+        blend_data.objects[obj.name] = obj
+    first, second, third, fourth = objects
+
+    assert addon._remove_objects_with_orphaned_data([first, third, fourth], keep=(template,)) == 1
+    assert blend_data.removed == [first, third, fourth, single]
+    assert list(blend_data.objects) == [second]
+
+    # The last user of the shared mesh takes it along
+    shared.users = 1
+    assert addon._remove_objects_with_orphaned_data([second]) == 1
+    assert blend_data.removed[-2:] == [second, shared]
+
+
+def test_action_fingerprint(addon):
+    def action(value=1.0, order=1):
+        fcurves = [FakeFCurve("location", 0, [(0, 0), (10, value)]), FakeFCurve("location", 1, [(0, 2), (10, 3)])]
+        return FakeAction("Action", fcurves[::order])
+
+    fingerprint = addon._action_fingerprint(action())
+    assert fingerprint == addon._action_fingerprint(action())
+    assert fingerprint == addon._action_fingerprint(action(order=-1))
+    assert fingerprint != addon._action_fingerprint(action(value=1.5))
+
+    cyclic = action()
+    cyclic.use_cyclic = True
+    assert fingerprint != addon._action_fingerprint(cyclic)
+
+    modified = action()
+    modified.fcurves[0].modifiers.append("NOISE")
+    assert addon._action_fingerprint(modified) is None
+
+
+def test_mesh_fingerprint(addon):
+    def quad(offset=0.0):
+        positions = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1 + offset, 0)]
+        return FakeMesh("Quad", positions, [(0, 1), (1, 2), (2, 3), (3, 0)], [(0, 1, 2, 3)])
+
+    fingerprint = addon._mesh_fingerprint(quad())
+    assert fingerprint == addon._mesh_fingerprint(quad())
+    assert fingerprint != addon._mesh_fingerprint(quad(offset=1e-4))
+    assert addon._mesh_fingerprint(quad(), tolerance=0.01) == addon._mesh_fingerprint(quad(1e-4), tolerance=0.01)
+
+    keyed = quad()
+    keyed.shape_keys = object()
+    assert addon._mesh_fingerprint(keyed) is None
+
+
+def test_strip_journal_survives_global_undo(addon):
+    handlers = sys.modules["bpy"].app.handlers
+    addon.register()
+    try:
+        assert addon._clear_strip_journal in handlers.load_post
+        assert addon._clear_strip_journal not in handlers.undo_post + handlers.redo_post
+    finally:
+        addon.unregister()
+    assert addon._clear_strip_journal not in handlers.load_post
+
+
+def test_strip_signatures_follow_strip_timing(addon):
+    first = FakeObject("A")
+    track = first.add_track([(0, 10), (20, 30)])
+    second = FakeObject("B")
+    second.add_track([(5, 8)])
+    objects = [first, second]
+    locations = np.zeros((2, 3))
+
+    batch = addon._StripBatch(objects)
+    batch.write(np.array([40.0, 60.0, 5.0]), np.array([1.0, 2.0, 1.0]), sequential=True)
+    stored = addon._strip_signatures(objects, locations, b"settings", batch, batch.read())
+    assert addon._strip_signatures(objects, locations, b"settings", addon._StripBatch(objects)) == stored
+
+    # Retiming a strip by hand invalidates only its object
+    track.strips[1].scale = 1.5
+    current = addon._strip_signatures(objects, locations, b"settings", addon._StripBatch(objects))
+    assert current[0] != stored[0]
+    assert current[1] == stored[1]
+
+
+def test_parent_fix_channels_leave_room_for_deltas(addon):
+    euler_child = FakeObject("Euler")
+    euler_child.delta_location = (1.0, -2.0, 0.5)
+    euler_child.delta_rotation_euler = (0.3, -0.2, 1.1)
+    euler_child.delta_scale = (2.0, 1.0, 0.5)
+    quaternion_child = FakeObject("Quaternion")
+    quaternion_child.rotation_mode = 'QUATERNION'
+    quaternion_child.delta_rotation_quaternion = (0.8, 0.0, 0.6, 0.0)
+    children = [euler_child, quaternion_child]
+
+    # Channels animated over three frames, and the local matrices Blender builds from them with the deltas
+    frames = np.arange(3.0)[:, np.newaxis]
+    locations = np.stack([frames * (1.0, 0.0, 2.0), frames * (0.0, -1.0, 0.0)])
+    eulers = frames * (0.1, 0.4, -0.2)
+    scales = np.stack([1.0 + frames * (0.5, 0.0, 0.1), np.ones((3, 3))])
+    delta_locations, delta_rotations, delta_scales = addon._delta_transforms(children)
+    rotations = np.stack([
+        core.eulers_to_matrices(eulers, 'XYZ'),
+        core.quaternions_to_matrices(core.matrices_to_quaternions(core.eulers_to_matrices(eulers, 'XYZ'))),
+    ])
+    local_matrices = np.tile(np.eye(4), (2, 3, 1, 1))
+    local_matrices[..., :3, :3] = (
+        delta_rotations[:, np.newaxis] @ rotations * (scales * delta_scales[:, np.newaxis])[..., np.newaxis, :]
+    )
+    local_matrices[..., :3, 3] = locations + delta_locations[:, np.newaxis]
+
+    channel_matrices = core.remove_delta_transforms(
+        local_matrices, delta_locations[:, np.newaxis], delta_rotations[:, np.newaxis], delta_scales[:, np.newaxis]
+    )
+    result_locations, result_rotations, result_scales = core.split_matrices(channel_matrices)
+
+    np.testing.assert_allclose(result_locations, locations, atol=1e-12)
+    np.testing.assert_allclose(result_scales, scales, atol=1e-12)
+    _, result_eulers = addon._rotation_channels(result_rotations[:1], 'XYZ')
+    np.testing.assert_allclose(result_eulers[0], eulers, atol=1e-12)
+    _, result_quaternions = addon._rotation_channels(result_rotations[1:], 'QUATERNION')
+    np.testing.assert_allclose(result_quaternions[0], core.matrices_to_quaternions(rotations[1]), atol=1e-12)
@@ -0,0 +1,72 @@
+"""
+Timings of the NumPy core at production scale
+
+Skipped by default; run with ``python -m pytest -m benchmark -s``.
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+import core
+
+pytestmark = pytest.mark.benchmark
+
+OBJECTS = 100_000
+STRIPS_PER_OBJECT = 3
+
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    print(f"\n{label:<32}{(time.perf_counter() - start) * 1000.0:9.1f} ms")
+    return result
+
+
+@pytest.fixture(scope="module")
+def scene():
+    rng = np.random.default_rng(0)
+    strips = OBJECTS * STRIPS_PER_OBJECT
+    lengths = rng.uniform(5.0, 50.0, size=strips)
+    starts = rng.uniform(0.0, 500.0, size=strips)
+    return {
+        "names": [f"Object_{index}" for index in range(OBJECTS)],
+        "locations": rng.normal(scale=50.0, size=(OBJECTS, 3)),
+        "track_ids": np.repeat(np.arange(OBJECTS), STRIPS_PER_OBJECT),
+        "strip_objects": np.repeat(np.arange(OBJECTS), STRIPS_PER_OBJECT),
+        "strip_ordinals": np.tile(np.arange(STRIPS_PER_OBJECT), OBJECTS),
+        "starts": starts,
+        "ends": starts + lengths,
+        "matrices": np.tile(np.eye(4), (OBJECTS, 1, 1)) + rng.normal(scale=0.1, size=(OBJECTS, 4, 4)),
+    }
+
+
+def test_random_streams(scene):
+    keys = timed("object_keys", core.object_keys, scene["names"], 0)
+    timed("random_offsets", core.random_offsets, keys, 100.0)
+    timed("random_scales", core.random_scales, keys, scene["strip_objects"], scene["strip_ordinals"], 0.8, 1.2)
+
+
+def test_sequence_layout(scene):
+    count = len(scene["starts"])
+    timed(
+        "sequence_layout", core.sequence_layout, scene["track_ids"], scene["starts"], scene["ends"],
+        np.ones(count), np.full(count, 1.5), np.zeros(count),
+    )
+
+
+def test_expression(scene):
+    keys = core.object_keys(scene["names"], 0)
+    variables = core.expression_variables(
+        scene["locations"], np.arange(OBJECTS), OBJECTS, keys, (0.0, 0.0, 0.0), 0, {},
+    )
+    expression = core.compile_expression("dist * 2.0 + noise(x * 0.1) * 10 + (5 if z > 0 else 0)")
+    timed("expression", expression.evaluate, variables, OBJECTS)
+
+
+def test_matrices(scene):
+    parents = scene["matrices"]
+    worlds = parents[::-1].copy()
+    timed("solve_local_matrices", core.solve_local_matrices, parents, worlds)
+    timed("decompose_matrices", core.decompose_matrices, worlds)
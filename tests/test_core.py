@@ -0,0 +1,491 @@
+"""
+Unit tests for the bpy-independent NumPy core
+"""
+
+import numpy as np
+import pytest
+
+import core
+
+
+def random_rotation_matrices(count, rng):
+    quaternions = rng.normal(size=(count, 4))
+    quaternions /= np.linalg.norm(quaternions, axis=1, keepdims=True)
+    w, x, y, z = quaternions.T
+    matrices = np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], -1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], -1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], -1),
+    ], -2)
+    quaternions[w < 0] *= -1.0
+    return matrices, quaternions
+
+
+def compose(locations, rotations, scales):
+    matrices = np.zeros(locations.shape[:-1] + (4, 4))
+    matrices[..., :3, :3] = rotations * scales[..., np.newaxis, :]
+    matrices[..., :3, 3] = locations
+    matrices[..., 3, 3] = 1.0
+    return matrices
+
+
+# ---------------------------------------------------------------------------
+# Random streams
+# ---------------------------------------------------------------------------
+
+def test_streams_depend_on_name_and_seed_only():
+    keys = core.object_keys(["Cube", "Cone", "Cube"], seed=3)
+    values = core.hash_uniform(keys, np.zeros(3), 0.0, 1.0)
+
+    assert values[0] == values[2]
+    assert values[0] != values[1]
+    assert core.object_keys(["Cube"], seed=4)[0] != keys[0]
+    np.testing.assert_array_equal(core.hash_uniform(keys[1:], np.zeros(2), 0.0, 1.0), values[1:])
+
+
+def test_hash_uniform_range_and_spread():
+    keys = core.object_keys([f"obj_{i}" for i in range(20000)], seed=0)
+    values = core.hash_uniform(keys, np.zeros(len(keys)), -2.0, 5.0)
+
+    assert values.min() >= -2.0 and values.max() < 5.0
+    assert abs(values.mean() - 1.5) < 0.1
+
+
+def test_value_noise_is_smooth_and_bounded():
+    samples = np.linspace(-20.0, 20.0, 4001)
+    noise = core.value_noise(samples, seed=1)
+
+    assert noise.min() >= -1.0 and noise.max() <= 1.0
+    assert np.abs(np.diff(noise)).max() < 0.05
+    np.testing.assert_array_equal(noise, core.value_noise(samples, seed=1))
+
+
+# ---------------------------------------------------------------------------
+# Offsets and scales
+# ---------------------------------------------------------------------------
+
+def test_cursor_offsets():
+    locations = np.array([[3.0, 4.0, 0.0], [1.0, 0.0, 0.0]])
+    np.testing.assert_allclose(core.cursor_offsets(locations, (0.0, 0.0, 0.0), 2.0), [10.0, 2.0])
+
+
+def test_random_scales_follow_the_offset_in_each_stream():
+    keys = core.object_keys(["A", "B"], seed=0)
+    strip_objects = np.array([0, 0, 1])
+    strip_ordinals = np.array([0, 1, 0])
+
+    scales = core.random_scales(keys, strip_objects, strip_ordinals, 0.5, 1.5)
+    expected = core.hash_uniform(keys[strip_objects], strip_ordinals + 1, 0.5, 1.5)
+    np.testing.assert_array_equal(scales, expected)
+    assert core.random_offsets(keys, 1.0)[0] != scales[0] - 0.5
+
+
+# ---------------------------------------------------------------------------
+# Strip layouts
+# ---------------------------------------------------------------------------
+
+def test_resolve_overlaps_matches_sequential_sweep():
+    rng = np.random.default_rng(0)
+    track_ids = np.sort(rng.integers(0, 50, size=500))
+    starts = rng.uniform(0.0, 100.0, size=500)
+    lengths = rng.uniform(1.0, 10.0, size=500)
+    order = np.lexsort((starts, track_ids))
+    track_ids, starts, lengths = track_ids[order], starts[order], lengths[order]
+    first = np.ones(500, dtype=bool)
+    first[1:] = track_ids[1:] != track_ids[:-1]
+
+    expected = starts.copy()
+    for index in range(1, 500):
+        if not first[index]:
+            expected[index] = max(expected[index], expected[index - 1] + lengths[index - 1])
+
+    np.testing.assert_allclose(core.resolve_overlaps(first, starts, lengths), expected)
+
+
+def test_sequence_layout_keeps_order_and_gaps():
+    track_ids = np.array([0, 0, 0, 1, 1])
+    starts = np.array([20.0, 0.0, 10.0, 5.0, 0.0])
+    ends = np.array([25.0, 5.0, 15.0, 10.0, 8.0])
+    new_scales = np.array([1.0, 2.0, 1.0, 1.0, 1.0])
+    anchors = np.array([100.0, 100.0, 100.0, 50.0, 50.0])
+
+    result = core.sequence_layout(track_ids, starts, ends, np.ones(5), new_scales, anchors)
+
+    # Track 0: the scaled first strip grows to 10 frames, the 5 frame gaps stay
+    # Track 1: the overlapping second strip is pushed past the first one
+    np.testing.assert_allclose(result, [125.0, 100.0, 115.0, 58.0, 50.0])
+
+
+def test_match_layout_by_name_and_track():
+    layout = {
+        "object_names": np.array(["A", "B"]),
+        "track_indices": np.array([0, 0]),
+        "counts": np.array([2, 1]),
+        "starts": np.array([10.0, 20.0, 30.0], dtype=np.float32),
+        "scales": np.array([1.5, 2.0, 0.5], dtype=np.float32),
+    }
+    # B comes first now, and C is not in the layout
+    starts, scales, matched = core.match_layout(
+        layout, ["B", "C", "A"], [0, 0, 0], [1, 1, 2],
+        np.zeros(4, dtype=np.float32), np.ones(4, dtype=np.float32),
+    )
+
+    assert matched == 2
+    np.testing.assert_allclose(starts, [30.0, 0.0, 10.0, 20.0])
+    np.testing.assert_allclose(scales, [0.5, 1.0, 1.5, 2.0])
+
+
+def test_match_layout_skips_tracks_with_other_strip_counts():
+    layout = {
+        "object_names": np.array(["A"]), "track_indices": np.array([0]), "counts": np.array([2]),
+        "starts": np.array([10.0, 20.0]), "scales": np.array([1.0, 1.0]),
+    }
+    starts, _, matched = core.match_layout(layout, ["A"], [0], [3], np.zeros(3), np.ones(3))
+
+    assert matched == 0
+    np.testing.assert_array_equal(starts, np.zeros(3))
+
+
+# ---------------------------------------------------------------------------
+# Expressions
+# ---------------------------------------------------------------------------
+
+def expression_inputs(count=3, properties=None):
+    locations = np.array([[1.0, 0.0, 0.0], [0.0, 2.0, 0.0], [3.0, 4.0, 0.0]])[:count]
+    keys = core.object_keys([f"obj_{i}" for i in range(count)], seed=0)
+    return core.expression_variables(locations, np.arange(count), count, keys, (0.0, 0.0, 0.0), 0, properties or {})
+
+
+def test_expression_evaluates_over_arrays():
+    variables = expression_inputs(properties={"delay": np.array([1.0, 2.0, 3.0])})
+    result = core.Expression('dist ** 2 + prop("delay") + (10 if x > 0.5 else 0)').evaluate(variables, 3)
+
+    np.testing.assert_allclose(result, [12.0, 6.0, 38.0])
+
+
+def test_expression_constant_is_broadcast():
+    np.testing.assert_array_equal(core.Expression("5").evaluate(expression_inputs(), 3), [5.0, 5.0, 5.0])
+
+
+def test_expression_reports_inputs():
+    expression = core.Expression('index * 2 + prop("weight") + noise(x)')
+
+    assert {"index", "prop", "noise", "x"} <= expression.names
+    assert expression.properties == {"weight"}
+
+
+@pytest.mark.parametrize("source", [
+    '__import__("os")', "x.real", "(lambda: 1)()", "[1][0]", "unknown", "prop(x)", "1 < x < 2", '"a" * 100',
+])
+def test_expression_rejects_unsafe_input(source):
+    with pytest.raises(ValueError):
+        core.Expression(source)
+
+
+@pytest.mark.parametrize("source", ["1 / 0", "2 ** 10 ** 10", "clip(x)"])
+def test_expression_errors_become_value_errors(source):
+    with pytest.raises(ValueError):
+        core.Expression(source).evaluate(expression_inputs(), 3)
+
+
+def test_compile_expression_is_cached():
+    assert core.compile_expression("dist * 3") is core.compile_expression("dist * 3")
+
+
+def test_per_strip_variables_reproduce_random_scale():
+    variables = expression_inputs()
+    keys = core.object_keys([f"obj_{i}" for i in range(3)], seed=0)
+    strip_objects = np.array([0, 1, 1, 2])
+    strip_ordinals = np.array([0, 0, 1, 0])
+
+    strip_variables = core.per_strip_variables(variables, strip_objects, strip_ordinals, keys)
+    scales = core.Expression("0.9 + rand * 0.2").evaluate(strip_variables, 4)
+
+    np.testing.assert_allclose(scales, core.random_scales(keys, strip_objects, strip_ordinals, 0.9, 1.1))
+    np.testing.assert_array_equal(strip_variables["x"], variables["x"][strip_objects])
+
+
+# ---------------------------------------------------------------------------
+# NLA time mapping
+# ---------------------------------------------------------------------------
+
+def strip_values(**overrides):
+    values = dict(frame_start=10.0, frame_end=70.0, action_frame_start=1.0, action_frame_end=31.0,
+                  scale=1.0, repeat=2.0, reverse=False)
+    values.update(overrides)
+    return values
+
+
+def test_strip_action_times_repeat_and_hold():
+    times = np.array([0.0, 10.0, 25.0, 40.0, 41.0, 70.0, 80.0])
+    np.testing.assert_allclose(
+        core.strip_action_times(times, strip_values()),
+        [1.0, 1.0, 16.0, 1.0, 2.0, 31.0, 31.0],
+    )
+
+
+def test_strip_action_times_scale_and_reverse():
+    strip = strip_values(scale=2.0, repeat=1.0, reverse=True)
+    np.testing.assert_allclose(core.strip_action_times(np.array([10.0, 30.0, 70.0]), strip), [31.0, 21.0, 1.0])
+
+
+# ---------------------------------------------------------------------------
+# Matrices
+# ---------------------------------------------------------------------------
+
+def test_solve_local_matrices():
+    rng = np.random.default_rng(1)
+    rotations, _ = random_rotation_matrices(6, rng)
+    parents = compose(rng.normal(size=(6, 3)), rotations, rng.uniform(0.5, 2.0, size=(6, 3)))
+    worlds = compose(rng.normal(size=(6, 3)), rotations[::-1], np.ones((6, 3)))
+    parents[2] = 0.0
+
+    local, invertible = core.solve_local_matrices(parents, worlds)
+
+    assert invertible.tolist() == [True, True, False, True, True, True]
+    np.testing.assert_allclose((parents @ local)[invertible], worlds[invertible], atol=1e-9)
+    np.testing.assert_array_equal(local[2], np.zeros((4, 4)))
+
+
+def test_solve_local_matrices_over_frames():
+    rng = np.random.default_rng(2)
+    rotations, _ = random_rotation_matrices(12, rng)
+    parents = compose(rng.normal(size=(12, 3)), rotations, np.ones((12, 3))).reshape(3, 4, 4, 4)
+    worlds = compose(rng.normal(size=(12, 3)), rotations, np.ones((12, 3))).reshape(3, 4, 4, 4)
+
+    local, invertible = core.solve_local_matrices(parents, worlds)
+
+    assert invertible.shape == (3, 4) and invertible.all()
+    np.testing.assert_allclose(parents @ local, worlds, atol=1e-9)
+
+
+def test_decompose_round_trip():
+    rng = np.random.default_rng(3)
+    rotations, quaternions = random_rotation_matrices(100, rng)
+    locations = rng.normal(size=(100, 3))
+    scales = rng.uniform(0.1, 3.0, size=(100, 3))
+
+    positions, decomposed, decomposed_scales = core.decompose_matrices(compose(locations, rotations, scales))
+
+    np.testing.assert_allclose(positions, locations, atol=1e-5)
+    np.testing.assert_allclose(decomposed, quaternions, atol=1e-5)
+    np.testing.assert_allclose(decomposed_scales, scales, atol=1e-5)
+
+
+def test_negative_determinant_negates_scale():
+    matrix = compose(np.zeros((1, 3)), np.eye(3)[np.newaxis], np.array([[-1.0, -2.0, -3.0]]))
+    _, rotations, scales = core.split_matrices(matrix)
+
+    np.testing.assert_allclose(scales, [[-1.0, -2.0, -3.0]])
+    np.testing.assert_allclose(rotations[0], np.eye(3))
+
+
+def test_quaternions_become_continuous():
+    quaternions = np.array([[1.0, 0.0, 0.0, 0.0], [-0.99, -0.1, 0.0, 0.0], [0.98, 0.2, 0.0, 0.0]])
+    continuous = core.make_quaternions_continuous(quaternions)
+
+    assert (np.einsum("ij,ij->i", continuous[1:], continuous[:-1]) > 0.0).all()
+    np.testing.assert_allclose(np.abs(continuous), np.abs(quaternions))
+
+
+def test_axis_angles():
+    half = np.sqrt(0.5)
+    values = core.quaternions_to_axis_angles(np.array([[1.0, 0.0, 0.0, 0.0], [half, 0.0, 0.0, half]]))
+
+    np.testing.assert_allclose(values, [[0.0, 0.0, 1.0, 0.0], [np.pi / 2, 0.0, 0.0, 1.0]], atol=1e-12)
+
+
+def axis_rotation(axis, angles):
+    """Right-handed rotation matrices about one axis"""
+    cos, sin = np.cos(angles), np.sin(angles)
+    first, second = [(1, 2), (2, 0), (0, 1)][axis]
+    matrices = np.zeros(np.shape(angles) + (3, 3))
+    matrices[..., axis, axis] = 1.0
+    matrices[..., first, first] = cos
+    matrices[..., second, second] = cos
+    matrices[..., second, first] = sin
+    matrices[..., first, second] = -sin
+    return matrices
+
+
+def euler_matrices(eulers, order):
+    """Blender's Euler convention: the first axis of the order is applied first"""
+    matrices = np.broadcast_to(np.eye(3), eulers.shape[:-1] + (3, 3))
+    for name in order:
+        axis = "XYZ".index(name)
+        matrices = axis_rotation(axis, eulers[..., axis]) @ matrices
+    return matrices
+
+
+@pytest.mark.parametrize("order", sorted(core.EULER_ORDERS))
+def test_eulers_round_trip_in_every_order(order):
+    eulers = np.random.default_rng(7).uniform(-3.0, 3.0, size=(40, 6, 3))
+    matrices = euler_matrices(eulers, order)
+
+    result = core.matrices_to_eulers(matrices, order)
+
+    assert result.shape == (40, 6, 3)
+    np.testing.assert_allclose(euler_matrices(result, order), matrices, atol=1e-9)
+    # Small rotations come back unchanged
+    small = eulers * 0.1
+    np.testing.assert_allclose(core.matrices_to_eulers(euler_matrices(small, order), order), small, atol=1e-9)
+
+
+@pytest.mark.parametrize("order", sorted(core.EULER_ORDERS))
+def test_eulers_at_gimbal_lock(order):
+    # The middle axis of the order at +-90 degrees locks the other two
+    middle = "XYZ".index(order[1])
+    eulers = np.zeros((4, 3))
+    eulers[:, middle] = [np.pi / 2, -np.pi / 2, np.pi / 2, -np.pi / 2]
+    eulers[:, "XYZ".index(order[0])] = [0.3, -0.7, 1.2, 0.0]
+    matrices = euler_matrices(eulers, order)
+
+    result = core.matrices_to_eulers(matrices[:, np.newaxis], order)[:, 0]
+
+    assert np.isfinite(result).all()
+    np.testing.assert_allclose(euler_matrices(result, order), matrices, atol=1e-9)
+
+
+@pytest.mark.parametrize("order", sorted(core.EULER_ORDERS))
+def test_eulers_unwrap_past_pi(order):
+    # Two full turns about the last axis in 10 degree steps
+    axis = "XYZ".index(order[2])
+    eulers = np.zeros((73, 3))
+    eulers[:, axis] = np.radians(np.arange(73) * 10.0)
+
+    result = core.matrices_to_eulers(euler_matrices(eulers, order), order)
+
+    assert np.abs(np.diff(result, axis=0)).max() < np.radians(10.0) + 1e-9
+    np.testing.assert_allclose(result, eulers, atol=1e-9)
+
+
+def test_eulers_keep_negative_wrap():
+    eulers = np.zeros((20, 3))
+    eulers[:, 0] = np.linspace(np.pi - 0.5, np.pi + 0.5, 20) * -1.0
+
+    result = core.matrices_to_eulers(euler_matrices(eulers, "XYZ"), "XYZ")
+
+    np.testing.assert_allclose(result, eulers, atol=1e-9)
+
+
+@pytest.mark.parametrize("order", sorted(core.EULER_ORDERS))
+def test_eulers_to_matrices(order):
+    eulers = np.random.default_rng(2).uniform(-3.0, 3.0, size=(10, 3))
+
+    np.testing.assert_allclose(core.eulers_to_matrices(eulers, order), euler_matrices(eulers, order), atol=1e-12)
+
+
+def test_quaternions_to_matrices_round_trip():
+    quaternions = np.random.default_rng(3).normal(size=(10, 4))
+    quaternions *= np.sign(quaternions[:, :1])
+
+    result = core.matrices_to_quaternions(core.quaternions_to_matrices(quaternions))
+
+    np.testing.assert_allclose(result, quaternions / np.linalg.norm(quaternions, axis=1, keepdims=True), atol=1e-12)
+
+
+# ---------------------------------------------------------------------------
+# Replacement planning
+# ---------------------------------------------------------------------------
+
+def test_orphaned_data_counts_removed_users():
+    # "mesh" loses both of its users, "shared" keeps one, None marks kept data
+    data_keys = ["mesh", "mesh", "shared", None]
+    users = {"mesh": 2, "shared": 2}
+
+    assert core.orphaned_data(data_keys, users) == ["mesh"]
+
+
+# ---------------------------------------------------------------------------
+# Evaluation cost attribution
+# ---------------------------------------------------------------------------
+
+def test_count_buckets():
+    np.testing.assert_array_equal(core.count_buckets([0, 1, 2, 3, 4, 7, 8, 100]), [0, 1, 2, 2, 4, 4, 8, 64])
+
+
+def test_group_rows():
+    group_ids, group_features, group_sizes = core.group_rows(np.array([[1, 2, 0], [0, 1, 1], [1, 2, 0]]))
+
+    np.testing.assert_array_equal(group_features[group_ids], [[1, 2, 0], [0, 1, 1], [1, 2, 0]])
+    np.testing.assert_array_equal(group_sizes[group_ids], [2, 1, 2])
+
+
+def test_attribute_costs_by_weight():
+    group_ids = np.array([1, 0, 1])
+    group_costs, object_costs = core.attribute_costs(group_ids, 10.0, [8.0, 6.0], weights=[1.0, 1.0, 3.0])
+
+    np.testing.assert_allclose(group_costs, [2.0, 4.0])
+    np.testing.assert_allclose(object_costs, [1.0, 2.0, 3.0])
+
+
+def test_attribute_costs_clip_noise_and_skip_unmeasured_groups():
+    group_costs, object_costs = core.attribute_costs(np.array([0, 1, 2]), 10.0, [10.5, np.nan, 9.0])
+
+    np.testing.assert_allclose(group_costs, [0.0, np.nan, 1.0])
+    assert core.top_indices(object_costs, 5).tolist() == [2, 0]
+    assert core.top_indices(object_costs, 1).tolist() == [2]
+
+
+# ---------------------------------------------------------------------------
+# Level of detail
+# ---------------------------------------------------------------------------
+
+def test_lod_cells_bound_their_members():
+    positions = np.random.default_rng(4).uniform(-50.0, 50.0, size=(2000, 3))
+    cell_ids, centers, radii = core.lod_cells(positions, 10.0)
+
+    distances = np.linalg.norm(positions - centers[cell_ids], axis=1)
+    assert (distances <= radii[cell_ids] + 1e-9).all()
+    assert len(centers) <= 1000
+
+
+@pytest.mark.parametrize("camera", [(0.0, 0.0, 0.0), (120.0, -30.0, 5.0)])
+def test_lod_levels_match_per_object_distances(camera):
+    positions = np.random.default_rng(5).uniform(-200.0, 200.0, size=(5000, 3))
+    thresholds = [25.0, 80.0, 150.0]
+
+    levels = core.lod_levels(positions, camera, thresholds, core.lod_cells(positions, 20.0))
+
+    expected = np.searchsorted(thresholds, np.linalg.norm(positions - np.array(camera), axis=1), side="right")
+    np.testing.assert_array_equal(levels, expected)
+
+
+def test_lod_changes_replay_every_frame():
+    positions = np.random.default_rng(6).uniform(-100.0, 100.0, size=(500, 3))
+    cells = core.lod_cells(positions, 15.0)
+    cameras = np.linspace([-150.0, 0.0, 0.0], [150.0, 0.0, 0.0], 30)
+    levels = np.stack([core.lod_levels(positions, camera, [20.0, 60.0], cells) for camera in cameras])
+
+    table = core.lod_changes(levels)
+
+    assert len(table[2]) == np.count_nonzero(levels[1:] != levels[:-1])
+    for frame_index in range(len(levels)):
+        np.testing.assert_array_equal(core.lod_levels_at(*table, frame_index), levels[frame_index])
+    np.testing.assert_array_equal(core.lod_levels_at(*table, 100), levels[-1])
+    np.testing.assert_array_equal(core.lod_levels_at(*table, -5), levels[0])
+
+
+# ---------------------------------------------------------------------------
+# Memory footprint
+# ---------------------------------------------------------------------------
+
+def test_footprint_summary_counts_orphans():
+    summary = core.footprint_summary(
+        [100, 200, 300], users=[2, 0, 1], fake_users=[False, False, True], vertices=[8, 4, 16],
+    )
+
+    assert summary == {
+        "count": 3, "bytes": 600, "users": 3, "orphans": 2, "orphan_bytes": 500, "vertices": 28,
+    }
+
+
+def test_footprint_delta():
+    before = {"meshes": {"count": 10, "bytes": 5000}, "actions": {"count": 2, "bytes": 100}}
+    after = {"meshes": {"count": 1, "bytes": 500}, "objects": {"count": 3, "bytes": 30}}
+
+    assert core.footprint_delta(before, after) == {
+        "actions": {"count": -2, "bytes": -100},
+        "meshes": {"count": -9, "bytes": -4500},
+        "objects": {"count": 3, "bytes": 30},
+    }